@@ -0,0 +1,15 @@
+CREATE TABLE IF NOT EXISTS sync_state (
+    entity_type VARCHAR(20) PRIMARY KEY,
+    last_page INTEGER NOT NULL DEFAULT 0,
+    next_url TEXT,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS entity_sync_state (
+    entity_type VARCHAR(20) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    edited VARCHAR(40),
+    content_hash VARCHAR(64),
+    PRIMARY KEY (entity_type, entity_id)
+);
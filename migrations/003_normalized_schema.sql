@@ -0,0 +1,114 @@
+ALTER TABLE characters ADD COLUMN IF NOT EXISTS homeworld_id INTEGER;
+ALTER TABLE characters ADD COLUMN IF NOT EXISTS height_cm INTEGER;
+ALTER TABLE characters ADD COLUMN IF NOT EXISTS mass_kg DOUBLE PRECISION;
+ALTER TABLE planets ADD COLUMN IF NOT EXISTS diameter_km INTEGER;
+ALTER TABLE planets ADD COLUMN IF NOT EXISTS population_num BIGINT;
+
+CREATE TABLE IF NOT EXISTS films (
+    id INTEGER PRIMARY KEY,
+    title VARCHAR(100) NOT NULL,
+    episode_id INTEGER,
+    director VARCHAR(100),
+    producer VARCHAR(255),
+    release_date VARCHAR(20)
+);
+
+CREATE TABLE IF NOT EXISTS species (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    classification VARCHAR(50),
+    designation VARCHAR(50),
+    language VARCHAR(50)
+);
+
+CREATE TABLE IF NOT EXISTS character_films (
+    character_id INTEGER NOT NULL REFERENCES characters (id) ON DELETE CASCADE,
+    film_id INTEGER NOT NULL REFERENCES films (id) ON DELETE CASCADE,
+    PRIMARY KEY (character_id, film_id)
+);
+CREATE INDEX IF NOT EXISTS ix_character_films_film_id ON character_films (film_id);
+
+CREATE TABLE IF NOT EXISTS character_species (
+    character_id INTEGER NOT NULL REFERENCES characters (id) ON DELETE CASCADE,
+    species_id INTEGER NOT NULL REFERENCES species (id) ON DELETE CASCADE,
+    PRIMARY KEY (character_id, species_id)
+);
+CREATE INDEX IF NOT EXISTS ix_character_species_species_id ON character_species (species_id);
+
+CREATE TABLE IF NOT EXISTS character_starships (
+    character_id INTEGER NOT NULL REFERENCES characters (id) ON DELETE CASCADE,
+    starship_id INTEGER NOT NULL REFERENCES starships (id) ON DELETE CASCADE,
+    PRIMARY KEY (character_id, starship_id)
+);
+CREATE INDEX IF NOT EXISTS ix_character_starships_starship_id ON character_starships (starship_id);
+
+CREATE TABLE IF NOT EXISTS character_vehicles (
+    character_id INTEGER NOT NULL REFERENCES characters (id) ON DELETE CASCADE,
+    vehicle_id INTEGER NOT NULL REFERENCES vehicles (id) ON DELETE CASCADE,
+    PRIMARY KEY (character_id, vehicle_id)
+);
+CREATE INDEX IF NOT EXISTS ix_character_vehicles_vehicle_id ON character_vehicles (vehicle_id);
+
+CREATE TABLE IF NOT EXISTS starship_films (
+    starship_id INTEGER NOT NULL REFERENCES starships (id) ON DELETE CASCADE,
+    film_id INTEGER NOT NULL REFERENCES films (id) ON DELETE CASCADE,
+    PRIMARY KEY (starship_id, film_id)
+);
+CREATE INDEX IF NOT EXISTS ix_starship_films_film_id ON starship_films (film_id);
+
+CREATE TABLE IF NOT EXISTS starship_pilots (
+    starship_id INTEGER NOT NULL REFERENCES starships (id) ON DELETE CASCADE,
+    character_id INTEGER NOT NULL REFERENCES characters (id) ON DELETE CASCADE,
+    PRIMARY KEY (starship_id, character_id)
+);
+CREATE INDEX IF NOT EXISTS ix_starship_pilots_character_id ON starship_pilots (character_id);
+
+CREATE TABLE IF NOT EXISTS vehicle_films (
+    vehicle_id INTEGER NOT NULL REFERENCES vehicles (id) ON DELETE CASCADE,
+    film_id INTEGER NOT NULL REFERENCES films (id) ON DELETE CASCADE,
+    PRIMARY KEY (vehicle_id, film_id)
+);
+CREATE INDEX IF NOT EXISTS ix_vehicle_films_film_id ON vehicle_films (film_id);
+
+CREATE TABLE IF NOT EXISTS vehicle_pilots (
+    vehicle_id INTEGER NOT NULL REFERENCES vehicles (id) ON DELETE CASCADE,
+    character_id INTEGER NOT NULL REFERENCES characters (id) ON DELETE CASCADE,
+    PRIMARY KEY (vehicle_id, character_id)
+);
+CREATE INDEX IF NOT EXISTS ix_vehicle_pilots_character_id ON vehicle_pilots (character_id);
+
+CREATE TABLE IF NOT EXISTS planet_films (
+    planet_id INTEGER NOT NULL REFERENCES planets (id) ON DELETE CASCADE,
+    film_id INTEGER NOT NULL REFERENCES films (id) ON DELETE CASCADE,
+    PRIMARY KEY (planet_id, film_id)
+);
+CREATE INDEX IF NOT EXISTS ix_planet_films_film_id ON planet_films (film_id);
+
+ALTER TABLE characters DROP CONSTRAINT IF EXISTS characters_homeworld_id_fkey;
+ALTER TABLE characters ADD CONSTRAINT characters_homeworld_id_fkey
+    FOREIGN KEY (homeworld_id) REFERENCES planets (id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS ix_characters_homeworld_id ON characters (homeworld_id);
+CREATE INDEX IF NOT EXISTS ix_characters_height_cm ON characters (height_cm);
+CREATE INDEX IF NOT EXISTS ix_characters_mass_kg ON characters (mass_kg);
+CREATE INDEX IF NOT EXISTS ix_planets_population_num ON planets (population_num);
+CREATE INDEX IF NOT EXISTS ix_films_title ON films (title);
+CREATE INDEX IF NOT EXISTS ix_species_name ON species (name);
+
+-- Представления со старыми текстовыми колонками
+
+CREATE OR REPLACE VIEW characters_flat AS
+SELECT c.id, c.birth_year, c.eye_color, (SELECT string_agg(t.title, ', ' ORDER BY t.id) FROM character_films l JOIN films t ON t.id = l.film_id WHERE l.character_id = c.id) AS films, c.gender, c.hair_color, c.height, p.name AS homeworld, c.mass, c.name, c.skin_color, (SELECT string_agg(t.name, ', ' ORDER BY t.id) FROM character_species l JOIN species t ON t.id = l.species_id WHERE l.character_id = c.id) AS species, (SELECT string_agg(t.name, ', ' ORDER BY t.id) FROM character_starships l JOIN starships t ON t.id = l.starship_id WHERE l.character_id = c.id) AS starships, (SELECT string_agg(t.name, ', ' ORDER BY t.id) FROM character_vehicles l JOIN vehicles t ON t.id = l.vehicle_id WHERE l.character_id = c.id) AS vehicles
+FROM characters c LEFT JOIN planets p ON p.id = c.homeworld_id;
+
+CREATE OR REPLACE VIEW starships_flat AS
+SELECT s.id, s.name, s.model, s.manufacturer, s.cost_in_credits, s.length, s.crew, s.passengers, s.cargo_capacity, s.consumables, s.hyperdrive_rating, s.starship_class, (SELECT string_agg(t.title, ', ' ORDER BY t.id) FROM starship_films l JOIN films t ON t.id = l.film_id WHERE l.starship_id = s.id) AS films, (SELECT string_agg(t.name, ', ' ORDER BY t.id) FROM starship_pilots l JOIN characters t ON t.id = l.character_id WHERE l.starship_id = s.id) AS pilots
+FROM starships s;
+
+CREATE OR REPLACE VIEW vehicles_flat AS
+SELECT v.id, v.name, v.model, v.manufacturer, v.cost_in_credits, v.length, v.crew, v.passengers, v.cargo_capacity, v.consumables, v.vehicle_class, (SELECT string_agg(t.title, ', ' ORDER BY t.id) FROM vehicle_films l JOIN films t ON t.id = l.film_id WHERE l.vehicle_id = v.id) AS films, (SELECT string_agg(t.name, ', ' ORDER BY t.id) FROM vehicle_pilots l JOIN characters t ON t.id = l.character_id WHERE l.vehicle_id = v.id) AS pilots
+FROM vehicles v;
+
+CREATE OR REPLACE VIEW planets_flat AS
+SELECT p.id, p.name, p.diameter, p.rotation_period, p.orbital_period, p.gravity, p.population, p.climate, p.terrain, p.surface_water, (SELECT string_agg(c.name, ', ' ORDER BY c.id) FROM characters c WHERE c.homeworld_id = p.id) AS residents, (SELECT string_agg(t.title, ', ' ORDER BY t.id) FROM planet_films l JOIN films t ON t.id = l.film_id WHERE l.planet_id = p.id) AS films
+FROM planets p;
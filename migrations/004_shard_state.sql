@@ -0,0 +1,14 @@
+CREATE TABLE IF NOT EXISTS shard_state (
+    shard_id VARCHAR(50) PRIMARY KEY,
+    entity_type VARCHAR(20) NOT NULL,
+    first_page INTEGER NOT NULL,
+    last_page INTEGER NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    written INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_shard_state_entity_type ON shard_state (entity_type);
@@ -0,0 +1,6 @@
+ALTER TABLE characters ADD COLUMN IF NOT EXISTS row_hash VARCHAR(64);
+ALTER TABLE starships ADD COLUMN IF NOT EXISTS row_hash VARCHAR(64);
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS row_hash VARCHAR(64);
+ALTER TABLE planets ADD COLUMN IF NOT EXISTS row_hash VARCHAR(64);
+ALTER TABLE films ADD COLUMN IF NOT EXISTS row_hash VARCHAR(64);
+ALTER TABLE species ADD COLUMN IF NOT EXISTS row_hash VARCHAR(64);
@@ -0,0 +1,11 @@
+CREATE TABLE IF NOT EXISTS dead_letters (
+    entity_type VARCHAR(20) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    url TEXT,
+    stage VARCHAR(20) NOT NULL,
+    reason TEXT,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    updated_at TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (entity_type, entity_id)
+);
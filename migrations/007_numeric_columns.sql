@@ -0,0 +1,21 @@
+-- Числовые колонки заполняются при любой загрузке (раньше — только с --normalized)
+ALTER TABLE characters ADD COLUMN IF NOT EXISTS height_cm INTEGER;
+ALTER TABLE characters ADD COLUMN IF NOT EXISTS mass_kg DOUBLE PRECISION;
+ALTER TABLE planets ADD COLUMN IF NOT EXISTS diameter_km INTEGER;
+ALTER TABLE planets ADD COLUMN IF NOT EXISTS population_num BIGINT;
+
+ALTER TABLE starships ADD COLUMN IF NOT EXISTS cost_in_credits_num BIGINT;
+ALTER TABLE starships ADD COLUMN IF NOT EXISTS length_m DOUBLE PRECISION;
+ALTER TABLE starships ADD COLUMN IF NOT EXISTS crew_min INTEGER;
+ALTER TABLE starships ADD COLUMN IF NOT EXISTS crew_max INTEGER;
+ALTER TABLE starships ADD COLUMN IF NOT EXISTS passengers_num BIGINT;
+
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS cost_in_credits_num BIGINT;
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS length_m DOUBLE PRECISION;
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS crew_min INTEGER;
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS crew_max INTEGER;
+ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS passengers_num BIGINT;
+
+CREATE INDEX IF NOT EXISTS ix_characters_height_cm ON characters (height_cm);
+CREATE INDEX IF NOT EXISTS ix_characters_mass_kg ON characters (mass_kg);
+CREATE INDEX IF NOT EXISTS ix_planets_population_num ON planets (population_num);
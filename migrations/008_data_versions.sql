@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS data_versions (
+    table_name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
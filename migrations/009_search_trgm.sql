@@ -0,0 +1,11 @@
+-- Триграммные индексы для ILIKE '%...%' и поиска по сходству (%) в PostgreSQL
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_characters_name_trgm ON characters USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_starships_name_trgm ON starships USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_starships_manufacturer_trgm ON starships USING gin (manufacturer gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_starships_pilots_trgm ON starships USING gin (pilots gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_vehicles_name_trgm ON vehicles USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_vehicles_manufacturer_trgm ON vehicles USING gin (manufacturer gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_vehicles_pilots_trgm ON vehicles USING gin (pilots gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_planets_name_trgm ON planets USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_characters_films_trgm ON characters USING gin (films gin_trgm_ops);
@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List
+
+from sqlalchemy import Table
+
+from starwars_async.database import engine
+from starwars_async.export import EXPORT_CHUNK_SIZE, iter_chunks
+from starwars_async.logging_config import LOG_FORMAT, LOG_FORMATS, LOG_LEVEL, setup_logging
+from starwars_async.models import Character, Planet
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy
+except ImportError:  # Сводки доступны только с numpy
+    numpy = None
+
+# Конфигурация
+UNKNOWN_GROUP = "unknown"  # группа для пустого ключа
+
+
+class GroupedStats:
+    """Статистика числовой колонки по группам, накапливаемая по пакетам.
+
+    Пакет обрабатывается векторно (np.unique + bincount), а между пакетами
+    хранятся только суммы, минимумы и максимумы групп — память не зависит
+    от размера таблицы.
+    """
+
+    def __init__(self):
+        if numpy is None:
+            raise RuntimeError("Analytics requires numpy: pip install numpy")
+        self.groups: Dict[str, int] = {}  # ключ → индекс в массивах
+        self.count = numpy.zeros(0, dtype=numpy.int64)
+        self.total = numpy.zeros(0)
+        self.squares = numpy.zeros(0)
+        self.minimum = numpy.zeros(0)
+        self.maximum = numpy.zeros(0)
+
+    def _grow(self, size: int) -> None:
+        extra = size - len(self.count)
+        if extra > 0:
+            self.count = numpy.concatenate([self.count, numpy.zeros(extra, dtype=numpy.int64)])
+            self.total = numpy.concatenate([self.total, numpy.zeros(extra)])
+            self.squares = numpy.concatenate([self.squares, numpy.zeros(extra)])
+            self.minimum = numpy.concatenate([self.minimum, numpy.full(extra, numpy.inf)])
+            self.maximum = numpy.concatenate([self.maximum, numpy.full(extra, -numpy.inf)])
+
+    def update(self, keys: List[str], values: List[float]) -> None:
+        """Добавление пакета пар (группа, значение)"""
+        if not keys:
+            return
+        unique, inverse = numpy.unique(numpy.asarray(keys, dtype=object), return_inverse=True)
+        index = numpy.array([self.groups.setdefault(key, len(self.groups)) for key in unique])[inverse]
+        values = numpy.asarray(values, dtype=numpy.float64)
+        self._grow(len(self.groups))
+
+        size = len(self.groups)
+        self.count += numpy.bincount(index, minlength=size)
+        self.total += numpy.bincount(index, weights=values, minlength=size)
+        self.squares += numpy.bincount(index, weights=values * values, minlength=size)
+        numpy.minimum.at(self.minimum, index, values)
+        numpy.maximum.at(self.maximum, index, values)
+
+    def result(self) -> Dict[str, Dict[str, float]]:
+        """count, sum, mean, std, min, max по группам (по убыванию числа значений)"""
+        summary = {}
+        for key, i in sorted(self.groups.items(), key=lambda item: -self.count[item[1]]):
+            count = int(self.count[i])
+            mean = self.total[i] / count
+            variance = max(self.squares[i] / count - mean * mean, 0.0)
+            summary[key] = {
+                "count": count,
+                "sum": round(float(self.total[i]), 3),
+                "mean": round(float(mean), 3),
+                "std": round(float(numpy.sqrt(variance)), 3),
+                "min": float(self.minimum[i]),
+                "max": float(self.maximum[i]),
+            }
+        return summary
+
+
+async def grouped_stats(
+        table: Table,
+        key_column: str,
+        value_column: str,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+        explode: bool = True
+) -> Dict[str, Dict[str, float]]:
+    """Статистика value_column по группам key_column; ключи-списки ("arid, temperate")
+    при explode относятся к каждой группе"""
+    stats = GroupedStats()
+    key, value = table.c[key_column], table.c[value_column]
+    async for chunk in iter_chunks(table, [key, value], chunk_size, where=value.isnot(None)):
+        keys: List[str] = []
+        values: List[float] = []
+        for group, number in chunk:
+            groups = group.split(", ") if group and explode else [group or UNKNOWN_GROUP]
+            keys.extend(groups)
+            values.extend([number] * len(groups))
+        stats.update(keys, values)
+    return stats.result()
+
+
+async def mass_by_species(chunk_size: int = EXPORT_CHUNK_SIZE) -> Dict[str, Dict[str, float]]:
+    """Статистика массы персонажей по видам"""
+    return await grouped_stats(Character.__table__, "species", "mass_kg", chunk_size)
+
+
+async def population_by_climate(chunk_size: int = EXPORT_CHUNK_SIZE) -> Dict[str, Dict[str, float]]:
+    """Население планет по климату"""
+    return await grouped_stats(Planet.__table__, "climate", "population_num", chunk_size)
+
+
+async def summary(chunk_size: int = EXPORT_CHUNK_SIZE) -> Dict[str, Any]:
+    """Все сводки"""
+    try:
+        return {
+            "mass_by_species": await mass_by_species(chunk_size),
+            "population_by_climate": await population_by_climate(chunk_size),
+        }
+    finally:
+        await engine.dispose()
+
+
+def parse_args() -> argparse.Namespace:
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Сводная статистика по числовым колонкам")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Строк в одном пакете")
+    parser.add_argument("--output", help="Файл для JSON-сводки (по умолчанию — stdout)")
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default=LOG_FORMAT, help="text или json")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="Уровень логирования (INFO, DEBUG, ...)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(log_format=args.log_format, level=args.log_level)
+    result = json.dumps(asyncio.run(summary(args.chunk_size)), indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(result)
+    else:
+        print(result)
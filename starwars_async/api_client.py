@@ -1,47 +1,230 @@
 import aiohttp
 import asyncio
-from typing import Optional, Dict, Any, List
+import os
+import time
+from functools import partial
+from typing import Optional, Dict, Any, List, Callable, Awaitable, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from starwars_async.cache import ReferenceCache
+from starwars_async.http_cache import CachedResponse, HttpCache
+from starwars_async.latency import HedgeBudget, LatencyTracker
+from starwars_async.metrics import endpoint_label, metrics
+from starwars_async.rate_limiter import get_limiter, jittered_backoff, parse_retry_after
+from starwars_async.transport import PROPERTIES_PATH, extract, loads
 
 # Конфигурация
-BASE_URL = "https://www.swapi.tech/api/"
-REQUEST_TIMEOUT = 30  # секунд
+BASE_URL = os.getenv("SWAPI_BASE_URL", "https://www.swapi.tech/api/")
+REQUEST_TIMEOUT = 30  # секунд, верхняя граница дедлайна попытки (пока нет статистики задержек)
 MAX_RETRIES = 3
-CONCURRENT_REQUESTS_LIMIT = 5
+LIST_PAGE_SIZE = 100  # сущностей на страницу списка
 
+# Функция разрешения ссылки: (session, url) -> properties
+Resolver = Callable[[aiohttp.ClientSession, str], Awaitable[Optional[Dict[str, Any]]]]
 
-async def fetch_with_retry(
+# Общий для процесса кэш URL → properties
+reference_cache = ReferenceCache()
+
+# Постоянный кэш HTTP-ответов (режим задаётся HTTP_CACHE_MODE: off / on / offline)
+http_cache = HttpCache()
+
+# Задержки ответов по endpoint: дедлайн попытки и порог дублирования запросов
+latency = LatencyTracker(default_deadline=REQUEST_TIMEOUT)
+hedge_budget = HedgeBudget()  # дублирование включается HTTP_HEDGING=on или --hedge
+
+
+async def _request_once(
         session: aiohttp.ClientSession,
         url: str,
-        max_retries: int = MAX_RETRIES
-) -> Optional[Dict[str, Any]]:
-    """Выполнение запроса с повторами при ошибках"""
+        endpoint: str,
+        headers: Dict[str, str],
+        cached: Optional[CachedResponse],
+        deadline: float,
+        sent: Optional[asyncio.Event] = None
+) -> Tuple[str, Any]:
+    """Одна попытка запроса в слоте лимитера (sent — сигнал, что слот получен и запрос отправлен).
+
+    Возвращает ("ok", JSON), ("throttled", Retry-After) или ("status", код ответа);
+    сетевые ошибки и некорректный JSON пробрасываются.
+    """
+    limiter = get_limiter(url)
+    waited = time.perf_counter()
+    async with limiter.slot():
+        started = time.perf_counter()
+        metrics.observe("http_slot_wait_seconds", started - waited, endpoint=endpoint)
+        if sent is not None:
+            sent.set()
+        async with metrics.in_flight("http_in_flight", endpoint=endpoint):
+            async with session.get(url.strip(), headers=headers, timeout=deadline) as response:
+                metrics.inc("http_responses_total", endpoint=endpoint, status=response.status)
+                if response.status == 304 and cached:  # Не изменилось с прошлой загрузки
+                    limiter.on_success()
+                    await http_cache.touch(url)
+                    latency.record(endpoint, time.perf_counter() - started)
+                    metrics.observe("http_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+                    return "ok", loads(cached.body)
+                if response.status == 429 or response.status >= 500:  # Rate limiting / перегрузка
+                    return "throttled", parse_retry_after(response.headers.get("Retry-After"))
+                if response.status != 200:
+                    return "status", response.status
+
+                limiter.on_success()
+                body = await response.read()
+                latency.record(endpoint, time.perf_counter() - started)
+                metrics.observe("http_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+                data = loads(body)
+                if http_cache.enabled:
+                    await http_cache.put(
+                        url,
+                        body,
+                        response.headers.get("ETag"),
+                        response.headers.get("Last-Modified"),
+                    )
+                return "ok", data
+
+
+async def _request_hedged(
+        session: aiohttp.ClientSession,
+        url: str,
+        endpoint: str,
+        headers: Dict[str, str],
+        cached: Optional[CachedResponse]
+) -> Tuple[str, Any]:
+    """Попытка с дедлайном по перцентилям; при включённом дублировании — второй запрос,
+    если первый не ответил за p95, и результат того, что ответит раньше"""
+    request = partial(_request_once, session, url, endpoint, headers, cached, latency.deadline(endpoint))
+    # Доля дублирования считается от всех попыток, включая отправленные до набора выборки задержек
+    hedge_budget.record_request()
+    hedge_after = latency.hedge_delay(endpoint) if hedge_budget.enabled else None
+    if hedge_after is None:
+        return await request()
+
+    sent = asyncio.Event()
+    primary = asyncio.ensure_future(request(sent=sent))
+    # Отсчёт до дублирования — с отправки запроса, а не с ожидания слота лимитера
+    sending = asyncio.ensure_future(sent.wait())
+    await asyncio.wait({primary, sending}, return_when=asyncio.FIRST_COMPLETED)
+    sending.cancel()
+    done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+    if done or not hedge_budget.try_spend():
+        return await primary
+
+    metrics.inc("http_hedges_total", endpoint=endpoint)
+    hedge = asyncio.ensure_future(request())
+    pending = {primary, hedge}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and task.result()[0] == "ok":
+                    if task is hedge:
+                        metrics.inc("http_hedge_wins_total", endpoint=endpoint)
+                    return task.result()
+        # Оба запроса неудачны: решение о повторе — по первому
+        return primary.result()
+    finally:
+        for task in (primary, hedge):
+            task.cancel()
+        await asyncio.gather(primary, hedge, return_exceptions=True)
+
+
+async def fetch_json_with_retry(
+        session: aiohttp.ClientSession,
+        url: str,
+        max_retries: int = MAX_RETRIES,
+        path: Sequence[str] = ()
+) -> Optional[Any]:
+    """Выполнение запроса с повторами при ошибках.
+
+    Возвращает JSON ответа или только его поддерево по пути ключей path
+    (None, если поддерева нет).
+    """
+    endpoint = endpoint_label(url)
+    cached = await http_cache.get(url) if http_cache.enabled else None
+    if http_cache.offline:
+        # Офлайн-режим: только ответы из кэша
+        metrics.inc("http_cache_total", endpoint=endpoint, result="offline_hit" if cached else "offline_miss")
+        return extract(loads(cached.body), path) if cached else None
+    if cached and cached.is_fresh(http_cache.max_age):
+        metrics.inc("http_cache_total", endpoint=endpoint, result="fresh_hit")
+        return extract(loads(cached.body), path)
+    headers = cached.conditional_headers() if cached else {}
+
+    limiter = get_limiter(url)
     for attempt in range(max_retries):
+        delay = None
+        reason = None
+        if attempt:
+            metrics.inc("http_retries_total", endpoint=endpoint)
         try:
-            async with session.get(url.strip(), timeout=REQUEST_TIMEOUT) as response:
-                if response.status == 429:  # Rate limiting
-                    wait_time = 2 ** (attempt + 1)  # Экспоненциальная задержка
-                    await asyncio.sleep(wait_time)
-                    continue
-                if response.status != 200:
-                    if attempt == max_retries - 1:
-                        return None
-                    continue
-
-                data = await response.json()
-
-                # Проверяем структуру ответа
-                if not data or "result" not in data or "properties" not in data["result"]:
-                    return None
-
-                return data["result"]["properties"]
+            result, value = await _request_hedged(session, url, endpoint, headers, cached)
+            if result == "ok":
+                return extract(value, path)
+            if result == "throttled":
+                delay = limiter.on_throttle(attempt, value)
+                reason = "throttled"
+            elif attempt == max_retries - 1:
+                break
+            else:
+                continue
 
         except (aiohttp.ClientError, asyncio.TimeoutError):
+            metrics.inc("http_errors_total", endpoint=endpoint, error="network")
             if attempt == max_retries - 1:
-                return None
-            await asyncio.sleep(1 * (attempt + 1))
+                break
+            delay = limiter.on_throttle(attempt)
+            reason = "network"
+        except ValueError:  # Некорректный JSON
+            metrics.inc("http_errors_total", endpoint=endpoint, error="json")
+            if attempt == max_retries - 1:
+                break
+            delay = jittered_backoff(attempt)
+            reason = "json"
+
+        # Ожидание вне слота, чтобы не занимать лимит параллельности
+        if delay is not None and attempt < max_retries - 1:
+            metrics.inc("http_backoff_seconds_total", delay, endpoint=endpoint, reason=reason)
+            await asyncio.sleep(delay)
+    metrics.inc("http_failures_total", endpoint=endpoint)
     return None
 
 
+async def fetch_with_retry(
+        session: aiohttp.ClientSession,
+        url: str,
+        max_retries: int = MAX_RETRIES
+) -> Optional[Dict[str, Any]]:
+    """Выполнение запроса с повторами при ошибках"""
+    # Из ответа сохраняются только properties, остальная структура сразу отбрасывается
+    return await fetch_json_with_retry(session, url, max_retries, path=PROPERTIES_PATH)
+
+
+def list_page_url(url: str, page_size: int = LIST_PAGE_SIZE) -> str:
+    """URL страницы списка с раскрытыми properties (expanded=true) и увеличенным limit"""
+    parts = urlsplit(url.strip())
+    query = dict(parse_qsl(parts.query))
+    query.setdefault("page", "1")
+    query["limit"] = str(page_size)
+    query["expanded"] = "true"
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+async def fetch_page(session: aiohttp.ClientSession, url: str) -> Optional[Dict[str, Any]]:
+    """Загрузка страницы списка сущностей (results и ссылка next)"""
+    data = await fetch_json_with_retry(session, url)
+    if data and isinstance(data.get("result"), list):
+        # films отдаются одним списком в result, без пагинации
+        data = {"results": data["result"], "next": None}
+    if not data or "results" not in data:
+        return None
+    return data
+
+
+async def fetch_reference(session: aiohttp.ClientSession, url: str) -> Optional[Dict[str, Any]]:
+    """Загрузка сущности по URL через общий кэш (не более одного запроса на URL)"""
+    return await reference_cache.get_or_fetch(url, lambda: fetch_with_retry(session, url))
+
+
 def safe_join(items: List[Any], separator: str = ", ") -> str:
     """Безопасное объединение списка в строку"""
     if not items:
@@ -55,186 +238,3 @@ def extract_id(url: str) -> Optional[int]:
         return int(url.strip("/").split("/")[-1])
     except (ValueError, IndexError, AttributeError):
         return None
-
-
-async def fetch_character_data(session: aiohttp.ClientSession, character_id: int) -> Optional[Dict[str, Any]]:
-    """Загрузка данных о персонаже (обновленная версия)"""
-    url = f"{BASE_URL}people/{character_id}"
-    data = await fetch_with_retry(session, url)
-    if not data:
-        return None
-
-    # Получаем название родной планеты
-    homeworld_name = None
-    if data.get("homeworld"):
-        planet_data = await fetch_with_retry(session, data["homeworld"])
-        homeworld_name = planet_data.get("name") if planet_data else None
-
-    # Получаем названия фильмов
-    film_tasks = [fetch_with_retry(session, film_url) for film_url in data.get("films", [])]
-    film_results = await asyncio.gather(*film_tasks, return_exceptions=True)
-    films_names = [
-        film.get("title") for film in film_results
-        if not isinstance(film, Exception) and film
-    ]
-
-    # Получаем названия видов
-    species_tasks = [fetch_with_retry(session, species_url) for species_url in data.get("species", [])]
-    species_results = await asyncio.gather(*species_tasks, return_exceptions=True)
-    species_names = [
-        species.get("name") for species in species_results
-        if not isinstance(species, Exception) and species
-    ]
-
-    # Получаем названия кораблей
-    starship_tasks = [fetch_with_retry(session, starship_url) for starship_url in data.get("starships", [])]
-    starship_results = await asyncio.gather(*starship_tasks, return_exceptions=True)
-    starships_names = [
-        starship.get("name") for starship in starship_results
-        if not isinstance(starship, Exception) and starship
-    ]
-
-    # Получаем названия транспорта
-    vehicle_tasks = [fetch_with_retry(session, vehicle_url) for vehicle_url in data.get("vehicles", [])]
-    vehicle_results = await asyncio.gather(*vehicle_tasks, return_exceptions=True)
-    vehicles_names = [
-        vehicle.get("name") for vehicle in vehicle_results
-        if not isinstance(vehicle, Exception) and vehicle
-    ]
-
-    return {
-        "id": character_id,
-        "birth_year": data.get("birth_year"),
-        "eye_color": data.get("eye_color"),
-        "films": safe_join(films_names),
-        "gender": data.get("gender"),
-        "hair_color": data.get("hair_color"),
-        "height": data.get("height"),
-        "homeworld": homeworld_name,
-        "mass": data.get("mass"),
-        "name": data.get("name"),
-        "skin_color": data.get("skin_color"),
-        "species": safe_join(species_names),
-        "starships": safe_join(starships_names),
-        "vehicles": safe_join(vehicles_names),
-    }
-
-
-async def fetch_starship_data(session: aiohttp.ClientSession, starship_id: int) -> Optional[Dict[str, Any]]:
-    """Загрузка данных о звездолёте (обновленная версия)"""
-    url = f"{BASE_URL}starships/{starship_id}"
-    data = await fetch_with_retry(session, url)
-    if not data:
-        return None
-
-    # Получаем названия фильмов
-    film_tasks = [fetch_with_retry(session, film_url) for film_url in data.get("films", [])]
-    film_results = await asyncio.gather(*film_tasks, return_exceptions=True)
-    films_names = [
-        film.get("title") for film in film_results
-        if not isinstance(film, Exception) and film
-    ]
-
-    # Получаем названия пилотов
-    pilot_tasks = [fetch_with_retry(session, pilot_url) for pilot_url in data.get("pilots", [])]
-    pilot_results = await asyncio.gather(*pilot_tasks, return_exceptions=True)
-    pilots_names = [
-        pilot.get("name") for pilot in pilot_results
-        if not isinstance(pilot, Exception) and pilot
-    ]
-
-    return {
-        "id": starship_id,
-        "name": data.get("name", "unknown"),
-        "model": data.get("model", "unknown"),
-        "manufacturer": data.get("manufacturer", "unknown"),
-        "cost_in_credits": data.get("cost_in_credits", "unknown"),
-        "length": data.get("length", "unknown"),
-        "crew": data.get("crew", "unknown"),
-        "passengers": data.get("passengers", "unknown"),
-        "cargo_capacity": data.get("cargo_capacity", "unknown"),
-        "consumables": data.get("consumables", "unknown"),
-        "hyperdrive_rating": data.get("hyperdrive_rating", "unknown"),
-        "starship_class": data.get("starship_class", "unknown"),
-        "films": safe_join(films_names),
-        "pilots": safe_join(pilots_names),
-    }
-
-
-async def fetch_vehicle_data(session: aiohttp.ClientSession, vehicle_id: int) -> Optional[Dict[str, Any]]:
-    """Загрузка данных о транспорте (обновленная версия)"""
-    url = f"{BASE_URL}vehicles/{vehicle_id}"
-    data = await fetch_with_retry(session, url)
-    if not data:
-        return None
-
-    # Получаем названия фильмов
-    film_tasks = [fetch_with_retry(session, film_url) for film_url in data.get("films", [])]
-    film_results = await asyncio.gather(*film_tasks, return_exceptions=True)
-    films_names = [
-        film.get("title") for film in film_results
-        if not isinstance(film, Exception) and film
-    ]
-
-    # Получаем названия пилотов
-    pilot_tasks = [fetch_with_retry(session, pilot_url) for pilot_url in data.get("pilots", [])]
-    pilot_results = await asyncio.gather(*pilot_tasks, return_exceptions=True)
-    pilots_names = [
-        pilot.get("name") for pilot in pilot_results
-        if not isinstance(pilot, Exception) and pilot
-    ]
-
-    return {
-        "id": vehicle_id,
-        "name": data.get("name", "unknown"),
-        "model": data.get("model", "unknown"),
-        "manufacturer": data.get("manufacturer", "unknown"),
-        "cost_in_credits": data.get("cost_in_credits", "unknown"),
-        "length": data.get("length", "unknown"),
-        "crew": data.get("crew", "unknown"),
-        "passengers": data.get("passengers", "unknown"),
-        "cargo_capacity": data.get("cargo_capacity", "unknown"),
-        "consumables": data.get("consumables", "unknown"),
-        "vehicle_class": data.get("vehicle_class", "unknown"),
-        "films": safe_join(films_names),
-        "pilots": safe_join(pilots_names),
-    }
-
-
-async def fetch_planet_data(session: aiohttp.ClientSession, planet_id: int) -> Optional[Dict[str, Any]]:
-    """Загрузка данных о планете (обновленная версия)"""
-    url = f"{BASE_URL}planets/{planet_id}"
-    data = await fetch_with_retry(session, url)
-    if not data:
-        return None
-
-    # Получаем названия жителей
-    resident_tasks = [fetch_with_retry(session, resident_url) for resident_url in data.get("residents", [])]
-    resident_results = await asyncio.gather(*resident_tasks, return_exceptions=True)
-    residents_names = [
-        resident.get("name") for resident in resident_results
-        if not isinstance(resident, Exception) and resident
-    ]
-
-    # Получаем названия фильмов
-    film_tasks = [fetch_with_retry(session, film_url) for film_url in data.get("films", [])]
-    film_results = await asyncio.gather(*film_tasks, return_exceptions=True)
-    films_names = [
-        film.get("title") for film in film_results
-        if not isinstance(film, Exception) and film
-    ]
-
-    return {
-        "id": planet_id,
-        "name": data.get("name", "unknown"),
-        "diameter": data.get("diameter", "unknown"),
-        "rotation_period": data.get("rotation_period", "unknown"),
-        "orbital_period": data.get("orbital_period", "unknown"),
-        "gravity": data.get("gravity", "unknown"),
-        "population": data.get("population", "unknown"),
-        "climate": data.get("climate", "unknown"),
-        "terrain": data.get("terrain", "unknown"),
-        "surface_water": data.get("surface_water", "unknown"),
-        "residents": safe_join(residents_names),
-        "films": safe_join(films_names),
-    }
\ No newline at end of file
@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from starwars_async.fake_swapi import FakeSwapi, FakeSwapiConfig
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Конфигурация
+DEFAULT_SQLITE_URL = "sqlite+aiosqlite:///benchmark.sqlite"
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Пиковый RSS процесса, МБ (ru_maxrss в Linux — в КБ, в macOS — в байтах)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_worker(loader_kwargs: Dict[str, Any], trace_allocations: bool = False) -> Dict[str, Any]:
+    """Один прогон DataLoader.run() в отдельном процессе (SWAPI_BASE_URL и DATABASE_URL
+    уже заданы в окружении)"""
+    from sqlalchemy import event
+
+    from starwars_async.database import engine
+    from starwars_async.loader import DataLoader
+    from starwars_async.models import Base
+    from starwars_async.normalized import drop_compat_views
+
+    # Количество обращений к БД
+    round_trips = {"count": 0}
+
+    def count_round_trip(*args: Any) -> None:
+        round_trips["count"] += 1
+
+    # Чистая схема перед каждым прогоном
+    async with engine.begin() as conn:
+        await drop_compat_views(conn)
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_round_trip)
+    loader = DataLoader(**loader_kwargs)
+    if trace_allocations:
+        tracemalloc.start()
+    started = time.perf_counter()
+    await loader.run()
+    wall_time = time.perf_counter() - started
+    traced_peak = tracemalloc.get_traced_memory()[1] if trace_allocations else None
+    tracemalloc.stop()
+    event.remove(engine.sync_engine, "before_cursor_execute", count_round_trip)
+    await engine.dispose()
+
+    entities = sum(stats["written"] for stats in loader.writer.stats.values())
+    return {
+        "entities": entities,
+        "wall_time": round(wall_time, 3),
+        "entities_per_second": round(entities / wall_time, 1) if wall_time else 0.0,
+        "db_round_trips": round_trips["count"],
+        "peak_rss_mb": peak_rss_mb(),
+        "traced_peak_mb": round(traced_peak / (1024 * 1024), 1) if traced_peak is not None else None,
+    }
+
+
+async def run_target(
+        name: str,
+        database_url: str,
+        config: FakeSwapiConfig,
+        loader_kwargs: Dict[str, Any],
+        trace_allocations: bool = False
+) -> Dict[str, Any]:
+    """Прогон против свежего тестового сервера и одной базы данных"""
+    server = FakeSwapi(config)
+    base_url = await server.start()
+    env = {
+        **os.environ,
+        "SWAPI_BASE_URL": base_url,
+        "DATABASE_URL": database_url,
+        "HTTP_CACHE_MODE": "off",
+    }
+    try:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "starwars_async.benchmark", "--worker", json.dumps(loader_kwargs),
+            *(["--trace-allocations"] if trace_allocations else []),
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        stdout, _ = await process.communicate()
+    finally:
+        await server.stop()
+
+    if process.returncode != 0 or not stdout.strip():
+        raise RuntimeError(f"Benchmark worker for {name} failed with code {process.returncode}")
+
+    result = json.loads(stdout.decode().strip().splitlines()[-1])
+    result.update(
+        target=name,
+        http_requests=server.stats.requests,
+        http_statuses=dict(server.stats.statuses),
+    )
+    return result
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    """Таблица результатов"""
+    columns = (
+        "target", "entities", "wall_time", "entities_per_second", "http_requests", "db_round_trips",
+        "peak_rss_mb", "traced_peak_mb",
+    )
+    rows = [columns] + [tuple(str(result[column]) for column in columns) for result in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    return "\n".join("  ".join(value.ljust(width) for value, width in zip(row, widths)) for row in rows)
+
+
+def parse_args() -> argparse.Namespace:
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Бенчмарк загрузчика на локальной замене SWAPI")
+    parser.add_argument("--worker", metavar="LOADER_KWARGS", help=argparse.SUPPRESS)
+    parser.add_argument("--sqlite-url", default=DEFAULT_SQLITE_URL)
+    parser.add_argument("--postgres-url", help="URL PostgreSQL (postgresql+asyncpg://...) для второго прогона")
+    parser.add_argument("--scale", type=int, default=1, help="Множитель числа сущностей")
+    parser.add_argument("--link-scale", type=int, default=1, help="Множитель числа ссылок")
+    parser.add_argument("--latency", type=float, default=0.0, help="Средняя задержка ответа, секунд")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--rate-stall", type=float, default=0.0, help="Доля ответов с задержкой 5 с")
+    parser.add_argument("--hedge", action="store_true", help="Дублирование медленных запросов в загрузчике")
+    parser.add_argument("--two-phase", action="store_true")
+    parser.add_argument("--normalized", action="store_true")
+    parser.add_argument(
+        "--trace-allocations",
+        action="store_true",
+        help="Пик памяти по tracemalloc (заметно замедляет прогон)"
+    )
+    parser.add_argument("--json", dest="json_path", help="Сохранить результаты в JSON-файл")
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace) -> Optional[List[Dict[str, Any]]]:
+    if args.worker is not None:
+        print(json.dumps(await run_worker(json.loads(args.worker), args.trace_allocations)))
+        return None
+
+    config = FakeSwapiConfig(
+        scale=args.scale,
+        link_scale=args.link_scale,
+        latency=args.latency,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        rate_stall=args.rate_stall,
+    )
+    if args.hedge:
+        os.environ["HTTP_HEDGING"] = "on"  # наследуется процессом-воркером
+    loader_kwargs = {"two_phase": args.two_phase, "normalized": args.normalized}
+    targets = [("sqlite", args.sqlite_url)]
+    if args.postgres_url:
+        targets.append(("postgres", args.postgres_url))
+
+    results = []
+    for name, database_url in targets:
+        logger.info(f"Benchmarking {name} (scale={args.scale}, latency={args.latency})...")
+        results.append(await run_target(name, database_url, config, loader_kwargs, args.trace_allocations))
+
+    print(format_report(results))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main(parse_args()))
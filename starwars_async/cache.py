@@ -0,0 +1,101 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Конфигурация
+REFERENCE_CACHE_SIZE = 4096  # записей
+REFERENCE_CACHE_TTL = 3600  # секунд
+
+
+def normalize_url(url: str) -> str:
+    """Приведение URL к единому виду для ключа кэша"""
+    return url.strip().rstrip("/")
+
+
+class ReferenceCache:
+    """Общий LRU/TTL-кэш URL → properties с дедупликацией одновременных запросов"""
+
+    def __init__(self, max_size: int = REFERENCE_CACHE_SIZE, ttl: Optional[float] = REFERENCE_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.in_flight_hits = 0
+
+    def _get_fresh(self, key: str) -> Tuple[bool, Any]:
+        """Поиск неустаревшей записи (с обновлением порядка LRU)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+
+        stored_at, value = entry
+        if self.ttl is not None and time.monotonic() - stored_at >= self.ttl:
+            del self._entries[key]
+            return False, None
+
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: str, task: asyncio.Task) -> None:
+        """Сохранение результата завершившегося запроса"""
+        self._in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        value = task.result()
+        # Неудачные запросы не кэшируем, чтобы их можно было повторить
+        if value is None:
+            return
+        self._put(key, value)
+
+    def _put(self, key: str, value: Any) -> None:
+        """Запись значения с вытеснением самых старых записей"""
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def put(self, url: str, value: Any) -> None:
+        """Добавление уже загруженных properties (например, со страницы списка)"""
+        if value is not None:
+            self._put(normalize_url(url), value)
+
+    async def get_or_fetch(self, url: str, fetch: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """Получение значения из кэша или однократная загрузка через fetch"""
+        key = normalize_url(url)
+
+        found, value = self._get_fresh(key)
+        if found:
+            self.hits += 1
+            return value
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.in_flight_hits += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(fetch())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._store(key, t))
+
+        # shield: отмена одного ожидающего не должна отменять общий запрос
+        return await asyncio.shield(task)
+
+    def clear(self) -> None:
+        """Очистка кэша и счётчиков"""
+        self._entries.clear()
+        self.hits = self.misses = self.in_flight_hits = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики попаданий и промахов"""
+        lookups = self.hits + self.in_flight_hits + self.misses
+        return {
+            "hits": self.hits,
+            "in_flight_hits": self.in_flight_hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": round((self.hits + self.in_flight_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,45 @@
+from typing import Dict, Iterable, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from starwars_async.models import DataVersion
+
+
+def build_version_bump(dialect_name: str):
+    """INSERT ... ON CONFLICT DO UPDATE с увеличением версии таблицы"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upsert is not supported for dialect {dialect_name}")
+
+    table = DataVersion.__table__
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.table_name],
+        set_={
+            "version": table.c.version + 1,
+            "updated_at": func.now(),  # onupdate модели в ON CONFLICT не срабатывает
+        },
+    )
+
+
+async def bump_versions(db: Union[AsyncSession, AsyncConnection], table_names: Iterable[str]) -> None:
+    """Увеличение версий таблиц в текущей транзакции записи.
+
+    Версия меняется вместе с данными (в том же коммите), поэтому читатели,
+    сравнивающие версии, не пропускают изменений и не видят лишних.
+    """
+    rows = [{"table_name": name, "version": 1} for name in sorted(set(table_names))]
+    if rows:
+        dialect = db.bind.dialect if isinstance(db, AsyncSession) else db.dialect
+        await db.execute(build_version_bump(dialect.name), rows)
+
+
+async def load_versions(db: Union[AsyncSession, AsyncConnection]) -> Dict[str, int]:
+    """Текущие версии всех таблиц"""
+    table = DataVersion.__table__
+    result = await db.execute(select(table.c.table_name, table.c.version))
+    return dict(result.all())
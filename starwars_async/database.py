@@ -1,29 +1,143 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from dotenv import load_dotenv
 import os
+import time
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from starwars_async.metrics import metrics
+# Базовый класс моделей: все таблицы объявлены в models, init_db создаёт их по этим метаданным
+from starwars_async.models import Base
 
 # Загружаем переменные окружения
 load_dotenv()
 
-# Базовый класс для моделей
-Base = declarative_base()
-
-# Получаем URL базы данных
+# Конфигурация
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_WRITE_CONCURRENCY = int(os.getenv("DB_WRITE_CONCURRENCY", "4"))  # пакетов, записываемых одновременно
+DB_POOL_RESERVE = 4  # соединений сверх записи пакетов: чекпоинты, dead_letters, нормализованная схема
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "0"))  # 0 — по конкурентности записи (+ резерв)
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = 30.0  # секунд ожидания свободного соединения
+DB_POOL_RECYCLE = 3600  # секунд жизни соединения
+DB_STATEMENT_CACHE_SIZE = 500  # подготовленных выражений на соединение asyncpg (по умолчанию 100)
+SQLITE_BUSY_TIMEOUT = 30000  # мс ожидания блокировки записи SQLite
+SQLITE_CACHE_SIZE = -65536  # страничный кэш SQLite, отрицательное значение — в КиБ (64 МиБ)
+
+
+def write_concurrency(url: Optional[str] = DATABASE_URL) -> int:
+    """Одновременных записей пакетов: у SQLite один писатель, остальные только ждали бы блокировку"""
+    return 1 if url and make_url(url).get_backend_name() == "sqlite" else DB_WRITE_CONCURRENCY
+
+
+# Значение по умолчанию для BulkWriter (пул движка рассчитан на него)
+WRITE_CONCURRENCY = write_concurrency()
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Пул с замером ожидания соединения.
+
+    Ожидание в _do_get — время, которое запрос стоит в очереди к пулу:
+    при заниженном пуле оно растёт раньше, чем появляются таймауты.
+    """
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            metrics.inc("db_pool_timeouts_total")
+            raise
+        metrics.observe("db_pool_wait_seconds", time.perf_counter() - started)
+        return connection
+
+
+def _track_checkouts(engine: AsyncEngine) -> None:
+    """Gauge соединений, выданных из пула"""
 
-# Создаем асинхронный движок
-engine = create_async_engine(DATABASE_URL, echo=True)
+    @event.listens_for(engine.sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        metrics.gauge_add("db_pool_checked_out", 1)
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record) -> None:
+        metrics.gauge_add("db_pool_checked_out", -1)
+
+
+def _tune_sqlite(engine: AsyncEngine) -> None:
+    """Настройки SQLite для пакетной записи на каждом новом соединении.
+
+    WAL: чтение не блокирует запись и наоборот; synchronous=NORMAL — fsync
+    только при контрольных точках WAL, а не на каждый коммит пакета (при
+    сбое питания теряются последние коммиты, но база остаётся целой).
+    """
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+
+def create_engine(
+        url: Optional[str] = DATABASE_URL,
+        pool_size: int = DB_POOL_SIZE,
+        echo: bool = False
+) -> AsyncEngine:
+    """Движок БД для всех модулей: пул по конкурентности записи, метрики пула,
+    кэш подготовленных выражений asyncpg и настройки SQLite для пакетной записи
+    """
+    if not url:
+        raise ValueError("DATABASE_URL is not set")
+    parsed = make_url(url)
+    sqlite = parsed.get_backend_name() == "sqlite"
+    options: Dict[str, Any] = {"echo": echo}
+    # БД SQLite в памяти живёт в одном соединении (StaticPool диалекта), пул не настраивается
+    if not (sqlite and parsed.database in (None, "", ":memory:")):
+        options.update(
+            poolclass=MeteredPool,
+            pool_size=pool_size or write_concurrency(url) + DB_POOL_RESERVE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    if parsed.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+
+    engine = create_async_engine(url, **options)
+    _track_checkouts(engine)
+    if sqlite:
+        _tune_sqlite(engine)
+    return engine
+
+
+# Общий движок (SQL в лог — только при SQL_ECHO=info/debug, см. logging_config)
+engine = create_engine()
 
 # Фабрика сессий
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+
+def pool_status() -> str:
+    """Состояние пула для логов (размер, выдано, переполнение)"""
+    return engine.pool.status()
+
+
 async def get_db_session():
     """Генератор сессий базы данных"""
     async with AsyncSessionLocal() as session:
         yield session
 
+
 async def init_db():
     """Инициализация базы данных - создание таблиц"""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
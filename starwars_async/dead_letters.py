@@ -0,0 +1,118 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from starwars_async.database import AsyncSessionLocal
+from starwars_async.models import DeadLetter
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация
+MAX_REASON_LENGTH = 2000  # символов
+
+
+@dataclass
+class FailedEntity:
+    """Сущность, которую не удалось загрузить"""
+    entity_type: str
+    entity_id: int
+    url: Optional[str]
+    stage: str  # fetch / relations / write / deadline
+    reason: str
+    attempts: int = 1
+
+
+def build_dead_letter_upsert(dialect_name: str):
+    """INSERT ... ON CONFLICT DO UPDATE с увеличением счётчика попыток"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upsert is not supported for dialect {dialect_name}")
+
+    table = DeadLetter.__table__
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.entity_type, table.c.entity_id],
+        set_={
+            "url": stmt.excluded.url,
+            "stage": stmt.excluded.stage,
+            "reason": stmt.excluded.reason,
+            "attempts": table.c.attempts + 1,
+            "updated_at": func.now(),  # onupdate модели в ON CONFLICT не срабатывает
+        },
+    )
+
+
+class DeadLetterStore:
+    """Таблица dead_letters: сбойные сущности с причиной и числом попыток.
+
+    Сбои копятся в памяти и записываются пакетом в flush(); загрузчик
+    вызывает flush() до сохранения чекпоинта, поэтому сбойная сущность
+    не теряется, даже если её страница уже пройдена.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = AsyncSessionLocal):
+        self.session_factory = session_factory
+        self._pending: Dict[Tuple[str, int], FailedEntity] = {}
+        self.recorded = 0
+
+    def add(self, entity_type: str, entity_id: int, url: Optional[str], stage: str, reason: str) -> None:
+        """Запоминание сбоя (повторный сбой той же сущности в одном запуске учитывается один раз)"""
+        self._pending[(entity_type, entity_id)] = FailedEntity(
+            entity_type, entity_id, url, stage, reason[:MAX_REASON_LENGTH]
+        )
+
+    async def flush(self) -> None:
+        """Запись накопленных сбоев"""
+        if not self._pending:
+            return
+        failures, self._pending = list(self._pending.values()), {}
+        async with self.session_factory() as db_session:
+            async with db_session.begin():
+                await db_session.execute(build_dead_letter_upsert(db_session.bind.dialect.name), [
+                    {
+                        "entity_type": failure.entity_type,
+                        "entity_id": failure.entity_id,
+                        "url": failure.url,
+                        "stage": failure.stage,
+                        "reason": failure.reason,
+                        "attempts": failure.attempts,
+                    }
+                    for failure in failures
+                ])
+        self.recorded += len(failures)
+        logger.warning(f"Saved {len(failures)} failed entities to dead_letters")
+
+    async def load(
+            self,
+            entity_types: Optional[Iterable[str]] = None,
+            max_attempts: Optional[int] = None
+    ) -> List[FailedEntity]:
+        """Сбойные сущности для повторной загрузки"""
+        query = select(DeadLetter).order_by(DeadLetter.entity_type, DeadLetter.entity_id)
+        if entity_types:
+            query = query.where(DeadLetter.entity_type.in_(list(entity_types)))
+        if max_attempts is not None:
+            query = query.where(DeadLetter.attempts < max_attempts)
+        async with self.session_factory() as db_session:
+            result = await db_session.execute(query)
+            return [
+                FailedEntity(row.entity_type, row.entity_id, row.url, row.stage, row.reason or "", row.attempts)
+                for row in result.scalars()
+            ]
+
+    async def resolve(self, keys: Iterable[Tuple[str, int]]) -> None:
+        """Удаление успешно загруженных сущностей"""
+        keys = list(keys)
+        if not keys:
+            return
+        async with self.session_factory() as db_session:
+            async with db_session.begin():
+                await db_session.execute(
+                    delete(DeadLetter).where(tuple_(DeadLetter.entity_type, DeadLetter.entity_id).in_(keys))
+                )
@@ -0,0 +1,160 @@
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+import aiohttp
+
+from starwars_async.api_client import Resolver, fetch_reference, safe_join
+from starwars_async.models import Base, Character, Film, Planet, Species, Starship, Vehicle
+from starwars_async.parsing import parse_float, parse_int, parse_range_max, parse_range_min
+from starwars_async.records import EntityRecord, clean_value, record_type
+
+
+@dataclass(frozen=True)
+class Relation:
+    """Ссылка из properties: колонка получает атрибут связанной сущности (name/title)"""
+    field: str
+    attribute: str = "name"
+    many: bool = True  # список URL → имена через запятую; иначе один URL → одно имя
+
+
+@dataclass(frozen=True)
+class EntitySpec:
+    """Описание типа сущности: endpoint, модель, скалярные поля и связи.
+
+    Новый тип загружается добавлением спецификации в ENTITY_SPECS —
+    отдельная функция загрузки не нужна.
+    """
+    endpoint: str
+    entity_type: str
+    model: Type[Base]
+    fields: Tuple[str, ...]
+    relations: Tuple[Tuple[str, Relation], ...] = ()  # колонка → связь
+    parsers: Tuple[Tuple[str, Callable[[Any], Any]], ...] = ()  # нестроковые колонки
+    numeric: Tuple[Tuple[str, str, Callable[[Any], Any]], ...] = ()  # числовая колонка ← (поле, разбор)
+    default: Optional[str] = "unknown"  # значение отсутствующего поля
+    record: Type[EntityRecord] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Класс записи со слотами под все колонки таблицы модели
+        columns = [column.name for column in self.model.__table__.columns]
+        object.__setattr__(self, "record", record_type(f"{self.model.__name__}Record", columns))
+
+
+async def build_entity(
+        spec: EntitySpec,
+        session: aiohttp.ClientSession,
+        entity_id: int,
+        data: Dict[str, Any],
+        resolve: Optional[Resolver] = None
+) -> EntityRecord:
+    """Сборка очищенной записи из properties за один проход; все ссылки
+    сущности разрешаются одной волной"""
+    resolve = resolve or fetch_reference
+
+    references: List[Tuple[str, str, str]] = []  # (колонка, атрибут, URL)
+    for column, relation in spec.relations:
+        value = data.get(relation.field)
+        urls = (value or []) if relation.many else ([value] if value else [])
+        references.extend((column, relation.attribute, url) for url in urls)
+
+    results = await asyncio.gather(
+        *(resolve(session, url) for _, _, url in references),
+        return_exceptions=True
+    )
+    names: Dict[str, List[Any]] = defaultdict(list)
+    for (column, attribute, _), result in zip(references, results):
+        if result and not isinstance(result, Exception):
+            names[column].append(result.get(attribute))
+
+    record = spec.record()
+    record.id = entity_id
+    for name in spec.fields:
+        setattr(record, name, clean_value(data.get(name, spec.default)))
+    for column, parse in spec.parsers:
+        setattr(record, column, parse(getattr(record, column)))
+    for column, source, parse in spec.numeric:
+        setattr(record, column, parse(getattr(record, source)))
+    for column, relation in spec.relations:
+        if relation.many:
+            value = clean_value(safe_join(names[column]), intern=False)
+        else:
+            value = clean_value(names[column][0]) if names[column] else None
+        setattr(record, column, value)
+    return record
+
+
+FILMS = Relation("films", "title")
+
+# Числовые колонки кораблей и транспорта ("30-165" → crew_min/crew_max)
+CRAFT_NUMERIC = (
+    ("cost_in_credits_num", "cost_in_credits", parse_int),
+    ("length_m", "length", parse_float),
+    ("crew_min", "crew", parse_range_min),
+    ("crew_max", "crew", parse_range_max),
+    ("passengers_num", "passengers", parse_int),
+)
+
+ENTITY_SPECS: List[EntitySpec] = [
+    EntitySpec(
+        endpoint="planets",
+        entity_type="planet",
+        model=Planet,
+        fields=("name", "diameter", "rotation_period", "orbital_period", "gravity", "population",
+                "climate", "terrain", "surface_water"),
+        relations=(("residents", Relation("residents")), ("films", FILMS)),
+        numeric=(("diameter_km", "diameter", parse_int), ("population_num", "population", parse_int)),
+    ),
+    EntitySpec(
+        endpoint="people",
+        entity_type="character",
+        model=Character,
+        fields=("birth_year", "eye_color", "gender", "hair_color", "height", "mass", "name", "skin_color"),
+        relations=(
+            ("homeworld", Relation("homeworld", many=False)),
+            ("films", FILMS),
+            ("species", Relation("species")),
+            ("starships", Relation("starships")),
+            ("vehicles", Relation("vehicles")),
+        ),
+        numeric=(("height_cm", "height", parse_int), ("mass_kg", "mass", parse_float)),
+        default=None,
+    ),
+    EntitySpec(
+        endpoint="starships",
+        entity_type="starship",
+        model=Starship,
+        fields=("name", "model", "manufacturer", "cost_in_credits", "length", "crew", "passengers",
+                "cargo_capacity", "consumables", "hyperdrive_rating", "starship_class"),
+        relations=(("films", FILMS), ("pilots", Relation("pilots"))),
+        numeric=CRAFT_NUMERIC,
+    ),
+    EntitySpec(
+        endpoint="vehicles",
+        entity_type="vehicle",
+        model=Vehicle,
+        fields=("name", "model", "manufacturer", "cost_in_credits", "length", "crew", "passengers",
+                "cargo_capacity", "consumables", "vehicle_class"),
+        relations=(("films", FILMS), ("pilots", Relation("pilots"))),
+        numeric=CRAFT_NUMERIC,
+    ),
+    EntitySpec(
+        endpoint="films",
+        entity_type="film",
+        model=Film,
+        fields=("title", "episode_id", "director", "producer", "release_date"),
+        parsers=(("episode_id", parse_int),),
+        default=None,
+    ),
+    EntitySpec(
+        endpoint="species",
+        entity_type="species",
+        model=Species,
+        fields=("name", "classification", "designation", "language"),
+        default=None,
+    ),
+]
+
+SPECS_BY_TYPE: Dict[str, EntitySpec] = {spec.entity_type: spec for spec in ENTITY_SPECS}
+SPECS_BY_TABLE: Dict[str, EntitySpec] = {spec.model.__tablename__: spec for spec in ENTITY_SPECS}
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from starwars_async.api_client import BASE_URL, fetch_page, fetch_reference, list_page_url
+from starwars_async.http_cache import normalize_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Все типы, на которые ссылаются сущности
+INDEX_ENDPOINTS = ("planets", "people", "starships", "vehicles", "films", "species")
+
+
+def parse_entity_url(url: str) -> Optional[Tuple[str, int]]:
+    """Разбор URL сущности на (endpoint, id)"""
+    parts = urlsplit(url.strip()).path.rstrip("/").split("/")
+    try:
+        return parts[-2], int(parts[-1])
+    except (ValueError, IndexError):
+        return None
+
+
+class EntityIndex:
+    """Индекс id → properties для двухфазной загрузки.
+
+    Фаза 1 загружает раскрытые страницы списков всех типов; фаза 2 разрешает
+    ссылки между сущностями поиском в словаре вместо HTTP-запросов.
+    """
+
+    def __init__(self):
+        self.records: Dict[str, Dict[int, Dict[str, Any]]] = {endpoint: {} for endpoint in INDEX_ENDPOINTS}
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        self.local_hits = 0
+        self.fallbacks = 0
+
+    def add(self, url: str, properties: Dict[str, Any]) -> None:
+        """Добавление properties сущности"""
+        parsed = parse_entity_url(url)
+        if parsed is None:
+            return
+        endpoint, entity_id = parsed
+        self.records.setdefault(endpoint, {})[entity_id] = properties
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Поиск сущности по URL"""
+        parsed = parse_entity_url(url)
+        if parsed is None:
+            return None
+        endpoint, entity_id = parsed
+        return self.records.get(endpoint, {}).get(entity_id)
+
+    def get_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """Страница списка, загруженная в фазе 1"""
+        return self.pages.get(normalize_cache_key(url))
+
+    async def resolve(self, session: aiohttp.ClientSession, url: str) -> Optional[Dict[str, Any]]:
+        """Разрешение ссылки из индекса (HTTP — только если сущности нет в индексе)"""
+        record = self.get(url)
+        if record is not None:
+            self.local_hits += 1
+            return record
+        self.fallbacks += 1
+        return await fetch_reference(session, url)
+
+    async def ingest(self, session: aiohttp.ClientSession, endpoint: str) -> None:
+        """Фаза 1 для одного типа: обход всех раскрытых страниц списка"""
+        url = f"{BASE_URL}{endpoint}/"
+        missing: List[str] = []
+        while url:
+            page_url = list_page_url(url)
+            page = await fetch_page(session, page_url)
+            if page is None:
+                logger.error(f"HTTP error indexing {endpoint} page {page_url}")
+                break
+            self.pages[normalize_cache_key(page_url)] = page
+            url = page.get("next")
+
+            for entity in page.get("results", []):
+                if not (entity_url := entity.get("url")):
+                    continue
+                if properties := entity.get("properties"):
+                    self.add(entity_url, properties)
+                else:
+                    missing.append(entity_url)
+
+        # Запасной вариант для страниц без properties
+        details = await asyncio.gather(*(fetch_reference(session, entity_url) for entity_url in missing))
+        for entity_url, properties in zip(missing, details):
+            if properties:
+                self.add(entity_url, properties)
+
+    async def ingest_all(self, session: aiohttp.ClientSession) -> None:
+        """Фаза 1: параллельная загрузка всех типов"""
+        await asyncio.gather(*(self.ingest(session, endpoint) for endpoint in INDEX_ENDPOINTS))
+        logger.info(
+            "Entity index built: "
+            + ", ".join(f"{endpoint}={len(records)}" for endpoint, records in self.records.items())
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики локальных разрешений и обращений к HTTP"""
+        return {
+            "records": sum(len(records) for records in self.records.values()),
+            "local_hits": self.local_hits,
+            "fallbacks": self.fallbacks,
+        }
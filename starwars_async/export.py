@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, List, Optional, Sequence
+
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, Integer, Table, select
+
+from starwars_async.database import engine
+from starwars_async.entities import ENTITY_SPECS
+from starwars_async.logging_config import LOG_FORMAT, LOG_FORMATS, LOG_LEVEL, setup_logging
+from starwars_async.writer import HASH_COLUMN
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Нужен только для parquet/arrow
+    pyarrow = None
+
+# Конфигурация
+EXPORT_FORMATS = ("csv", "parquet", "arrow")  # формат — он же расширение файла
+EXPORT_CHUNK_SIZE = 10000  # строк в одном чтении из БД и в одном row group
+
+
+def export_columns(table: Table) -> List[Any]:
+    """Колонки для выгрузки (служебный хэш строки не выгружается)"""
+    return [column for column in table.columns if column.name != HASH_COLUMN]
+
+
+async def iter_chunks(
+        table: Table,
+        columns: Optional[Sequence[Any]] = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+        where: Optional[Any] = None
+) -> AsyncIterator[List[tuple]]:
+    """Потоковое чтение таблицы пакетами (в памяти — не больше одного пакета)"""
+    query = (
+        select(*(columns if columns is not None else export_columns(table)))
+        .select_from(table)
+        .order_by(*table.primary_key.columns)
+        .execution_options(yield_per=chunk_size)
+    )
+    if where is not None:
+        query = query.where(where)
+    async with engine.connect() as conn:
+        result = await conn.stream(query)
+        async for partition in result.partitions(chunk_size):
+            yield [tuple(row) for row in partition]
+
+
+def arrow_type(column: Any):
+    """Тип Arrow для колонки SQLAlchemy"""
+    if isinstance(column.type, (Integer, BigInteger)):
+        return pyarrow.int64()
+    if isinstance(column.type, Float):
+        return pyarrow.float64()
+    if isinstance(column.type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column.type, DateTime):
+        return pyarrow.timestamp("us")
+    return pyarrow.string()
+
+
+class CsvExporter:
+    """Выгрузка в CSV с заголовком"""
+
+    def __init__(self, path: str, columns: Sequence[Any]):
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([column.name for column in columns])
+
+    def write(self, rows: List[tuple]) -> None:
+        self.writer.writerows(rows)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ArrowExporter:
+    """Выгрузка в Parquet (row group на пакет) или Arrow IPC (record batch на пакет)"""
+
+    def __init__(self, path: str, columns: Sequence[Any], export_format: str):
+        if pyarrow is None:
+            raise RuntimeError(f"{export_format} export requires pyarrow: pip install pyarrow")
+        self.schema = pyarrow.schema([(column.name, arrow_type(column)) for column in columns])
+        if export_format == "parquet":
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write(self, rows: List[tuple]) -> None:
+        arrays = [
+            pyarrow.array([row[index] for row in rows], type=field.type)
+            for index, field in enumerate(self.schema)
+        ]
+        self.writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def export_table(table: Table, output_dir: str, export_format: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> int:
+    """Выгрузка одной таблицы в файл; возвращает число строк"""
+    columns = export_columns(table)
+    path = os.path.join(output_dir, f"{table.name}.{export_format}")
+    if export_format == "csv":
+        exporter = CsvExporter(path, columns)
+    else:
+        exporter = ArrowExporter(path, columns, export_format)
+
+    rows = 0
+    try:
+        async for chunk in iter_chunks(table, columns, chunk_size):
+            exporter.write(chunk)
+            rows += len(chunk)
+    finally:
+        exporter.close()
+    logger.info(f"Exported {rows} rows of {table.name} to {path}")
+    return rows
+
+
+async def export_tables(
+        output_dir: str,
+        export_format: str = "csv",
+        table_names: Optional[Sequence[str]] = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE
+) -> None:
+    """Выгрузка таблиц сущностей"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    tables = [spec.model.__table__ for spec in ENTITY_SPECS]
+    if table_names:
+        tables = [table for table in tables if table.name in table_names]
+    os.makedirs(output_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    try:
+        total = 0
+        for table in tables:
+            total += await export_table(table, output_dir, export_format, chunk_size)
+    finally:
+        await engine.dispose()
+    logger.info(f"Export finished in {time.perf_counter() - started:.1f}s: {total} rows")
+
+
+def parse_args() -> argparse.Namespace:
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Потоковая выгрузка таблиц в CSV, Parquet или Arrow")
+    parser.add_argument("--format", dest="export_format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--output", default="export", help="Каталог для файлов (по файлу на таблицу)")
+    parser.add_argument(
+        "--table",
+        dest="tables",
+        action="append",
+        choices=[spec.model.__tablename__ for spec in ENTITY_SPECS],
+        help="Таблица (можно указать несколько раз); по умолчанию — все таблицы сущностей"
+    )
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Строк в одном пакете")
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default=LOG_FORMAT, help="text или json")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="Уровень логирования (INFO, DEBUG, ...)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(log_format=args.log_format, level=args.log_level)
+    asyncio.run(export_tables(args.output, args.export_format, args.tables, args.chunk_size))
@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация: размер исходного набора (как у swapi.tech)
+BASE_COUNTS = {"people": 82, "planets": 60, "starships": 36, "vehicles": 39, "films": 6, "species": 37}
+DEFAULT_PAGE_SIZE = 10
+
+# Связи: endpoint → поле → (целевой endpoint, ссылок на сущность при scale=1)
+LINKS = {
+    "people": {"films": ("films", 3), "species": ("species", 1), "starships": ("starships", 1), "vehicles": ("vehicles", 1)},
+    "planets": {"residents": ("people", 2), "films": ("films", 2)},
+    "starships": {"pilots": ("people", 1), "films": ("films", 2)},
+    "vehicles": {"pilots": ("people", 1), "films": ("films", 2)},
+    "films": {"characters": ("people", 18), "planets": ("planets", 5)},
+    "species": {"people": ("people", 2)},
+}
+
+COLORS = ("blue", "brown", "red", "yellow", "black", "green", "white", "grey")
+CLIMATES = ("arid", "temperate", "frozen", "murky", "tropical", "temperate, tropical")
+CLASSES = ("starfighter", "freighter", "corvette", "wheeled", "repulsorcraft", "transport")
+
+
+@dataclass
+class FakeSwapiConfig:
+    """Параметры тестового сервера"""
+    scale: int = 1  # множитель числа сущностей
+    link_scale: int = 1  # множитель числа ссылок на сущность
+    latency: float = 0.0  # средняя задержка ответа, секунд
+    rate_429: float = 0.0  # доля ответов 429
+    rate_5xx: float = 0.0  # доля ответов 503
+    rate_stall: float = 0.0  # доля «зависших» ответов (хвост задержек)
+    stall: float = 5.0  # задержка зависшего ответа, секунд
+    retry_after: Optional[float] = 1.0  # значение Retry-After для 429
+    seed: int = 42
+
+
+@dataclass
+class FakeSwapiStats:
+    """Счётчики запросов к серверу"""
+    requests: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    endpoints: Counter = field(default_factory=Counter)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "statuses": dict(self.statuses),
+            "endpoints": dict(self.endpoints),
+        }
+
+
+def generate_dataset(base_url: str, scale: int = 1, link_scale: int = 1, seed: int = 42) -> Dict[str, Dict[int, Dict[str, Any]]]:
+    """Синтетический набор данных в формате properties swapi.tech"""
+    rng = random.Random(seed)
+    counts = {endpoint: count * scale for endpoint, count in BASE_COUNTS.items()}
+    # Фильмов немного и при масштабировании — так ссылки на них остаются «горячими»
+    counts["films"] = BASE_COUNTS["films"]
+
+    def url(endpoint: str, entity_id: int) -> str:
+        return f"{base_url}{endpoint}/{entity_id}"
+
+    def links(endpoint: str) -> Dict[str, List[str]]:
+        result = {}
+        for field_name, (target, per_entity) in LINKS[endpoint].items():
+            amount = min(counts[target], rng.randint(0, per_entity * 2) * link_scale)
+            result[field_name] = [url(target, i) for i in sorted(rng.sample(range(1, counts[target] + 1), amount))]
+        return result
+
+    dataset: Dict[str, Dict[int, Dict[str, Any]]] = {endpoint: {} for endpoint in counts}
+    for endpoint, count in counts.items():
+        for entity_id in range(1, count + 1):
+            properties: Dict[str, Any] = {
+                "created": "2014-12-09T13:50:51.644000Z",
+                "edited": "2014-12-20T21:17:56.891000Z",
+                "url": url(endpoint, entity_id),
+            }
+            if endpoint == "films":
+                properties.update(
+                    title=f"Episode {entity_id}",
+                    episode_id=entity_id,
+                    director="George Lucas",
+                    producer="Rick McCallum",
+                    release_date=f"{1976 + entity_id * 3}-05-25",
+                )
+            else:
+                properties["name"] = f"{endpoint.title()} {entity_id}"
+
+            if endpoint == "people":
+                properties.update(
+                    birth_year=f"{rng.randint(8, 900)}BBY",
+                    eye_color=rng.choice(COLORS),
+                    gender=rng.choice(("male", "female", "n/a")),
+                    hair_color=rng.choice(COLORS + ("none",)),
+                    height=str(rng.randint(60, 260)),
+                    mass=rng.choice((str(rng.randint(20, 160)), "1,358", "unknown")),
+                    skin_color=rng.choice(COLORS),
+                    homeworld=url("planets", rng.randint(1, counts["planets"])),
+                )
+            elif endpoint == "planets":
+                properties.update(
+                    diameter=str(rng.randint(0, 120000)),
+                    rotation_period=str(rng.randint(6, 60)),
+                    orbital_period=str(rng.randint(100, 5000)),
+                    gravity="1 standard",
+                    population=rng.choice((str(rng.randint(1000, 10 ** 12)), "unknown")),
+                    climate=rng.choice(CLIMATES),
+                    terrain="desert",
+                    surface_water=str(rng.randint(0, 100)),
+                )
+            elif endpoint in ("starships", "vehicles"):
+                properties.update(
+                    model=f"Model {entity_id}",
+                    manufacturer=rng.choice(("Corellian Engineering Corporation", "Kuat Drive Yards", "Incom Corporation")),
+                    cost_in_credits=rng.choice((str(rng.randint(1000, 10 ** 9)), "unknown")),
+                    length=f"{rng.randint(5, 2000)}.{rng.randint(0, 9)}",
+                    crew=rng.choice((str(rng.randint(1, 50)), "30-165", "1,000")),
+                    passengers=str(rng.randint(0, 600)),
+                    cargo_capacity=str(rng.randint(0, 10 ** 6)),
+                    consumables=f"{rng.randint(1, 12)} months",
+                )
+                if endpoint == "starships":
+                    properties.update(hyperdrive_rating=f"{rng.randint(1, 4)}.0", starship_class=rng.choice(CLASSES))
+                else:
+                    properties["vehicle_class"] = rng.choice(CLASSES)
+            elif endpoint == "species":
+                properties.update(
+                    classification=rng.choice(("mammal", "reptile", "artificial")),
+                    designation="sentient",
+                    language=f"Language {entity_id}",
+                )
+
+            properties.update(links(endpoint))
+            dataset[endpoint][entity_id] = properties
+    return dataset
+
+
+def load_fixture(path: str, base_url: str) -> Dict[str, Dict[int, Dict[str, Any]]]:
+    """Загрузка набора данных из JSON: {endpoint: [properties, ...]}; ссылки переводятся на base_url"""
+    with open(path, encoding="utf-8") as fixture:
+        raw = json.loads(re.sub(r'https?://[^"/]+/api/', base_url, fixture.read()))
+    return {
+        endpoint: {int(item["url"].rstrip("/").split("/")[-1]): item for item in items}
+        for endpoint, items in raw.items()
+    }
+
+
+class FakeSwapi:
+    """Локальная замена swapi.tech на aiohttp с задержками и ошибками"""
+
+    def __init__(self, config: Optional[FakeSwapiConfig] = None, fixture: Optional[str] = None):
+        self.config = config or FakeSwapiConfig()
+        self.fixture = fixture
+        self.rng = random.Random(self.config.seed)
+        self.stats = FakeSwapiStats()
+        self.dataset: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self.base_url = ""
+        self._runner: Optional[web.AppRunner] = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/api/{endpoint}", self.handle_list)
+        app.router.add_get("/api/{endpoint}/", self.handle_list)
+        app.router.add_get("/api/{endpoint}/{entity_id}", self.handle_detail)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        """Учёт запросов, задержка и внедрение ошибок"""
+        self.stats.requests += 1
+        self.stats.endpoints[request.match_info.get("endpoint", "?")] += 1
+        if self.config.latency:
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.config.latency)
+        if self.config.rate_stall and self.rng.random() < self.config.rate_stall:
+            await asyncio.sleep(self.config.stall)
+
+        roll = self.rng.random()
+        if roll < self.config.rate_429:
+            headers = {"Retry-After": str(self.config.retry_after)} if self.config.retry_after is not None else {}
+            response = web.json_response({"message": "Too Many Requests"}, status=429, headers=headers)
+        elif roll < self.config.rate_429 + self.config.rate_5xx:
+            response = web.json_response({"message": "Service Unavailable"}, status=503)
+        else:
+            response = await handler(request)
+            if response.status == 200:
+                response = self._conditional(request, response)
+        self.stats.statuses[response.status] += 1
+        return response
+
+    def _conditional(self, request: web.Request, response: web.Response) -> web.Response:
+        """ETag по телу ответа и 304 на совпавший If-None-Match (как у swapi.tech за CDN)"""
+        etag = f'"{hashlib.sha1(response.body).hexdigest()[:16]}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return response
+
+    async def handle_list(self, request: web.Request) -> web.Response:
+        endpoint = request.match_info["endpoint"]
+        records = self.dataset.get(endpoint)
+        if records is None:
+            return web.json_response({"message": "not found"}, status=404)
+
+        expanded = request.query.get("expanded") == "true"
+        if endpoint == "films":
+            # Как у swapi.tech: фильмы одним списком в result
+            return web.json_response({
+                "message": "ok",
+                "result": [self._list_item(endpoint, i, props, True) for i, props in records.items()],
+            })
+
+        page = max(1, int(request.query.get("page", 1)))
+        limit = max(1, int(request.query.get("limit", DEFAULT_PAGE_SIZE)))
+        ids = sorted(records)
+        chunk = ids[(page - 1) * limit: page * limit]
+        total_pages = (len(ids) + limit - 1) // limit
+        suffix = "&expanded=true" if expanded else ""
+
+        def page_url(number: int) -> Optional[str]:
+            if number < 1 or number > total_pages:
+                return None
+            return f"{self.base_url}{endpoint}?page={number}&limit={limit}{suffix}"
+
+        return web.json_response({
+            "message": "ok",
+            "total_records": len(ids),
+            "total_pages": total_pages,
+            "previous": page_url(page - 1),
+            "next": page_url(page + 1),
+            "results": [self._list_item(endpoint, i, records[i], expanded) for i in chunk],
+        })
+
+    def _list_item(self, endpoint: str, entity_id: int, properties: Dict[str, Any], expanded: bool) -> Dict[str, Any]:
+        item = {
+            "uid": str(entity_id),
+            "name": properties.get("name") or properties.get("title"),
+            "url": properties["url"],
+        }
+        if expanded:
+            item["properties"] = properties
+        return item
+
+    async def handle_detail(self, request: web.Request) -> web.Response:
+        endpoint = request.match_info["endpoint"]
+        try:
+            entity_id = int(request.match_info["entity_id"])
+        except ValueError:
+            return web.json_response({"message": "not found"}, status=404)
+
+        properties = self.dataset.get(endpoint, {}).get(entity_id)
+        if properties is None:
+            return web.json_response({"message": "not found"}, status=404)
+        return web.json_response({
+            "message": "ok",
+            "result": {"properties": properties, "uid": str(entity_id), "description": endpoint},
+        })
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Запуск сервера; возвращает BASE_URL для загрузчика"""
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{port}/api/"
+
+        if self.fixture:
+            self.dataset = load_fixture(self.fixture, self.base_url)
+        else:
+            self.dataset = generate_dataset(
+                self.base_url, self.config.scale, self.config.link_scale, self.config.seed
+            )
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def parse_args() -> argparse.Namespace:
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Локальная замена swapi.tech для тестов и бенчмарков")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--scale", type=int, default=1, help="Множитель числа сущностей (10, 100, ...)")
+    parser.add_argument("--link-scale", type=int, default=1, help="Множитель числа ссылок на сущность")
+    parser.add_argument("--latency", type=float, default=0.0, help="Средняя задержка ответа, секунд")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Доля ответов 503")
+    parser.add_argument("--rate-stall", type=float, default=0.0, help="Доля ответов с задержкой --stall")
+    parser.add_argument("--stall", type=float, default=5.0, help="Задержка зависшего ответа, секунд")
+    parser.add_argument("--fixture", help="JSON-файл с данными вместо синтетических")
+    return parser.parse_args()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    config = FakeSwapiConfig(
+        scale=args.scale,
+        link_scale=args.link_scale,
+        latency=args.latency,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        rate_stall=args.rate_stall,
+        stall=args.stall,
+    )
+    server = FakeSwapi(config, fixture=args.fixture)
+    base_url = await server.start(args.host, args.port)
+    logger.info(f"Fake SWAPI listening on {base_url} (SWAPI_BASE_URL={base_url})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        logger.info(f"Fake SWAPI stats: {server.stats.as_dict()}")
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        logger.info("Fake SWAPI stopped")
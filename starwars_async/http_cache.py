@@ -0,0 +1,125 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Конфигурация
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "off")  # off / on / offline
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "http_cache.sqlite")
+HTTP_CACHE_MAX_AGE = float(os.getenv("HTTP_CACHE_MAX_AGE", "86400"))  # секунд без ревалидации
+
+CACHE_MODES = ("off", "on", "offline")
+
+
+def normalize_cache_key(url: str) -> str:
+    """Нормализация URL: регистр схемы/хоста, порядок параметров, конечный слэш"""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+@dataclass
+class CachedResponse:
+    """Сохранённый ответ"""
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def is_fresh(self, max_age: float) -> bool:
+        """Можно ли отдать ответ без ревалидации"""
+        return time.time() - self.fetched_at < max_age
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Заголовки условного запроса"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """Постоянный кэш HTTP-ответов в SQLite (запросы к файлу выполняются вне цикла событий)"""
+
+    def __init__(self, path: str = HTTP_CACHE_PATH, mode: str = HTTP_CACHE_MODE, max_age: float = HTTP_CACHE_MAX_AGE):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown HTTP cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.max_age = max_age
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def offline(self) -> bool:
+        return self.mode == "offline"
+
+    def _connect(self) -> sqlite3.Connection:
+        """Ленивое открытие файла кэша"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, "
+                "last_modified TEXT, fetched_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _get_sync(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (key,)
+            ).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def _put_sync(self, key: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, body, etag, last_modified, time.time()),
+            )
+            conn.commit()
+
+    def _touch_sync(self, key: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), key))
+            conn.commit()
+
+    async def get(self, url: str) -> Optional[CachedResponse]:
+        """Поиск ответа по URL"""
+        return await asyncio.to_thread(self._get_sync, normalize_cache_key(url))
+
+    async def put(self, url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Сохранение ответа"""
+        await asyncio.to_thread(self._put_sync, normalize_cache_key(url), body, etag, last_modified)
+
+    async def touch(self, url: str) -> None:
+        """Обновление времени проверки после ответа 304"""
+        await asyncio.to_thread(self._touch_sync, normalize_cache_key(url))
+
+    def close(self) -> None:
+        """Закрытие файла кэша"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,93 @@
+import math
+import os
+from collections import deque
+from typing import Deque, Dict, Optional
+
+# Конфигурация
+LATENCY_WINDOW = 200  # последних успешных ответов на endpoint
+MIN_LATENCY_SAMPLES = 20  # до набора выборки действуют значения по умолчанию
+HEDGE_PERCENTILE = 0.95  # дублирующий запрос — если ответа нет дольше p95
+DEADLINE_PERCENTILE = 0.99
+DEADLINE_MULTIPLIER = 3.0  # дедлайн запроса = p99 × множитель
+MIN_REQUEST_DEADLINE = 1.0  # секунд
+HEDGE_BUDGET = 0.05  # доля дублирующих запросов от всех
+HEDGE_BURST = 5  # дублирующих запросов сверх доли (для начала загрузки)
+HTTP_HEDGING = os.getenv("HTTP_HEDGING", "off").lower() == "on"
+
+
+class LatencyTracker:
+    """Скользящее окно задержек успешных ответов по endpoint.
+
+    Дедлайн запроса и порог дублирования выводятся из наблюдаемых
+    перцентилей, а не задаются фиксированным таймаутом.
+    """
+
+    def __init__(
+            self,
+            default_deadline: float,
+            window: int = LATENCY_WINDOW,
+            min_samples: int = MIN_LATENCY_SAMPLES
+    ):
+        self.default_deadline = default_deadline
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        samples = self._samples.get(endpoint)
+        if samples is None:
+            samples = self._samples[endpoint] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def percentile(self, endpoint: str, q: float) -> Optional[float]:
+        """Перцентиль по окну (None, пока выборка мала)"""
+        samples = self._samples.get(endpoint)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+    def deadline(self, endpoint: str) -> float:
+        """Таймаут одной попытки: p99 × множитель в пределах [MIN_REQUEST_DEADLINE, default_deadline]"""
+        p99 = self.percentile(endpoint, DEADLINE_PERCENTILE)
+        if p99 is None:
+            return self.default_deadline
+        return min(self.default_deadline, max(MIN_REQUEST_DEADLINE, p99 * DEADLINE_MULTIPLIER))
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """Через сколько секунд без ответа отправлять дублирующий запрос"""
+        return self.percentile(endpoint, HEDGE_PERCENTILE)
+
+    def stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        return {
+            endpoint: {
+                "samples": len(samples),
+                "p95": self.percentile(endpoint, HEDGE_PERCENTILE),
+                "deadline": round(self.deadline(endpoint), 3),
+            }
+            for endpoint, samples in self._samples.items()
+        }
+
+
+class HedgeBudget:
+    """Ограничение дублирующих запросов долей от всех запросов"""
+
+    def __init__(self, ratio: float = HEDGE_BUDGET, burst: int = HEDGE_BURST, enabled: bool = HTTP_HEDGING):
+        self.enabled = enabled
+        self.ratio = ratio
+        self.burst = burst
+        self.requests = 0
+        self.hedges = 0
+
+    def record_request(self) -> None:
+        self.requests += 1
+
+    def try_spend(self) -> bool:
+        """Можно ли отправить ещё один дублирующий запрос"""
+        if self.hedges + 1 > self.requests * self.ratio + self.burst:
+            return False
+        self.hedges += 1
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "hedges": self.hedges}
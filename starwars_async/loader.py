@@ -1,177 +1,737 @@
 import aiohttp
+import argparse
 import asyncio
+import json
 import logging
-from typing import Optional, Dict, Any, Type, TypeVar
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.exc import SQLAlchemyError
-from starwars_async.models import Character, Starship, Vehicle, Planet, Base
-from starwars_async.database import AsyncSessionLocal, init_db
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Optional, Dict, Any, Type, TypeVar, Callable, Awaitable, List, Set, Tuple, AsyncIterator
+from starwars_async.models import Base
+from starwars_async.database import engine, init_db, pool_status
+from starwars_async.writer import BulkWriter, BATCH_SIZE, FLUSH_INTERVAL
 from starwars_async.api_client import (
-    fetch_character_data,
-    fetch_starship_data,
-    fetch_vehicle_data,
-    fetch_planet_data,
+    fetch_page,
+    fetch_reference,
+    list_page_url,
+    extract_id,
     BASE_URL,
+    LIST_PAGE_SIZE,
+    Resolver,
+    hedge_budget,
+    http_cache,
+    latency,
+    reference_cache,
 )
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
+from starwars_async.rate_limiter import limiter_stats
+from starwars_async.http_cache import CACHE_MODES
+from starwars_async.dead_letters import DeadLetterStore
+from starwars_async.entities import ENTITY_SPECS, SPECS_BY_TABLE, build_entity
+from starwars_async.entity_index import EntityIndex
+from starwars_async.metrics import metrics, start_metrics_server
+from starwars_async.logging_config import (
+    EventSampler,
+    LOG_FORMAT,
+    LOG_FORMATS,
+    LOG_LEVEL,
+    SQL_ECHO,
+    SQL_ECHO_LEVELS,
+    setup_logging,
+)
+from starwars_async.normalized import NormalizedWriter
+from starwars_async.records import EntityRecord, content_hash
+from starwars_async.profiling import PROFILE_OUTPUT, SAMPLE_INTERVAL, run_profiled
+from starwars_async.refresh import FullRefresh
+from starwars_async.search import SearchIndex
+from starwars_async.transport import JSON_DECODER, connection_stats, create_session
+from starwars_async.sync_state import (
+    Checkpoint,
+    PageTracker,
+    Shard,
+    SyncStateStore,
+    SYNC_MODES,
 )
+
+# Логирование настраивается в __main__ (setup_logging: обработчики вне цикла событий)
 logger = logging.getLogger(__name__)
 
 # Тип для моделей SQLAlchemy
 ModelType = TypeVar('ModelType', bound=Base)
 
+# Функция разрешения связей: (session, id, properties, resolve) -> запись для БД
+BuildFunc = Callable[[aiohttp.ClientSession, int, Dict[str, Any], Resolver], Awaitable[EntityRecord]]
+
+# Конфигурация
+CONCURRENCY_LIMIT = 10  # Общий бюджет сущностей в работе (HTTP ограничивает rate_limiter)
+WORKERS_PER_STAGE = 4  # Воркеров на стадию для каждого типа сущностей
+QUEUE_SIZE = 20  # Размер очередей между стадиями (больше страницы — для предзагрузки)
+ENTITY_DEADLINE = 60.0  # секунд на загрузку сущности со связями; дольше — в dead_letters и дальше
+
+# Источники данных: endpoint, модель, функция сборки, тип сущности (из спецификаций entities.py)
+ENTITY_SOURCES: List[Tuple[str, Type[Base], BuildFunc, str]] = [
+    (spec.endpoint, spec.model, partial(build_entity, spec), spec.entity_type)
+    for spec in ENTITY_SPECS
+]
+
+
+@dataclass
+class EntityTask:
+    """Сущность, проходящая через стадии конвейера"""
+    entity_type: str
+    entity_id: int
+    url: str
+    page: int
+    properties: Optional[Dict[str, Any]] = None
+    entity_data: Optional[EntityRecord] = None
+    edited: Optional[str] = None
+    content_hash: Optional[str] = None
+    started: float = field(default_factory=time.perf_counter)
+    deadline_at: Optional[float] = None  # отсчитывается с начала загрузки деталей
+
 
 class DataLoader:
-    def __init__(self):
+    def __init__(
+            self,
+            batch_size: int = BATCH_SIZE,
+            flush_interval: float = FLUSH_INTERVAL,
+            use_copy: bool = False,
+            concurrency: int = CONCURRENCY_LIMIT,
+            workers_per_stage: int = WORKERS_PER_STAGE,
+            queue_size: int = QUEUE_SIZE,
+            mode: str = "full",
+            two_phase: bool = False,
+            normalized: bool = False,
+            metrics_port: Optional[int] = None,
+            metrics_json: Optional[str] = None,
+            page_size: int = LIST_PAGE_SIZE,
+            shard: Optional[Shard] = None,
+            refresh: bool = False,
+            entity_deadline: float = ENTITY_DEADLINE,
+            search_index: Optional[SearchIndex] = None
+    ):
         self.session: Optional[aiohttp.ClientSession] = None
-        self.semaphore = asyncio.Semaphore(5)  # Ограничение параллельных запросов
-        self.request_delay = 0.5  # Задержка между пакетами запросов
+        # Поисковый индекс обновляется записанными строками по мере загрузки
+        self.search_index = search_index
+        self.writer = BulkWriter(
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            use_copy=use_copy,
+            on_failure=self._row_failed,
+            on_written=search_index.update if search_index is not None else None
+        )
+        self.semaphore = asyncio.Semaphore(concurrency)  # Общий бюджет для всех типов сущностей
+        self.workers_per_stage = workers_per_stage
+        self.entity_deadline = entity_deadline
+        self.queue_size = queue_size
+        self.write_queue: Optional[asyncio.Queue] = None
 
-    def clean_string(self, value: Any) -> Optional[str]:
-        """Улучшенная очистка строковых значений"""
-        if value is None:
-            return None
+        # Чекпоинты и инкрементальная синхронизация
+        if mode not in SYNC_MODES:
+            raise ValueError(f"Unknown sync mode: {mode}")
+        self.mode = mode
+        self.sync_store = SyncStateStore()
+        self.checkpoints: Dict[str, Checkpoint] = {}
+        self.trackers: Dict[str, PageTracker] = {}
+        self.models: Dict[str, Type[Base]] = {}
+        self.entity_states: Dict[str, Dict[int, Tuple[Optional[str], Optional[str]]]] = {}
+        self.pending_states: Dict[str, List[Dict[str, Any]]] = {}
+        self.failed_writes: Dict[str, Set[int]] = {}
+        self.checkpoint_locks: Dict[str, asyncio.Lock] = {}
+        self.skipped: Dict[str, int] = {}
 
-        if isinstance(value, list):
-            cleaned = [
-                str(v).strip() for v in value
-                if v and str(v).strip().lower() not in ("unknown", "n/a", "none", "")
-            ]
-            return ", ".join(cleaned) if cleaned else None
+        # Сбойные сущности сохраняются в dead_letters для повторной загрузки (redrive)
+        self.dead_letters = DeadLetterStore()
 
-        value = str(value).strip()
-        return value if value.lower() not in ("unknown", "n/a", "none", "") else None
+        # Двухфазная загрузка: ссылки разрешаются из индекса, а не через HTTP
+        self.two_phase = two_phase
+        self.index: Optional[EntityIndex] = None
+        self.resolve: Resolver = fetch_reference
+
+        # Нормализованная схема: таблицы связей, homeworld_id и числовые колонки
+        self.normalized = normalized
+        self.normalized_writer = NormalizedWriter() if normalized else None
+        self.endpoints = {entity_type: endpoint for endpoint, _, _, entity_type in ENTITY_SOURCES}
+
+        # Метрики: HTTP-эндпоинт Prometheus и/или JSON-сводка в файл по окончании
+        self.metrics_port = metrics_port
+        self.metrics_json = metrics_json
+        self.events = EventSampler(logger)
+
+        # Шардированная загрузка: воркер обходит только свой диапазон страниц одного типа
+        if shard and (two_phase or normalized):
+            raise ValueError("Sharded loading does not support two-phase or normalized mode")
+        self.page_size = page_size
+        self.shard = shard
+
+        # Полная перезагрузка: запись в staging-таблицы и атомарная подмена в конце
+        if refresh and (shard or normalized or mode != "full"):
+            raise ValueError("Full refresh cannot be combined with sharding, normalized or incremental mode")
+        self.refresh = refresh
+        self.full_refresh: Optional[FullRefresh] = None
 
     async def load_entity(
             self,
-            entity_id: int,
+            record: EntityRecord,
             model: Type[ModelType],
-            fetch_func: callable,
             entity_type: str
     ) -> bool:
-        """Улучшенная загрузка одной сущности с обработкой транзакций"""
-        async with self.semaphore:
-            try:
-                # Загрузка данных
-                entity_data = await fetch_func(self.session, entity_id)
-                if not entity_data:
-                    logger.warning(f"No data for {entity_type} {entity_id}")
-                    return False
-
-                # Очистка данных
-                cleaned_data = {
-                    k: self.clean_string(v)
-                    for k, v in entity_data.items()
-                    if k != 'id'  # Исключаем id из очистки
-                }
-                cleaned_data['id'] = entity_id
-
-                # Сохранение в БД
-                async with AsyncSessionLocal() as db_session:
-                    try:
-                        existing = await db_session.get(model, entity_id)
-                        if existing:
-                            for key, value in cleaned_data.items():
-                                setattr(existing, key, value)
-                        else:
-                            db_session.add(model(**cleaned_data))
-
-                        await db_session.commit()
-                        logger.info(f"Successfully saved {entity_type} {entity_id}")
-                        return True
-
-                    except SQLAlchemyError as e:
-                        await db_session.rollback()
-                        logger.error(f"Database error for {entity_type} {entity_id}: {str(e)}")
-                        return False
+        """Передача очищенной записи в пакетный writer"""
+        try:
+            await self.writer.add(model, record)
+            return True
 
-            except asyncio.TimeoutError:
-                logger.warning(f"Timeout loading {entity_type} {entity_id}")
-                return False
+        except Exception as e:
+            logger.error(
+                f"Unexpected error processing {entity_type} {record.get('id')}: {str(e)}",
+                exc_info=True
+            )
+            self._dead_letter(entity_type, record.get('id'), "write", e)
+            return False
+
+    def _dead_letter(self, entity_type: str, entity_id: int, stage: str, error: Any) -> None:
+        """Запоминание сбойной сущности (записывается вместе с чекпоинтом)"""
+        url = f"{BASE_URL}{self.endpoints[entity_type]}/{entity_id}"
+        reason = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+        self.dead_letters.add(entity_type, entity_id, url, stage, reason)
+        metrics.inc("dead_letters_total", entity_type=entity_type, stage=stage)
+
+    async def _within_deadline(self, task: "EntityTask", work: Awaitable[Any]) -> Any:
+        """Ожидание сетевой работы сущности не дольше её общего дедлайна"""
+        if task.deadline_at is None:
+            task.deadline_at = time.monotonic() + self.entity_deadline
+        return await asyncio.wait_for(work, timeout=max(0.0, task.deadline_at - time.monotonic()))
+
+    async def _deadline_exceeded(self, task: "EntityTask") -> None:
+        """Сущность не уложилась в дедлайн: повтор позже через redrive, очередь не ждёт"""
+        logger.warning(f"{task.entity_type} {task.entity_id} exceeded {self.entity_deadline}s deadline")
+        metrics.inc("entity_deadline_exceeded_total", entity_type=task.entity_type)
+        self._dead_letter(task.entity_type, task.entity_id, "deadline", f"exceeded {self.entity_deadline}s")
+        await self._entity_done(task, written=False)
 
+    def _row_failed(self, table_name: str, row: Dict[str, Any], error: str) -> None:
+        """Строка, которую writer не смог записать даже отдельно от пакета"""
+        spec = SPECS_BY_TABLE.get(table_name)
+        if spec and row.get("id") is not None:
+            # Состояние синхронизации такой сущности не сохраняется, иначе incremental её пропустит
+            self.failed_writes[spec.entity_type].add(row["id"])
+            self._dead_letter(spec.entity_type, row["id"], "write", error)
+
+    async def _run_stage(
+            self,
+            inbox: asyncio.Queue,
+            handler: Callable[[Any], Awaitable[None]],
+            stage: str
+    ) -> None:
+        """Бесконечный воркер стадии: берёт элементы из очереди и обрабатывает их"""
+        while True:
+            item = await inbox.get()
+            metrics.gauge_set("queue_depth", inbox.qsize(), stage=stage)
+            try:
+                async with metrics.in_flight("stage_in_flight", stage=stage):
+                    with metrics.timer("stage_seconds", stage=stage):
+                        await handler(item)
             except Exception as e:
-                logger.error(
-                    f"Unexpected error processing {entity_type} {entity_id}: {str(e)}",
-                    exc_info=True
-                )
-                return False
+                logger.error(f"Unexpected error in {stage} stage: {str(e)}", exc_info=True)
+            finally:
+                inbox.task_done()
+
+    @asynccontextmanager
+    async def _budget(self, stage: str) -> AsyncIterator[None]:
+        """Захват общего бюджета с замером времени ожидания"""
+        waited = time.perf_counter()
+        async with self.semaphore:
+            metrics.observe("semaphore_wait_seconds", time.perf_counter() - waited, stage=stage)
+            yield
+
+    async def _enqueue(self, queue: asyncio.Queue, item: Any, stage: str) -> None:
+        """Постановка в очередь следующей стадии с замером ожидания (обратное давление)"""
+        waited = time.perf_counter()
+        await queue.put(item)
+        metrics.observe("queue_put_wait_seconds", time.perf_counter() - waited, stage=stage)
+
+    async def _walk_pages(self, endpoint: str, entity_type: str, id_queue: asyncio.Queue) -> None:
+        """Обход страниц списка с чекпоинта; очередь ограничена, поэтому следующая
+        страница загружается, пока обрабатывается текущая"""
+        checkpoint = self.checkpoints.get(entity_type, Checkpoint())
+        tracker = self.trackers[entity_type]
+        page_number = tracker.next_page
+        if self.shard:
+            url = f"{BASE_URL}{endpoint}/?page={self.shard.first_page}"
+        else:
+            url = checkpoint.next_url or f"{BASE_URL}{endpoint}/"
+        if checkpoint.last_page:
+            logger.info(f"Resuming {endpoint} from page {page_number}")
+
+        while url:
+            page_url = list_page_url(url, self.page_size)
+            # В двухфазном режиме страницы уже загружены в индекс
+            page = self.index.get_page(page_url) if self.index else None
+            if page is None:
+                page = await fetch_page(self.session, page_url)
+            if page is None:
+                logger.error(f"HTTP error loading {endpoint} page {url}")
+                return
+            url = page.get("next")
+            if self.shard and page_number >= self.shard.last_page:
+                url = None  # Конец диапазона шарда
+
+            items = []
+            for entity in page.get("results", []):
+                if not (entity_url := entity.get('url')):
+                    continue
+
+                entity_id = extract_id(entity_url)
+                if entity_id is None:
+                    logger.warning(f"Invalid {entity_type} URL {entity_url}")
+                    continue
+                task = EntityTask(entity_type, entity_id, entity_url, page_number)
+                if properties := entity.get('properties'):
+                    # Раскрытый список: отдельный запрос деталей не нужен, а сами
+                    # properties доступны для разрешения ссылок других сущностей
+                    task.properties = properties
+                    reference_cache.put(entity_url, properties)
+                items.append(task)
+
+            tracker.page_started(page_number, len(items), url)
+            if not items:
+                await self._advance_checkpoint(entity_type)
+            for item in items:
+                await self._enqueue(id_queue, item, f"{entity_type} details")
+            page_number += 1
+
+        tracker.walk_finished = True
+
+    def _is_unchanged(self, task: "EntityTask") -> bool:
+        """Не изменилась ли сущность с прошлой синхронизации (по edited или хэшу)"""
+        stored = self.entity_states[task.entity_type].get(task.entity_id)
+        if stored is None:
+            return False
+        stored_edited, stored_hash = stored
+        if task.edited and stored_edited:
+            return task.edited == stored_edited
+        return task.content_hash == stored_hash
+
+    async def _entity_done(self, task: "EntityTask", written: bool) -> None:
+        """Отметка о завершении сущности и продвижение чекпоинта"""
+        if written:
+            self.pending_states[task.entity_type].append({
+                "entity_id": task.entity_id,
+                "edited": task.edited,
+                "content_hash": task.content_hash,
+            })
+        self.trackers[task.entity_type].entity_done(task.page)
+        await self._advance_checkpoint(task.entity_type)
+
+    def _take_written_states(self, entity_type: str) -> List[Dict[str, Any]]:
+        """Накопленные состояния сущностей без тех, чьи строки writer не записал"""
+        states, self.pending_states[entity_type] = self.pending_states[entity_type], []
+        failed = self.failed_writes[entity_type]
+        return [state for state in states if state["entity_id"] not in failed]
+
+    async def _advance_checkpoint(self, entity_type: str) -> None:
+        """Сохранение чекпоинта после полностью записанных страниц"""
+        async with self.checkpoint_locks[entity_type]:
+            tracker = self.trackers[entity_type]
+            advanced = tracker.pop_completed()
+            if advanced is None:
+                return
+
+            # Чекпоинт фиксируется только после записи строк этих страниц в БД
+            await self.writer.flush(self.models[entity_type])
+            # Сбои этих страниц сохраняются до чекпоинта, иначе продолжение их пропустит
+            await self.dead_letters.flush()
+            if self.refresh:
+                # Данные станут видны только после подмены таблиц: состояния сохраняются после неё,
+                # а чекпоинты не используются (прерванная перезагрузка начинается заново)
+                return
+            await self.sync_store.save_entity_states(entity_type, self._take_written_states(entity_type))
+            if self.shard:
+                # Прогресс шарда фиксирует координатор
+                return
+
+            last_page, next_url = advanced
+            checkpoint = Checkpoint(last_page, next_url, completed=next_url is None)
+            self.checkpoints[entity_type] = checkpoint
+            await self.sync_store.save_checkpoint(entity_type, checkpoint)
 
     async def process_entity_type(
             self,
             endpoint: str,
             model: Type[ModelType],
-            fetch_func: callable,
+            build_func: BuildFunc,
             entity_type: str
     ) -> None:
-        """Оптимизированная обработка всех сущностей одного типа"""
-        logger.info(f"Starting {entity_type}s loading...")
-        url = f"{BASE_URL}{endpoint}/"
+        """Конвейер для одного типа: страницы → детали → связи → очередь записи"""
+        logger.info(f"Starting {endpoint} loading...")
+        id_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        relation_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
 
-        try:
-            while url:
-                async with self.session.get(url) as response:
-                    response.raise_for_status()
-                    data = await response.json()
-                    url = data.get("next")
-
-                    tasks = []
-                    for entity in data.get("results", []):
-                        if not (entity_url := entity.get('url')):
-                            continue
-
-                        try:
-                            entity_id = int(entity_url.strip("/").split("/")[-1])
-                            tasks.append(
-                                self.load_entity(entity_id, model, fetch_func, entity_type)
-                            )
-                        except (ValueError, IndexError) as e:
-                            logger.warning(f"Invalid {entity_type} URL {entity_url}: {str(e)}")
-
-                    # Обработка пакетами с задержкой
-                    for i in range(0, len(tasks), 5):
-                        batch = tasks[i:i + 5]
-                        await asyncio.gather(*batch, return_exceptions=True)
-                        await asyncio.sleep(self.request_delay)
+        async def fetch_details(task: EntityTask) -> None:
+            data = task.properties
+            if data is None:
+                # Запасной вариант: страница пришла без properties
+                async with self._budget(f"{entity_type} details"):
+                    try:
+                        data = await self._within_deadline(task, fetch_reference(self.session, task.url))
+                    except asyncio.TimeoutError:
+                        await self._deadline_exceeded(task)
+                        return
+            if not data:
+                logger.warning(f"No data for {entity_type} {task.entity_id}")
+                self._dead_letter(entity_type, task.entity_id, "fetch", "no data after retries")
+                await self._entity_done(task, written=False)
+                return
 
+            task.properties = data
+            task.edited = data.get("edited")
+            task.content_hash = content_hash(data)
+            if self.mode == "incremental" and self._is_unchanged(task):
+                # Сущность не менялась — связи не разрешаем и строку не перезаписываем
+                self.skipped[entity_type] += 1
+                await self._entity_done(task, written=False)
+                return
+            await self._enqueue(relation_queue, task, f"{entity_type} relations")
+
+        async def resolve_relations(task: EntityTask) -> None:
+            try:
+                async with self._budget(f"{entity_type} relations"):
+                    task.entity_data = await self._within_deadline(
+                        task, build_func(self.session, task.entity_id, task.properties, self.resolve)
+                    )
+            except asyncio.TimeoutError:
+                await self._deadline_exceeded(task)
+                return
+            except Exception as e:
+                logger.error(f"Error resolving relations of {entity_type} {task.entity_id}: {str(e)}")
+                self._dead_letter(entity_type, task.entity_id, "relations", e)
+                await self._entity_done(task, written=False)
+                return
+            if self.normalized_writer:
+                self.normalized_writer.collect(self.endpoints[entity_type], task.entity_id, task.properties)
+            task.properties = None
+            await self._enqueue(self.write_queue, task, "write")
+
+        workers = [
+            asyncio.create_task(self._run_stage(id_queue, fetch_details, f"{entity_type} details"))
+            for _ in range(self.workers_per_stage)
+        ] + [
+            asyncio.create_task(self._run_stage(relation_queue, resolve_relations, f"{entity_type} relations"))
+            for _ in range(self.workers_per_stage)
+        ]
+
+        try:
+            await self._walk_pages(endpoint, entity_type, id_queue)
+            await id_queue.join()
+            await relation_queue.join()
         except aiohttp.ClientError as e:
-            logger.error(f"HTTP error loading {entity_type}s: {str(e)}")
+            logger.error(f"HTTP error loading {endpoint}: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error loading {entity_type}s: {str(e)}", exc_info=True)
+            logger.error(f"Unexpected error loading {endpoint}: {str(e)}", exc_info=True)
         finally:
-            logger.info(f"Finished loading {entity_type}s")
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            logger.info(f"Finished loading {endpoint}")
+
+    async def _write_entity(self, task: "EntityTask") -> None:
+        """Обработчик стадии записи"""
+        written = await self.load_entity(task.entity_data, self.models[task.entity_type], task.entity_type)
+        task.entity_data = None
+        if written:
+            self.events.log(
+                "entity_queued",
+                f"Queued {task.entity_type} {task.entity_id} for writing",
+                entity_type=task.entity_type,
+                entity_id=task.entity_id,
+                duration=round(time.perf_counter() - task.started, 6),
+            )
+        await self._entity_done(task, written)
+
+    async def _prepare_sync(self) -> None:
+        """Загрузка чекпоинтов и состояний сущностей перед запуском"""
+        if self.shard or self.refresh:
+            # Прогресс шардов хранит координатор; перезагрузка всегда идёт с первой страницы
+            self.checkpoints = {}
+        else:
+            self.checkpoints = await self.sync_store.load_checkpoints()
+        if self.checkpoints and all(
+                self.checkpoints.get(entity_type, Checkpoint()).completed
+                for _, _, _, entity_type in ENTITY_SOURCES
+        ):
+            # Прошлый проход завершён — начинаем новый с первой страницы
+            await self.sync_store.reset()
+            self.checkpoints = {}
+
+        for _, model, _, entity_type in ENTITY_SOURCES:
+            checkpoint = self.checkpoints.get(entity_type, Checkpoint())
+            self.models[entity_type] = model
+            first_page = self.shard.first_page if self.shard else checkpoint.last_page + 1
+            self.trackers[entity_type] = PageTracker(next_page=first_page)
+            self.pending_states[entity_type] = []
+            self.failed_writes[entity_type] = set()
+            self.checkpoint_locks[entity_type] = asyncio.Lock()
+            self.skipped[entity_type] = 0
+            self.entity_states[entity_type] = (
+                await self.sync_store.load_entity_states(entity_type) if self.mode == "incremental" else {}
+            )
+
+    async def _finish_refresh(self) -> None:
+        """Подмена таблиц, если все типы загружены полностью"""
+        incomplete = [entity_type for entity_type, tracker in self.trackers.items() if not tracker.finished]
+        if incomplete:
+            logger.error(f"Full refresh incomplete for {', '.join(incomplete)}, keeping live tables")
+            await self.full_refresh.abort()
+            return
+        await self.full_refresh.swap()
+        if self.search_index is not None:
+            # Перечитывание, а не обновление по пакетам: удалённые из источника сущности уходят из индекса
+            await self.search_index.load()
+        for entity_type in self.pending_states:
+            await self.sync_store.save_entity_states(entity_type, self._take_written_states(entity_type))
+
+    def metrics_summary(self, elapsed: float) -> Dict[str, Any]:
+        """JSON-сводка метрик с пропускной способностью записи по типам"""
+        summary = metrics.summary()
+        summary["rows_per_second"] = {
+            table: round(stats["written"] / elapsed, 1) if elapsed else 0.0
+            for table, stats in self.writer.stats.items()
+        }
+        return summary
 
     async def run(self) -> None:
         """Улучшенный основной метод запуска с обработкой ошибок"""
+        metrics_server = await start_metrics_server(self.metrics_port) if self.metrics_port else None
+        started = time.perf_counter()
         try:
             await init_db()
+            await self._prepare_sync()
+            if self.search_index is not None and not len(self.search_index):
+                await self.search_index.load()
+            if self.refresh:
+                self.full_refresh = FullRefresh(list(self.models.values()))
+                await self.full_refresh.prepare()
+                self.writer.tables = self.full_refresh.staging
+                self.writer.check_unchanged = False
+                self.writer.use_copy = True  # COPY для asyncpg, иначе многострочные INSERT
+                # Пакеты staging-таблиц не видны читателям до подмены: индекс перечитывается после неё
+                self.writer.on_written = None
 
-            timeout = aiohttp.ClientTimeout(total=300)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with create_session() as session:
                 self.session = session
+                self.write_queue = asyncio.Queue(maxsize=self.queue_size)
+                await self.writer.start()
+                db_writer = asyncio.create_task(self._run_stage(self.write_queue, self._write_entity, "write"))
+
+                if self.two_phase:
+                    # Фаза 1: properties всех сущностей в памяти
+                    self.index = EntityIndex()
+                    await self.index.ingest_all(session)
+                    self.resolve = self.index.resolve
+
+                try:
+                    # Все типы загружаются одновременно в рамках общего бюджета;
+                    # полностью загруженные в прошлом запуске типы пропускаются
+                    await asyncio.gather(*(
+                        self.process_entity_type(endpoint, model, build_func, entity_type)
+                        for endpoint, model, build_func, entity_type in ENTITY_SOURCES
+                        if not self.checkpoints.get(entity_type, Checkpoint()).completed
+                        and (self.shard is None or entity_type == self.shard.entity_type)
+                    ))
+                    await self.write_queue.join()
+
+                    if self.normalized_writer:
+                        # Связи пишутся после основных таблиц
+                        await self.writer.flush()
+                        await self.normalized_writer.finalize()
+                finally:
+                    db_writer.cancel()
+                    await asyncio.gather(db_writer, return_exceptions=True)
+                    # Запись оставшихся в буферах строк
+                    await self.writer.close()
+                    await self.dead_letters.flush()
+                    http_cache.close()
+
+                if self.full_refresh:
+                    await self._finish_refresh()
+
+                logger.info(f"Reference cache stats: {reference_cache.stats()}")
+                if self.search_index is not None:
+                    logger.info(f"Search index stats: {self.search_index.stats()}")
+                logger.info(f"Writer stats: {dict(self.writer.stats)}")
+                logger.info("Rows by result: " + ", ".join(
+                    f"{table}: inserted={stats['inserted']} updated={stats['updated']} unchanged={stats['unchanged']}"
+                    for table, stats in self.writer.stats.items()
+                ))
+                logger.info(f"Rate limiter stats: {limiter_stats()}")
+                logger.info(f"Request latency: {latency.stats()}, hedging: {hedge_budget.stats()}")
+                logger.info(f"HTTP connections: {dict(connection_stats)}, JSON decoder: {JSON_DECODER}")
+                pool_wait = metrics.summary()["histograms"].get("db_pool_wait_seconds")
+                logger.info(f"DB pool: {pool_status()}, wait for connection: {pool_wait}")
+                if self.dead_letters.recorded:
+                    logger.warning(
+                        f"{self.dead_letters.recorded} entities saved to dead_letters, "
+                        f"retry them with python -m starwars_async.redrive"
+                    )
+                if self.index:
+                    logger.info(f"Entity index stats: {self.index.stats()}")
+                if self.mode == "incremental":
+                    logger.info(f"Unchanged entities skipped: {self.skipped}")
 
-                # Порядок загрузки важен для ссылочной целостности
-                await self.process_entity_type("planets", Planet, fetch_planet_data, "planet")
-                await self.process_entity_type("people", Character, fetch_character_data, "character")
-                await self.process_entity_type("starships", Starship, fetch_starship_data, "starship")
-                await self.process_entity_type("vehicles", Vehicle, fetch_vehicle_data, "vehicle")
+            self.events.flush()
+            summary = self.metrics_summary(time.perf_counter() - started)
+            logger.info(f"Metrics summary: {json.dumps(summary)}")
+            if self.metrics_json:
+                with open(self.metrics_json, "w", encoding="utf-8") as output:
+                    json.dump(summary, output, indent=2)
 
         except Exception as e:
             logger.critical(f"Fatal error in DataLoader: {str(e)}", exc_info=True)
+            if self.full_refresh:
+                await self.full_refresh.abort()
             raise
+        finally:
+            if metrics_server:
+                await metrics_server.cleanup()
+
+
+def parse_args() -> argparse.Namespace:
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Загрузка данных SWAPI в базу данных")
+    parser.add_argument(
+        "--cache",
+        choices=CACHE_MODES,
+        default=http_cache.mode,
+        help="Постоянный HTTP-кэш: off, on (с ревалидацией) или offline (только из кэша)"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=SYNC_MODES,
+        default="full",
+        help="full — полная загрузка; incremental — пропуск сущностей с неизменным edited"
+    )
+    parser.add_argument(
+        "--two-phase",
+        action="store_true",
+        help="Сначала загрузить все сущности в память, затем разрешать ссылки без HTTP"
+    )
+    parser.add_argument(
+        "--normalized",
+        action="store_true",
+        help="Заполнять нормализованную схему: films, species, таблицы связей и числовые колонки"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Полная перезагрузка в staging-таблицы с атомарной подменой основных по окончании"
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        default=hedge_budget.enabled,
+        help="Дублировать запросы без ответа дольше p95 задержки (не больше 5%% от всех запросов)"
+    )
+    parser.add_argument(
+        "--entity-deadline",
+        type=float,
+        default=ENTITY_DEADLINE,
+        help="Секунд на сущность со связями; не уложившиеся сохраняются в dead_letters"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Число процессов-воркеров; больше 1 — шардированная загрузка по диапазонам страниц"
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=LOG_FORMATS,
+        default=LOG_FORMAT,
+        help="text или json (одна JSON-строка на событие)"
+    )
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="Уровень логирования (INFO, DEBUG, ...)")
+    parser.add_argument(
+        "--sql-echo",
+        choices=tuple(SQL_ECHO_LEVELS),
+        default=SQL_ECHO,
+        help="Вывод SQL-запросов в лог: off, info (запросы) или debug (и результаты)"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Порт HTTP-эндпоинта метрик (/metrics — Prometheus, /metrics.json — JSON)"
+    )
+    parser.add_argument(
+        "--metrics-json",
+        help="Файл для JSON-сводки метрик по окончании загрузки"
+    )
+    parser.add_argument(
+        "--search-stats",
+        action="store_true",
+        help="Строить поисковый индекс по мере записи и вывести его статистику по окончании"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Сэмплирующий профилировщик, поиск блокирующих шагов цикла и wall/CPU по стадиям"
+    )
+    parser.add_argument(
+        "--profile-output",
+        default=PROFILE_OUTPUT,
+        help="Префикс файлов профиля: .collapsed (для flamegraph) и .txt (отчёт)"
+    )
+    parser.add_argument(
+        "--profile-interval",
+        type=float,
+        default=SAMPLE_INTERVAL,
+        help="Секунд между снимками стека"
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    loader = DataLoader()
+    args = parse_args()
+    setup_logging(log_format=args.log_format, level=args.log_level, sql_echo=args.sql_echo)
+    http_cache.mode = args.cache
+    hedge_budget.enabled = args.hedge
+    if args.workers > 1:
+        from starwars_async.sharding import ShardCoordinator
+
+        if args.two_phase or args.normalized or args.refresh or args.profile or args.search_stats:
+            raise SystemExit(
+                "--workers cannot be combined with --two-phase, --normalized, --refresh, --profile or --search-stats"
+            )
+        runner = ShardCoordinator(
+            workers=args.workers,
+            loader_kwargs={"mode": args.mode, "entity_deadline": args.entity_deadline},
+            log_format=args.log_format,
+            log_level=args.log_level
+        ).run()
+    else:
+        loader = DataLoader(
+            mode=args.mode,
+            two_phase=args.two_phase,
+            normalized=args.normalized,
+            refresh=args.refresh,
+            entity_deadline=args.entity_deadline,
+            metrics_port=args.metrics_port,
+            metrics_json=args.metrics_json,
+            search_index=SearchIndex() if args.search_stats else None
+        )
+        if args.profile:
+            runner = run_profiled(loader, output=args.profile_output, interval=args.profile_interval)
+        else:
+            runner = loader.run()
+
+    async def main() -> None:
+        try:
+            await runner
+        finally:
+            # Без закрытия пула потоки соединений aiosqlite не дают процессу завершиться
+            await engine.dispose()
+
     try:
-        asyncio.run(loader.run())
+        asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Process interrupted by user")
     except Exception as e:
@@ -0,0 +1,100 @@
+import atexit
+import json
+import logging
+import os
+import queue
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+
+# Конфигурация
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text / json
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+SQL_ECHO = os.getenv("SQL_ECHO", "off")  # off / info / debug
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))  # каждое N-е частое событие
+LOG_FORMATS = ("text", "json")
+SQL_ECHO_LEVELS = {"off": logging.WARNING, "info": logging.INFO, "debug": logging.DEBUG}
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Стандартные атрибуты LogRecord — всё остальное считается полями события из extra
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись: время, уровень, логгер, сообщение и поля из extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                event[key] = value
+        if record.exc_info:
+            event["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class EventSampler:
+    """Семплирование частых событий (успешная запись сущности и т.п.).
+
+    В лог попадает каждое N-е событие, остальные только считаются;
+    итог по всем событиям выводится одной записью в flush().
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = LOG_SAMPLE_EVERY):
+        self.logger = logger
+        self.every = max(1, every)
+        self.counts: Counter = Counter()
+
+    def log(self, event: str, message: str, **fields: Any) -> None:
+        self.counts[event] += 1
+        if self.counts[event] % self.every == 1 or self.every == 1:
+            self.logger.info(message, extra={"event": event, "sampled_every": self.every, **fields})
+
+    def flush(self) -> None:
+        if self.counts:
+            counts = dict(self.counts)
+            self.logger.info(f"Event counts: {counts}", extra={"event": "event_counts", "counts": counts})
+            self.counts.clear()
+
+
+def setup_logging(
+        log_format: str = LOG_FORMAT,
+        level: str = LOG_LEVEL,
+        log_file: Optional[str] = LOG_FILE,
+        sql_echo: str = SQL_ECHO
+) -> QueueListener:
+    """Логирование через очередь: цикл событий только кладёт запись в очередь,
+    а форматирование и запись в файл/консоль выполняет поток QueueListener"""
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {log_format}")
+    if sql_echo not in SQL_ECHO_LEVELS:
+        raise ValueError(f"Unknown SQL echo level: {sql_echo}")
+
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level.upper())
+
+    # SQL пишется в общий конвейер логов только по явному запросу
+    logging.getLogger("sqlalchemy.engine").setLevel(SQL_ECHO_LEVELS[sql_echo])
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
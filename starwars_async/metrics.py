@@ -0,0 +1,203 @@
+import bisect
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from aiohttp import web
+
+# Конфигурация
+METRICS_PREFIX = "starwars"
+# Границы корзин гистограмм, секунд
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Ключ метрики: имя и отсортированные пары меток
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def endpoint_label(url: str) -> str:
+    """Тип ресурса из URL для метки endpoint (.../api/people/1 → people)"""
+    parts = [part for part in urlsplit(url.strip()).path.split("/") if part]
+    if parts and parts[-1].isdigit():
+        parts.pop()
+    return parts[-1] if parts else "unknown"
+
+
+def _key(name: str, labels: Dict[str, Any]) -> MetricKey:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{label}="{value}"' for label, value in pairs) + "}"
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (как в Prometheus)"""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе корзины"""
+        if not self.count:
+            return 0.0
+        threshold = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return round(min(bound, self.max), 6)
+        return round(self.max, 6)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 6),
+        }
+
+
+class Metrics:
+    """Счётчики, gauges и гистограммы горячих путей загрузчика.
+
+    Запись метрики — поиск в словаре и одно сложение, поэтому сбор
+    включён всегда; экспорт в формате Prometheus или JSON.
+    """
+
+    def __init__(self):
+        self.counters: Dict[MetricKey, float] = defaultdict(float)
+        self.gauges: Dict[MetricKey, float] = defaultdict(float)
+        self.histograms: Dict[MetricKey, Histogram] = {}
+        self.started_at = time.monotonic()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        self.counters[_key(name, labels)] += value
+
+    def gauge_add(self, name: str, delta: float, **labels: Any) -> None:
+        self.gauges[_key(name, labels)] += delta
+
+    def gauge_set(self, name: str, value: float, **labels: Any) -> None:
+        self.gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Замер длительности блока в гистограмму"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @asynccontextmanager
+    async def in_flight(self, name: str, **labels: Any) -> AsyncIterator[None]:
+        """Gauge числа выполняющихся операций"""
+        key = _key(name, labels)
+        self.gauges[key] += 1
+        try:
+            yield
+        finally:
+            self.gauges[key] -= 1
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+        self.started_at = time.monotonic()
+
+    def to_prometheus(self) -> str:
+        """Текстовый формат экспозиции Prometheus"""
+        lines: List[str] = []
+        typed = set()
+
+        def header(name: str, kind: str) -> None:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            full_name = f"{METRICS_PREFIX}_{name}"
+            header(full_name, "counter")
+            lines.append(f"{full_name}{_format_labels(labels)} {value:g}")
+
+        for (name, labels), value in sorted(self.gauges.items()):
+            full_name = f"{METRICS_PREFIX}_{name}"
+            header(full_name, "gauge")
+            lines.append(f"{full_name}{_format_labels(labels)} {value:g}")
+
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            full_name = f"{METRICS_PREFIX}_{name}"
+            header(full_name, "histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{full_name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {cumulative}")
+            lines.append(f"{full_name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+            lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram.sum:g}")
+            lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """Сводка для JSON: имя{метки} → значение или статистика гистограммы"""
+        def flat(key: MetricKey) -> str:
+            name, labels = key
+            return f"{name}{_format_labels(labels)}"
+
+        return {
+            "uptime": round(time.monotonic() - self.started_at, 3),
+            "counters": {flat(key): value for key, value in sorted(self.counters.items())},
+            "gauges": {flat(key): value for key, value in sorted(self.gauges.items())},
+            "histograms": {
+                flat(key): histogram.summary()
+                for key, histogram in sorted(self.histograms.items(), key=lambda item: item[0])
+            },
+        }
+
+
+# Общий для процесса реестр метрик
+metrics = Metrics()
+
+
+async def start_metrics_server(port: int, host: str = "0.0.0.0") -> web.AppRunner:
+    """HTTP-сервер с /metrics (Prometheus) и /metrics.json"""
+    async def prometheus(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.to_prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def summary(request: web.Request) -> web.Response:
+        return web.json_response(metrics.summary())
+
+    app = web.Application()
+    app.router.add_get("/metrics", prometheus)
+    app.router.add_get("/metrics.json", summary)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
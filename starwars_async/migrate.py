@@ -1,9 +1,6 @@
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from models import Base
-from dotenv import load_dotenv
-import os
+from starwars_async.database import create_engine
+from starwars_async.models import Base
 import asyncio
 import logging
 
@@ -14,23 +11,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Загружаем переменные окружения
-load_dotenv()
-
-# Получаем URL базы данных
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL не найден в .env файле")
-
-# Создаем асинхронный движок SQLAlchemy с настройками пула соединений
-async_engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=3600
-)
+# Движок из общей фабрики (те же настройки пула и SQLite, что у загрузчика), SQL — в лог
+async_engine = create_engine(echo=True)
 
 
 async def test_connection():
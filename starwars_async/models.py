@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import (
+    Column, Integer, BigInteger, Float, String, Text, Boolean, DateTime, ForeignKey, Table, Index, func
+)
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -21,6 +23,13 @@ class Character(Base):
     starships = Column(Text, nullable=True)
     vehicles = Column(Text, nullable=True)
 
+    # Нормализованные поля
+    homeworld_id = Column(Integer, ForeignKey('planets.id', ondelete='SET NULL'), nullable=True, index=True)
+    height_cm = Column(Integer, nullable=True, index=True)
+    mass_kg = Column(Float, nullable=True, index=True)
+
+    row_hash = Column(String(64), nullable=True)  # Хэш очищенной строки (запись только при изменении)
+
     def __repr__(self):
         return f"<Character(id={self.id}, name='{self.name}', species='{self.species}')>"
 
@@ -43,6 +52,15 @@ class Starship(Base):
     films = Column(Text, nullable=True)
     pilots = Column(Text, nullable=True)  # Добавлено новое поле
 
+    # Числовые поля (диапазоны "30-165" — как минимум и максимум)
+    cost_in_credits_num = Column(BigInteger, nullable=True)
+    length_m = Column(Float, nullable=True)
+    crew_min = Column(Integer, nullable=True)
+    crew_max = Column(Integer, nullable=True)
+    passengers_num = Column(BigInteger, nullable=True)
+
+    row_hash = Column(String(64), nullable=True)  # Хэш очищенной строки (запись только при изменении)
+
     def __repr__(self):
         return f"<Starship(id={self.id}, name='{self.name}', class='{self.starship_class}')>"
 
@@ -64,6 +82,15 @@ class Vehicle(Base):
     films = Column(Text, nullable=True)
     pilots = Column(Text, nullable=True)  # Добавлено новое поле
 
+    # Числовые поля (диапазоны "30-165" — как минимум и максимум)
+    cost_in_credits_num = Column(BigInteger, nullable=True)
+    length_m = Column(Float, nullable=True)
+    crew_min = Column(Integer, nullable=True)
+    crew_max = Column(Integer, nullable=True)
+    passengers_num = Column(BigInteger, nullable=True)
+
+    row_hash = Column(String(64), nullable=True)  # Хэш очищенной строки (запись только при изменении)
+
     def __repr__(self):
         return f"<Vehicle(id={self.id}, name='{self.name}', class='{self.vehicle_class}')>"
 
@@ -84,5 +111,133 @@ class Planet(Base):
     residents = Column(Text, nullable=True)  # Добавлено новое поле
     films = Column(Text, nullable=True)      # Добавлено новое поле
 
+    # Нормализованные поля
+    diameter_km = Column(Integer, nullable=True)
+    population_num = Column(BigInteger, nullable=True, index=True)
+
+    row_hash = Column(String(64), nullable=True)  # Хэш очищенной строки (запись только при изменении)
+
     def __repr__(self):
         return f"<Planet(id={self.id}, name='{self.name}', population='{self.population}')>"
+
+
+class Film(Base):
+    __tablename__ = 'films'
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String(100), nullable=False, index=True)
+    episode_id = Column(Integer, nullable=True)
+    director = Column(String(100), nullable=True)
+    producer = Column(String(255), nullable=True)
+    release_date = Column(String(20), nullable=True)
+    row_hash = Column(String(64), nullable=True)  # Хэш очищенной строки (запись только при изменении)
+
+    def __repr__(self):
+        return f"<Film(id={self.id}, title='{self.title}')>"
+
+
+class Species(Base):
+    __tablename__ = 'species'
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False, index=True)
+    classification = Column(String(50), nullable=True)
+    designation = Column(String(50), nullable=True)
+    language = Column(String(50), nullable=True)
+    row_hash = Column(String(64), nullable=True)  # Хэш очищенной строки (запись только при изменении)
+
+    def __repr__(self):
+        return f"<Species(id={self.id}, name='{self.name}')>"
+
+
+def association_table(name: str, owner: str, owner_table: str, target: str, target_table: str) -> Table:
+    """Таблица связи многие-ко-многим с индексом по второй колонке"""
+    return Table(
+        name,
+        Base.metadata,
+        Column(owner, Integer, ForeignKey(f'{owner_table}.id', ondelete='CASCADE'), primary_key=True),
+        Column(target, Integer, ForeignKey(f'{target_table}.id', ondelete='CASCADE'), primary_key=True),
+        Index(f'ix_{name}_{target}', target),
+    )
+
+
+# Таблицы связей нормализованной схемы
+character_films = association_table('character_films', 'character_id', 'characters', 'film_id', 'films')
+character_species = association_table('character_species', 'character_id', 'characters', 'species_id', 'species')
+character_starships = association_table('character_starships', 'character_id', 'characters', 'starship_id', 'starships')
+character_vehicles = association_table('character_vehicles', 'character_id', 'characters', 'vehicle_id', 'vehicles')
+starship_films = association_table('starship_films', 'starship_id', 'starships', 'film_id', 'films')
+starship_pilots = association_table('starship_pilots', 'starship_id', 'starships', 'character_id', 'characters')
+vehicle_films = association_table('vehicle_films', 'vehicle_id', 'vehicles', 'film_id', 'films')
+vehicle_pilots = association_table('vehicle_pilots', 'vehicle_id', 'vehicles', 'character_id', 'characters')
+planet_films = association_table('planet_films', 'planet_id', 'planets', 'film_id', 'films')
+
+
+class SyncState(Base):
+    __tablename__ = 'sync_state'
+
+    entity_type = Column(String(20), primary_key=True)
+    last_page = Column(Integer, nullable=False, default=0)  # Последняя полностью записанная страница
+    next_url = Column(Text, nullable=True)  # URL страницы, с которой продолжать
+    completed = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<SyncState(entity_type='{self.entity_type}', last_page={self.last_page}, completed={self.completed})>"
+
+
+class EntitySyncState(Base):
+    __tablename__ = 'entity_sync_state'
+
+    entity_type = Column(String(20), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    edited = Column(String(40), nullable=True)  # Поле edited из API
+    content_hash = Column(String(64), nullable=True)  # Хэш properties, если edited нет
+
+    def __repr__(self):
+        return f"<EntitySyncState(entity_type='{self.entity_type}', entity_id={self.entity_id}, edited='{self.edited}')>"
+
+
+class ShardState(Base):
+    __tablename__ = 'shard_state'
+
+    shard_id = Column(String(50), primary_key=True)  # entity_type:first_page-last_page
+    entity_type = Column(String(20), nullable=False, index=True)
+    first_page = Column(Integer, nullable=False)
+    last_page = Column(Integer, nullable=False)
+    status = Column(String(10), nullable=False, default='pending')  # pending / running / done / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    written = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ShardState(shard_id='{self.shard_id}', status='{self.status}', attempts={self.attempts})>"
+
+
+class DeadLetter(Base):
+    __tablename__ = 'dead_letters'
+
+    entity_type = Column(String(20), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    url = Column(Text, nullable=True)
+    stage = Column(String(20), nullable=False)  # fetch / relations / write / deadline
+    reason = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<DeadLetter(entity_type='{self.entity_type}', entity_id={self.entity_id}, attempts={self.attempts})>"
+
+
+class DataVersion(Base):
+    __tablename__ = 'data_versions'
+
+    table_name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)  # Растёт с каждым коммитом изменённых строк
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<DataVersion(table_name='{self.table_name}', version={self.version})>"
@@ -0,0 +1,199 @@
+import logging
+from collections import defaultdict
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import Table, bindparam, delete, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from starwars_async.api_client import extract_id
+from starwars_async.data_versions import bump_versions
+from starwars_async.database import AsyncSessionLocal
+from starwars_async.models import (
+    Character,
+    Planet,
+    character_films,
+    character_species,
+    character_starships,
+    character_vehicles,
+    planet_films,
+    starship_films,
+    starship_pilots,
+    vehicle_films,
+    vehicle_pilots,
+)
+
+logger = logging.getLogger(__name__)
+
+# Связи: endpoint → поле properties → таблица связи
+RELATION_TABLES: Dict[str, Dict[str, Table]] = {
+    "people": {
+        "films": character_films,
+        "species": character_species,
+        "starships": character_starships,
+        "vehicles": character_vehicles,
+    },
+    "starships": {"films": starship_films, "pilots": starship_pilots},
+    "vehicles": {"films": vehicle_films, "pilots": vehicle_pilots},
+    "planets": {"films": planet_films},
+}
+
+# Представления совместимости со старыми текстовыми колонками
+COMPAT_VIEWS = ("characters_flat", "starships_flat", "vehicles_flat", "planets_flat")
+
+
+def build_insert_ignore(dialect_name: str, table: Table):
+    """INSERT ... ON CONFLICT DO NOTHING для таблиц связей"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Insert ignore is not supported for dialect {dialect_name}")
+    return insert(table).on_conflict_do_nothing()
+
+
+class NormalizedWriter:
+    """Сбор и запись связей нормализованной схемы.
+
+    Связи берутся из URL в исходных properties и записываются одним проходом
+    после основных таблиц, чтобы внешние ключи всегда указывали на
+    существующие строки.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.links: Dict[Table, List[Tuple[int, int]]] = defaultdict(list)
+        self.owners: Dict[Table, Set[int]] = defaultdict(set)
+        self.homeworlds: Dict[int, Optional[int]] = {}
+
+    def collect(self, endpoint: str, entity_id: int, properties: Dict[str, Any]) -> None:
+        """Запоминание связей сущности из её properties"""
+        for field, table in RELATION_TABLES.get(endpoint, {}).items():
+            self.owners[table].add(entity_id)
+            for url in properties.get(field) or []:
+                target_id = extract_id(url)
+                if target_id is not None:
+                    self.links[table].append((entity_id, target_id))
+
+        if endpoint == "people":
+            homeworld = properties.get("homeworld")
+            self.homeworlds[entity_id] = extract_id(homeworld) if homeworld else None
+
+    async def _write_links(self) -> None:
+        """Замена связей загруженных сущностей и обновление homeworld_id"""
+        async with self.session_factory() as db_session:
+            async with db_session.begin():
+                dialect_name = db_session.bind.dialect.name
+                existing: Dict[str, Set[int]] = {}
+
+                async def existing_ids(table_name: str) -> Set[int]:
+                    if table_name not in existing:
+                        result = await db_session.execute(text(f"SELECT id FROM {table_name}"))
+                        existing[table_name] = set(result.scalars())
+                    return existing[table_name]
+
+                for table, owners in self.owners.items():
+                    owner_column, target_column = table.primary_key.columns
+                    await db_session.execute(delete(table).where(owner_column.in_(owners)))
+
+                    # Ссылки на незагруженные сущности пропускаем, чтобы не нарушать внешние ключи
+                    target_table = next(iter(target_column.foreign_keys)).column.table.name
+                    targets = await existing_ids(target_table)
+                    rows = [
+                        {owner_column.name: owner_id, target_column.name: target_id}
+                        for owner_id, target_id in set(self.links[table])
+                        if target_id in targets
+                    ]
+                    if rows:
+                        await db_session.execute(build_insert_ignore(dialect_name, table), rows)
+
+                if self.homeworlds:
+                    planets = await existing_ids(Planet.__tablename__)
+                    await db_session.execute(
+                        update(Character.__table__)
+                        .where(Character.__table__.c.id == bindparam("character_id"))
+                        .values(homeworld_id=bindparam("planet_id")),
+                        [
+                            {"character_id": character_id, "planet_id": planet_id if planet_id in planets else None}
+                            for character_id, planet_id in self.homeworlds.items()
+                        ],
+                    )
+                await bump_versions(
+                    db_session,
+                    [table.name for table in self.owners] + ([Character.__tablename__] if self.homeworlds else [])
+                )
+
+    async def finalize(self) -> None:
+        """Запись связей и представлений совместимости (фильмы и виды пишутся как обычные сущности)"""
+        await self._write_links()
+        async with self.session_factory() as db_session:
+            async with db_session.begin():
+                conn = await db_session.connection()
+                await create_compat_views(conn)
+        logger.info(
+            "Normalized relations saved: "
+            + ", ".join(f"{table.name}={len(set(rows))}" for table, rows in self.links.items())
+        )
+
+
+def _aggregate(dialect_name: str, expression: str, order_by: str) -> str:
+    """Агрегация строк через запятую для диалекта"""
+    if dialect_name == "postgresql":
+        return f"string_agg({expression}, ', ' ORDER BY {order_by})"
+    return f"group_concat({expression}, ', ')"
+
+
+def _names(dialect_name: str, link: str, owner: str, target_table: str, target: str, label: str, alias: str) -> str:
+    """Подзапрос со списком названий связанных сущностей"""
+    return (
+        f"(SELECT {_aggregate(dialect_name, f't.{label}', 't.id')} FROM {link} l "
+        f"JOIN {target_table} t ON t.id = l.{target} WHERE l.{owner} = {alias}.id)"
+    )
+
+
+def compat_view_statements(dialect_name: str) -> List[str]:
+    """Представления *_flat со старыми текстовыми колонками поверх нормализованной схемы"""
+    create = "CREATE OR REPLACE VIEW" if dialect_name == "postgresql" else "CREATE VIEW IF NOT EXISTS"
+    n = partial(_names, dialect_name)
+    return [
+        f"{create} characters_flat AS SELECT c.id, c.birth_year, c.eye_color, "
+        f"{n('character_films', 'character_id', 'films', 'film_id', 'title', 'c')} AS films, "
+        f"c.gender, c.hair_color, c.height, p.name AS homeworld, c.mass, c.name, c.skin_color, "
+        f"{n('character_species', 'character_id', 'species', 'species_id', 'name', 'c')} AS species, "
+        f"{n('character_starships', 'character_id', 'starships', 'starship_id', 'name', 'c')} AS starships, "
+        f"{n('character_vehicles', 'character_id', 'vehicles', 'vehicle_id', 'name', 'c')} AS vehicles "
+        f"FROM characters c LEFT JOIN planets p ON p.id = c.homeworld_id",
+
+        f"{create} starships_flat AS SELECT s.id, s.name, s.model, s.manufacturer, s.cost_in_credits, "
+        f"s.length, s.crew, s.passengers, s.cargo_capacity, s.consumables, s.hyperdrive_rating, "
+        f"s.starship_class, "
+        f"{n('starship_films', 'starship_id', 'films', 'film_id', 'title', 's')} AS films, "
+        f"{n('starship_pilots', 'starship_id', 'characters', 'character_id', 'name', 's')} AS pilots "
+        f"FROM starships s",
+
+        f"{create} vehicles_flat AS SELECT v.id, v.name, v.model, v.manufacturer, v.cost_in_credits, "
+        f"v.length, v.crew, v.passengers, v.cargo_capacity, v.consumables, v.vehicle_class, "
+        f"{n('vehicle_films', 'vehicle_id', 'films', 'film_id', 'title', 'v')} AS films, "
+        f"{n('vehicle_pilots', 'vehicle_id', 'characters', 'character_id', 'name', 'v')} AS pilots "
+        f"FROM vehicles v",
+
+        f"{create} planets_flat AS SELECT p.id, p.name, p.diameter, p.rotation_period, p.orbital_period, "
+        f"p.gravity, p.population, p.climate, p.terrain, p.surface_water, "
+        f"(SELECT {_aggregate(dialect_name, 'c.name', 'c.id')} FROM characters c "
+        f"WHERE c.homeworld_id = p.id) AS residents, "
+        f"{n('planet_films', 'planet_id', 'films', 'film_id', 'title', 'p')} AS films "
+        f"FROM planets p",
+    ]
+
+
+async def drop_compat_views(conn: AsyncConnection) -> None:
+    """Удаление представлений совместимости (перед пересозданием таблиц)"""
+    for view in COMPAT_VIEWS:
+        await conn.execute(text(f"DROP VIEW IF EXISTS {view}"))
+
+
+async def create_compat_views(conn: AsyncConnection) -> None:
+    """Создание представлений совместимости"""
+    for statement in compat_view_statements(conn.dialect.name):
+        await conn.execute(text(statement))
@@ -0,0 +1,56 @@
+import math
+import re
+from typing import Any, Optional, Tuple
+
+# Значения, означающие отсутствие данных
+MISSING_VALUES = ("unknown", "n/a", "none", "indefinite", "")
+
+# Диапазон "30-165" (дефис или тире)
+RANGE_PATTERN = re.compile(r"^\s*([\d.,]+)\s*[-\u2013]\s*([\d.,]+)\s*$")
+
+
+def parse_float(value: Any) -> Optional[float]:
+    """Разбор числа из строки API ("1,358" → 1358.0, "unknown" → None, "inf"/"nan" → None)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        text = str(value).strip().lower().replace(",", "")
+        if text in MISSING_VALUES:
+            return None
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+    # float() принимает "inf" и "nan": в числовые колонки и агрегаты они попадать не должны
+    return number if math.isfinite(number) else None
+
+
+def parse_int(value: Any) -> Optional[int]:
+    """Разбор целого числа из строки API"""
+    number = parse_float(value)
+    return int(number) if number is not None else None
+
+
+def parse_range(value: Any) -> Tuple[Optional[float], Optional[float]]:
+    """Разбор числа или диапазона в (минимум, максимум): "30-165" → (30.0, 165.0), "1,358" → (1358.0, 1358.0)"""
+    if isinstance(value, str) and (match := RANGE_PATTERN.match(value)):
+        low, high = parse_float(match.group(1)), parse_float(match.group(2))
+        if low is not None and high is not None:
+            return min(low, high), max(low, high)
+        return None, None
+    number = parse_float(value)
+    return number, number
+
+
+def parse_range_min(value: Any) -> Optional[int]:
+    """Нижняя граница целочисленного диапазона"""
+    low = parse_range(value)[0]
+    return int(low) if low is not None else None
+
+
+def parse_range_max(value: Any) -> Optional[int]:
+    """Верхняя граница целочисленного диапазона"""
+    high = parse_range(value)[1]
+    return int(high) if high is not None else None
@@ -0,0 +1,297 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import FrameType
+from typing import Any, Awaitable, Callable, Dict, Generator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация
+SAMPLE_INTERVAL = 0.005  # секунд между снимками стека
+SLOW_CALLBACK_THRESHOLD = 0.05  # секунд; дольше — шаг цикла событий считается блокирующим
+PROFILE_TOP = 25  # строк в каждой таблице отчёта
+PROFILE_OUTPUT = "profile"  # префикс файлов: .collapsed (flamegraph) и .txt (отчёт)
+SLOW_CALLBACK_REPR = 300  # символов описания медленного шага в отчёте
+
+# Кадры цикла событий ниже шага задачи в стеки не попадают
+LOOP_FRAME = "events.py:Handle._run"
+
+
+def frame_label(frame: FrameType) -> str:
+    """Кадр как "файл.py:Класс.функция" (без номера строки — для агрегации)"""
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+@dataclass
+class CoroutineTiming:
+    """Суммарное время вызовов одной корутины"""
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    max_wall: float = 0.0
+
+    def record(self, wall: float, cpu: float) -> None:
+        self.calls += 1
+        self.wall += wall
+        self.cpu += cpu
+        self.max_wall = max(self.max_wall, wall)
+
+
+# Замер, к которому относится текущий шаг (задачи, созданные на этом шаге, наследуют его через контекст)
+_current_timing: ContextVar[Optional[CoroutineTiming]] = ContextVar("profiling_timing", default=None)
+
+
+class TimedCoroutine:
+    """Обёртка корутины с замером стены и CPU.
+
+    CPU — время потока только на шагах самой корутины (между её await)
+    и задач, которые она создала (wait_for, gather), поэтому ожидание сети,
+    семафоров и очередей в него не входит, а разница wall − cpu показывает,
+    сколько корутина ждала.
+    """
+
+    def __init__(self, coro: Any, timing: CoroutineTiming, count_call: bool = True):
+        self.coro = coro
+        self.timing = timing
+        self.count_call = count_call
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        started = time.perf_counter()
+        cpu = 0.0
+        value: Any = None
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                step = time.thread_time()
+                token = _current_timing.set(self.timing)
+                try:
+                    signal = self.coro.send(value) if error is None else self.coro.throw(error)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    _current_timing.reset(token)
+                    cpu += time.thread_time() - step
+                value, error = None, None
+                try:
+                    value = yield signal
+                except GeneratorExit:
+                    self.coro.close()
+                    raise
+                except BaseException as e:  # CancelledError и прочее передаются внутрь корутины
+                    error = e
+        finally:
+            if self.count_call:
+                self.timing.record(time.perf_counter() - started, cpu)
+            else:
+                self.timing.cpu += cpu
+
+
+async def _charge_cpu(coro: Any, timing: CoroutineTiming) -> Any:
+    """Корутина дочерней задачи: её CPU относится к создавшей её корутине"""
+    return await TimedCoroutine(coro, timing, count_call=False)
+
+
+class LoaderProfiler:
+    """Профилирование загрузки без изменения её кода.
+
+    - сэмплирующий профилировщик: отдельный поток раз в interval снимает
+      стек потока цикла событий; стек обрезается по шагу задачи asyncio
+      (видна цепочка await задачи, а не механизм цикла), ожидание
+      ввода-вывода помечается как [idle];
+    - замер каждого шага цикла событий: шаги дольше slow_callback (блокирующий
+      код) попадают в отчёт. Режим отладки asyncio не используется: он
+      снимает traceback на каждый колбэк и сам становится горячей точкой;
+    - стена и CPU по стадиям конвейера, load_entity и записи пакетов.
+    """
+
+    def __init__(
+            self,
+            interval: float = SAMPLE_INTERVAL,
+            slow_callback: float = SLOW_CALLBACK_THRESHOLD
+    ):
+        self.interval = interval
+        self.slow_callback = slow_callback
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.timings: Dict[str, CoroutineTiming] = {}
+        self.slow_callbacks: List[Tuple[float, str]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._task_factory: Optional[Callable] = None
+        self._original_handle_run: Optional[Callable] = None
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def timed(self, name: str, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Функция, возвращающая корутину func с замером времени под именем name"""
+        timing = self.timings.setdefault(name, CoroutineTiming())
+
+        def wrapper(*args: Any, **kwargs: Any) -> TimedCoroutine:
+            return TimedCoroutine(func(*args, **kwargs), timing)
+
+        return wrapper
+
+    def instrument(self, loader: Any) -> None:
+        """Замеры на экземпляре DataLoader: стадии конвейера, load_entity, запись пакетов"""
+        run_stage = loader._run_stage
+
+        def timed_stage(inbox: asyncio.Queue, handler: Callable[[Any], Awaitable[None]], stage: str):
+            return run_stage(inbox, self.timed(f"{handler.__name__} [{stage}]", handler), stage)
+
+        loader._run_stage = timed_stage
+        loader.load_entity = self.timed("load_entity", loader.load_entity)
+        loader.writer._write_batch = self.timed("BulkWriter._write_batch", loader.writer._write_batch)
+
+    def start(self) -> None:
+        """Запуск из потока цикла событий"""
+        if self._sampler is not None:
+            # Повторная подмена сохранила бы вместо исходного Handle._run уже обёрнутый
+            raise RuntimeError("Profiler is already started")
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._original_handle_run = asyncio.events.Handle._run
+        asyncio.events.Handle._run = self._timed_handle_run()
+        self._task_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._create_task)
+        self.started = time.perf_counter()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        """Остановка и восстановление Handle._run и фабрики задач (повторный вызов ничего не делает)"""
+        if self._sampler is None:
+            return
+        self.elapsed = time.perf_counter() - self.started
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+        asyncio.events.Handle._run = self._original_handle_run
+        self._loop.set_task_factory(self._task_factory)
+        self._original_handle_run = self._task_factory = self._loop = None
+
+    def _timed_handle_run(self) -> Callable[[asyncio.Handle], None]:
+        """Handle._run с замером шага (аналог slow_callback_duration в режиме отладки asyncio)"""
+        original = self._original_handle_run
+        threshold = self.slow_callback
+        slow_callbacks = self.slow_callbacks
+
+        def _run(handle: asyncio.Handle) -> None:
+            started = time.perf_counter()
+            try:
+                original(handle)
+            finally:
+                duration = time.perf_counter() - started
+                if duration >= threshold:
+                    slow_callbacks.append((duration, repr(handle)[:SLOW_CALLBACK_REPR]))
+
+        return _run
+
+    def _create_task(self, loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Task:
+        """Фабрика задач: CPU задачи, созданной внутри замеряемой корутины, относится к ней"""
+        timing = _current_timing.get()
+        if timing is not None:
+            coro = _charge_cpu(coro, timing)
+        if self._task_factory is not None:
+            return self._task_factory(loop, coro, **kwargs)
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._record(frame)
+
+    def _record(self, frame: FrameType) -> None:
+        stack: List[str] = []
+        while frame is not None:
+            stack.append(frame_label(frame))
+            frame = frame.f_back
+        stack.reverse()
+        if stack and stack[-1].startswith("selectors.py:") and stack[-1].endswith(".select"):
+            stack = ["[idle]"]
+        elif LOOP_FRAME in stack:
+            stack = stack[len(stack) - stack[::-1].index(LOOP_FRAME):]
+            stack = [label for label in stack if not label.startswith("profiling.py:")]
+        else:
+            stack = ["[loop]"] + stack
+        self.stacks[";".join(stack)] += 1
+        self.samples += 1
+
+    def write_collapsed(self, path: str) -> None:
+        """Стеки в формате collapsed (flamegraph.pl, speedscope, inferno)"""
+        with open(path, "w", encoding="utf-8") as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+
+    def report(self, top: int = PROFILE_TOP) -> str:
+        """Текстовый отчёт: горячие функции, корутины (wall/CPU) и медленные шаги цикла"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+
+        samples = self.samples or 1
+        lines = [
+            f"Elapsed {self.elapsed:.2f}s, {self.samples} samples every {self.interval * 1000:.0f}ms, "
+            f"idle {own['[idle]'] / samples:.1%}",
+            "",
+            f"Top {top} functions by own samples:",
+        ]
+        lines += [f"{count / samples:7.1%}  {count:7d}  {frame}" for frame, count in own.most_common(top)]
+        lines += ["", f"Top {top} functions by total samples (including callees):"]
+        lines += [f"{count / samples:7.1%}  {count:7d}  {frame}" for frame, count in total.most_common(top)]
+
+        lines += ["", "Coroutines (wall vs CPU):",
+                  f"{'calls':>8} {'wall s':>10} {'cpu s':>10} {'cpu %':>7} {'mean ms':>9} {'max ms':>9}  name"]
+        for name, timing in sorted(self.timings.items(), key=lambda item: -item[1].wall):
+            if not timing.calls:
+                continue
+            lines.append(
+                f"{timing.calls:8d} {timing.wall:10.3f} {timing.cpu:10.3f} "
+                f"{timing.cpu / timing.wall if timing.wall else 0:7.1%} "
+                f"{timing.wall / timing.calls * 1000:9.2f} {timing.max_wall * 1000:9.2f}  {name}"
+            )
+
+        lines += ["", f"Slow event loop steps (> {self.slow_callback * 1000:.0f}ms): {len(self.slow_callbacks)}"]
+        for duration, handle in sorted(self.slow_callbacks, reverse=True)[:top]:
+            lines.append(f"{duration * 1000:9.1f}ms  {handle}")
+        return "\n".join(lines)
+
+    def write(self, output: str = PROFILE_OUTPUT, top: int = PROFILE_TOP) -> str:
+        """Запись {output}.collapsed и {output}.txt; возвращает отчёт"""
+        report = self.report(top)
+        self.write_collapsed(f"{output}.collapsed")
+        with open(f"{output}.txt", "w", encoding="utf-8") as file:
+            file.write(report + "\n")
+        logger.info(f"Profile saved to {output}.collapsed and {output}.txt")
+        return report
+
+
+async def run_profiled(
+        loader: Any,
+        output: str = PROFILE_OUTPUT,
+        interval: float = SAMPLE_INTERVAL,
+        top: int = PROFILE_TOP
+) -> None:
+    """DataLoader.run() под профилировщиком с записью отчёта по окончании"""
+    profiler = LoaderProfiler(interval=interval)
+    profiler.instrument(loader)
+    profiler.start()
+    try:
+        await loader.run()
+    finally:
+        profiler.stop()
+        logger.info("Profile report:\n" + profiler.write(output, top))
@@ -0,0 +1,172 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+# Конфигурация
+REQUESTS_PER_SECOND = 10.0  # начальная скорость token bucket
+MAX_REQUESTS_PER_SECOND = 50.0
+INITIAL_CONCURRENCY = 5
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 30
+DECREASE_FACTOR = 0.5  # мультипликативное снижение при 429/5xx
+BACKOFF_BASE = 0.5  # секунд
+BACKOFF_CAP = 30.0  # секунд
+DECREASE_COOLDOWN = 1.0  # секунд между снижениями (одна волна 429 — одно снижение)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Разбор заголовка Retry-After (секунды или HTTP-дата)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def jittered_backoff(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """Экспоненциальная задержка с полным джиттером"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveRateLimiter:
+    """Token bucket + AIMD-лимит параллельности для одного хоста.
+
+    Пока ответы успешны, скорость и число одновременных запросов растут
+    аддитивно; при 429/5xx и сетевых ошибках — снижаются мультипликативно.
+    """
+
+    def __init__(
+            self,
+            rate: float = REQUESTS_PER_SECOND,
+            max_rate: float = MAX_REQUESTS_PER_SECOND,
+            concurrency: int = INITIAL_CONCURRENCY,
+            min_concurrency: int = MIN_CONCURRENCY,
+            max_concurrency: int = MAX_CONCURRENCY,
+            decrease_factor: float = DECREASE_FACTOR
+    ):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = 1.0
+        self.limit = float(concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+
+        self._tokens = float(concurrency)
+        self._updated_at = time.monotonic()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._decreased_at = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        """Condition создаётся лениво внутри текущего цикла событий"""
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            self._in_flight = 0
+        return self._condition
+
+    def _refill(self) -> None:
+        """Пополнение токенов по прошедшему времени"""
+        now = time.monotonic()
+        burst = max(1.0, self.limit)
+        self._tokens = min(burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """Ожидание свободного слота, окончания паузы и токена"""
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+        try:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        except BaseException:
+            await self.release()
+            raise
+
+    async def release(self) -> None:
+        """Освобождение слота"""
+        condition = self._get_condition()
+        async with condition:
+            self._in_flight -= 1
+            condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Контекстный менеджер для одного запроса"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
+
+    def on_success(self) -> None:
+        """Аддитивное увеличение: примерно +1 слот за «окно» успешных ответов"""
+        self.limit = min(self.max_concurrency, self.limit + 1 / max(1.0, self.limit))
+        self.rate = min(self.max_rate, self.rate + 1 / max(1.0, self.rate))
+
+    def on_throttle(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Мультипликативное снижение после 429/5xx/ошибки; возвращает задержку перед повтором"""
+        now = time.monotonic()
+        if now - self._decreased_at >= DECREASE_COOLDOWN:
+            self._decreased_at = now
+            self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0.0)
+
+        delay = retry_after if retry_after is not None else jittered_backoff(attempt)
+        if retry_after is not None:
+            # Сервер явно попросил подождать — пауза для всех запросов к хосту
+            self._paused_until = max(self._paused_until, now + retry_after)
+        return delay
+
+    def stats(self) -> Dict[str, float]:
+        """Текущие параметры лимитера"""
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "rate": round(self.rate, 2),
+            "in_flight": self._in_flight,
+        }
+
+
+# Лимитеры по хостам (общие для всего процесса)
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+
+
+def get_limiter(url: str) -> AdaptiveRateLimiter:
+    """Общий лимитер для хоста из URL"""
+    host = urlsplit(url.strip()).netloc
+    limiter = _limiters.get(host)
+    if limiter is None:
+        limiter = _limiters[host] = AdaptiveRateLimiter()
+    return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, float]]:
+    """Параметры всех лимитеров по хостам"""
+    return {host: limiter.stats() for host, limiter in _limiters.items()}
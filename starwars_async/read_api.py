@@ -0,0 +1,475 @@
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from aiohttp import web
+from sqlalchemy import BigInteger, Float, Integer, Table, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from starwars_async.data_versions import load_versions
+from starwars_async.database import engine
+from starwars_async.entities import ENTITY_SPECS
+from starwars_async.export import export_columns
+from starwars_async.logging_config import LOG_FORMAT, LOG_FORMATS, LOG_LEVEL, setup_logging
+from starwars_async.metrics import metrics
+from starwars_async.models import (
+    Base,
+    character_films,
+    character_species,
+    character_starships,
+    character_vehicles,
+    planet_films,
+    starship_films,
+    starship_pilots,
+    vehicle_films,
+    vehicle_pilots,
+)
+from starwars_async.search import SEARCH_FIELDS, SEARCH_LIMIT, SEARCH_MODES, SearchIndex
+from starwars_async.transport import dumps
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация
+READ_API_HOST = os.getenv("READ_API_HOST", "0.0.0.0")
+READ_API_PORT = int(os.getenv("READ_API_PORT", "8080"))
+RESULT_CACHE_SIZE = 10000  # готовых ответов
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+VERSION_POLL_INTERVAL = 1.0  # секунд между проверками data_versions
+
+# Ресурс API → таблица
+RESOURCES: Dict[str, Table] = {spec.model.__tablename__: spec.model.__table__ for spec in ENTITY_SPECS}
+
+
+@dataclass(frozen=True)
+class Relation:
+    """Связь ресурса: id результатов — значения target_column таблицы link
+    в строках, где owner_column равна id запрошенной сущности"""
+    target: str
+    link: str
+    owner_column: str
+    target_column: str
+
+
+def link_relations(link: Table, forward: str, reverse: Optional[str]) -> Dict[Tuple[str, str], Relation]:
+    """Связи через таблицу многие-ко-многим (в обе стороны, если задано имя обратной)"""
+    owner, target = link.primary_key.columns
+    owner_table = next(iter(owner.foreign_keys)).column.table.name
+    target_table = next(iter(target.foreign_keys)).column.table.name
+    relations = {(owner_table, forward): Relation(target_table, link.name, owner.name, target.name)}
+    if reverse:
+        relations[(target_table, reverse)] = Relation(owner_table, link.name, target.name, owner.name)
+    return relations
+
+
+# (ресурс, имя связи) → связь; таблицы многие-ко-многим заполняются загрузкой с --normalized
+RELATIONS: Dict[Tuple[str, str], Relation] = {
+    ("characters", "homeworld"): Relation("planets", "characters", "id", "homeworld_id"),
+    ("planets", "residents"): Relation("characters", "characters", "homeworld_id", "id"),
+    **link_relations(character_films, "films", "characters"),
+    **link_relations(character_species, "species", "characters"),
+    **link_relations(character_starships, "starships", "characters"),
+    **link_relations(character_vehicles, "vehicles", "characters"),
+    **link_relations(starship_films, "films", "starships"),
+    **link_relations(starship_pilots, "pilots", None),  # обратная сторона — characters/{id}/starships
+    **link_relations(vehicle_films, "films", "vehicles"),
+    **link_relations(vehicle_pilots, "pilots", None),
+    **link_relations(planet_films, "films", "planets"),
+}
+
+
+@dataclass
+class CachedResult:
+    """Готовый ответ: тело, ETag и таблицы, от которых он зависит"""
+    status: int
+    body: bytes
+    etag: str
+    tables: FrozenSet[str]
+
+
+def make_result(payload: Any, tables: Set[str], status: int = 200) -> CachedResult:
+    body = dumps(payload)
+    return CachedResult(status, body, f'"{hashlib.sha1(body).hexdigest()}"', frozenset(tables))
+
+
+class ResultCache:
+    """LRU-кэш готовых ответов с инвалидацией по таблицам.
+
+    Одновременные промахи по одному ключу выполняют один запрос к БД.
+    Ответ, запрос которого начался до инвалидации, в кэш не попадает:
+    он мог прочитать данные до коммита загрузчика.
+    """
+
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.in_flight_hits = 0
+        self.invalidations = 0
+
+    async def get_or_build(
+            self,
+            key: str,
+            build: Callable[[], Awaitable[CachedResult]]
+    ) -> Tuple[CachedResult, str]:
+        """Ответ из кэша или однократная сборка; возвращает (ответ, hit / in_flight / miss)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry, "hit"
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.in_flight_hits += 1
+            result = "in_flight"
+        else:
+            self.misses += 1
+            result = "miss"
+            generation = self.generation
+            task = asyncio.ensure_future(build())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._store(key, t, generation))
+
+        # shield: отключение одного клиента не должно отменять общий запрос
+        return await asyncio.shield(task), result
+
+    def _store(self, key: str, task: asyncio.Task, generation: int) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None or generation != self.generation:
+            return
+        self._entries[key] = task.result()
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, tables: Set[str]) -> int:
+        """Удаление ответов, зависящих от изменённых таблиц; возвращает их число"""
+        self.generation += 1
+        self.invalidations += 1
+        # Новые запросы не присоединяются к сборкам, начатым до изменения
+        self._in_flight.clear()
+        stale = [key for key, entry in self._entries.items() if entry.tables & tables]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.in_flight_hits + self.misses
+        return {
+            "hits": self.hits,
+            "in_flight_hits": self.in_flight_hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.hits + self.in_flight_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def parse_value(column: Any, raw: str) -> Any:
+    """Значение фильтра в типе колонки"""
+    try:
+        if isinstance(column.type, (Integer, BigInteger)):
+            return int(raw)
+        if isinstance(column.type, Float):
+            return float(raw)
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"Invalid value for {column.name}: {raw}")
+    return raw
+
+
+def is_numeric(column: Any) -> bool:
+    return isinstance(column.type, (Integer, BigInteger, Float))
+
+
+def parse_page(request: web.Request) -> Tuple[int, Optional[int]]:
+    """Параметры keyset-пагинации: limit и after (id последней строки предыдущей страницы)"""
+    try:
+        limit = int(request.query.get("limit", DEFAULT_PAGE_LIMIT))
+        after = int(request.query["after"]) if "after" in request.query else None
+    except ValueError:
+        raise web.HTTPBadRequest(text="limit and after must be integers")
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise web.HTTPBadRequest(text=f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+    return limit, after
+
+
+def parse_filters(table: Table, request: web.Request) -> List[Any]:
+    """Фильтры списка: column=value, а для числовых колонок ещё min_column и max_column"""
+    columns = {column.name: column for column in export_columns(table)}
+    conditions = []
+    for name, raw in request.query.items():
+        if name in ("limit", "after"):
+            continue
+        bound, column_name = name[:4], name[4:]
+        if bound in ("min_", "max_") and column_name in columns and is_numeric(columns[column_name]):
+            column = columns[column_name]
+            value = parse_value(column, raw)
+            conditions.append(column >= value if bound == "min_" else column <= value)
+        elif name in columns:
+            conditions.append(columns[name] == parse_value(columns[name], raw))
+        else:
+            raise web.HTTPBadRequest(text=f"Unknown filter: {name}")
+    return conditions
+
+
+def cache_key(request: web.Request) -> str:
+    """Ключ кэша: путь и отсортированные параметры запроса"""
+    return request.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.query.items()))
+
+
+class ReadApi:
+    """HTTP API чтения загруженных данных с кэшем готовых ответов.
+
+    Повторные запросы обслуживаются из памяти без обращения к БД; клиент
+    с актуальным ETag получает 304. Кэш сбрасывается по data_versions,
+    версии которых загрузчик увеличивает в тех же транзакциях, что и данные.
+    """
+
+    def __init__(self, cache_size: int = RESULT_CACHE_SIZE, poll_interval: float = VERSION_POLL_INTERVAL):
+        self.cache = ResultCache(cache_size)
+        self.poll_interval = poll_interval
+        self.versions: Dict[str, int] = {}
+        self.search_index = SearchIndex()
+        self._watcher: Optional[asyncio.Task] = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/stats", self.handle_stats)
+        app.router.add_get("/api/search", self.handle_search)
+        app.router.add_get("/api/{resource}", self.handle_list)
+        app.router.add_get(r"/api/{resource}/{entity_id:\d+}", self.handle_get)
+        app.router.add_get(r"/api/{resource}/{entity_id:\d+}/{relation}", self.handle_relation)
+        app.on_startup.append(self._start_watcher)
+        app.on_cleanup.append(self._stop_watcher)
+        return app
+
+    async def _start_watcher(self, app: web.Application) -> None:
+        # Исходные версии — до первого запроса, чтобы не пропустить коммит между ними
+        self.versions = await self._read_versions() or {}
+        await self.search_index.load()
+        self._watcher = asyncio.create_task(self._watch_versions())
+
+    async def _stop_watcher(self, app: web.Application) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+
+    @staticmethod
+    async def _read_versions() -> Optional[Dict[str, int]]:
+        try:
+            async with engine.connect() as conn:
+                return await load_versions(conn)
+        except SQLAlchemyError as e:
+            logger.warning(f"Failed to read data versions: {str(e)}")
+            return None
+
+    async def _check_versions(self) -> None:
+        """Сравнение версий таблиц с известными и сброс зависящих ответов"""
+        versions = await self._read_versions()
+        if versions is None:
+            return
+        changed = {
+            table for table in set(versions) | set(self.versions)
+            if versions.get(table) != self.versions.get(table)
+        }
+        self.versions = versions
+        if changed:
+            # Поисковый индекс перечитывается только по изменённым таблицам
+            await self.search_index.load(changed & set(SEARCH_FIELDS))
+            dropped = self.cache.invalidate(changed)
+            metrics.inc("read_api_invalidations_total")
+            logger.info(f"Data changed in {', '.join(sorted(changed))}: dropped {dropped} cached responses")
+
+    async def _watch_versions(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self._check_versions()
+
+    async def _respond(
+            self,
+            request: web.Request,
+            route: str,
+            build: Callable[[], Awaitable[CachedResult]]
+    ) -> web.Response:
+        """Ответ через кэш с поддержкой If-None-Match"""
+        started = time.perf_counter()
+        entry, result = await self.cache.get_or_build(cache_key(request), build)
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match and entry.etag in {tag.strip() for tag in if_none_match.split(",")}:
+            result = "not_modified"
+            response = web.Response(status=304, headers={"ETag": entry.etag})
+        else:
+            response = web.Response(
+                status=entry.status,
+                body=entry.body,
+                content_type="application/json",
+                headers={"ETag": entry.etag, "Cache-Control": "no-cache"},
+            )
+        metrics.inc("read_api_requests_total", route=route, result=result)
+        metrics.observe("read_api_seconds", time.perf_counter() - started, route=route)
+        return response
+
+    @staticmethod
+    def _table(request: web.Request) -> Table:
+        table = RESOURCES.get(request.match_info["resource"])
+        if table is None:
+            raise web.HTTPNotFound(text=f"Unknown resource: {request.match_info['resource']}")
+        return table
+
+    @staticmethod
+    async def _page(
+            request: web.Request,
+            table: Table,
+            conditions: List[Any],
+            limit: int,
+            after: Optional[int]
+    ) -> Dict[str, Any]:
+        """Страница строк по возрастанию id (keyset: WHERE id > after вместо OFFSET)"""
+        columns = export_columns(table)
+        query = select(*columns).where(*conditions).order_by(table.c.id).limit(limit + 1)
+        if after is not None:
+            query = query.where(table.c.id > after)
+        async with engine.connect() as conn:
+            rows = (await conn.execute(query)).all()
+        names = [column.name for column in columns]
+        results = [dict(zip(names, row)) for row in rows[:limit]]
+        next_after = results[-1]["id"] if len(rows) > limit else None
+        return {
+            "results": results,
+            "next": str(request.rel_url.update_query(after=next_after)) if next_after is not None else None,
+        }
+
+    async def handle_get(self, request: web.Request) -> web.Response:
+        """GET /api/{resource}/{id}"""
+        table = self._table(request)
+        entity_id = int(request.match_info["entity_id"])
+
+        async def build() -> CachedResult:
+            columns = export_columns(table)
+            async with engine.connect() as conn:
+                row = (await conn.execute(select(*columns).where(table.c.id == entity_id))).first()
+            if row is None:
+                return make_result({"error": f"{table.name} {entity_id} not found"}, {table.name}, status=404)
+            return make_result(dict(zip([column.name for column in columns], row)), {table.name})
+
+        return await self._respond(request, "get", build)
+
+    async def handle_list(self, request: web.Request) -> web.Response:
+        """GET /api/{resource}?field=value&min_field=..&max_field=..&limit=..&after=.."""
+        table = self._table(request)
+        limit, after = parse_page(request)
+        conditions = parse_filters(table, request)
+
+        async def build() -> CachedResult:
+            return make_result(await self._page(request, table, conditions, limit, after), {table.name})
+
+        return await self._respond(request, "list", build)
+
+    async def handle_relation(self, request: web.Request) -> web.Response:
+        """GET /api/{resource}/{id}/{relation}?limit=..&after=.."""
+        table = self._table(request)
+        relation = RELATIONS.get((table.name, request.match_info["relation"]))
+        if relation is None:
+            raise web.HTTPNotFound(text=f"Unknown relation: {request.match_info['relation']}")
+        entity_id = int(request.match_info["entity_id"])
+        limit, after = parse_page(request)
+        target = RESOURCES[relation.target]
+        link = Base.metadata.tables[relation.link]
+        tables = {table.name, link.name, target.name}
+
+        async def build() -> CachedResult:
+            async with engine.connect() as conn:
+                exists = (await conn.execute(select(table.c.id).where(table.c.id == entity_id))).first()
+            if exists is None:
+                return make_result({"error": f"{table.name} {entity_id} not found"}, tables, status=404)
+            related_ids = select(link.c[relation.target_column]).where(
+                link.c[relation.owner_column] == entity_id,
+                link.c[relation.target_column].isnot(None),
+            )
+            return make_result(
+                await self._page(request, target, [target.c.id.in_(related_ids)], limit, after),
+                tables,
+            )
+
+        return await self._respond(request, "relation", build)
+
+    async def handle_search(self, request: web.Request) -> web.Response:
+        """GET /api/search?q=..&mode=token|prefix|fuzzy&type=..&field=..&limit=.."""
+        query = request.query.get("q", "")
+        mode = request.query.get("mode", "prefix")
+        tables = request.query.getall("type", None)
+        if mode not in SEARCH_MODES:
+            raise web.HTTPBadRequest(text=f"mode must be one of {', '.join(SEARCH_MODES)}")
+        if tables and not set(tables) <= set(SEARCH_FIELDS):
+            raise web.HTTPBadRequest(text=f"type must be one of {', '.join(SEARCH_FIELDS)}")
+        try:
+            limit = int(request.query.get("limit", SEARCH_LIMIT))
+        except ValueError:
+            raise web.HTTPBadRequest(text="limit must be an integer")
+
+        async def build() -> CachedResult:
+            hits = self.search_index.search(query, mode, tables, request.query.get("field"), limit)
+            return make_result({"results": [hit.__dict__ for hit in hits]}, set(SEARCH_FIELDS))
+
+        return await self._respond(request, "search", build)
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "cache": self.cache.stats(),
+            "search": self.search_index.stats(),
+            "versions": self.versions,
+        })
+
+
+def parse_args() -> argparse.Namespace:
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="HTTP API чтения загруженных данных")
+    parser.add_argument("--host", default=READ_API_HOST)
+    parser.add_argument("--port", type=int, default=READ_API_PORT)
+    parser.add_argument("--cache-size", type=int, default=RESULT_CACHE_SIZE, help="Готовых ответов в кэше")
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=VERSION_POLL_INTERVAL,
+        help="Секунд между проверками изменений данных"
+    )
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default=LOG_FORMAT, help="text или json")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="Уровень логирования (INFO, DEBUG, ...)")
+    return parser.parse_args()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    api = ReadApi(cache_size=args.cache_size, poll_interval=args.poll_interval)
+    runner = web.AppRunner(api.make_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+    logger.info(f"Read API listening on http://{args.host}:{args.port}/api/")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        logger.info(f"Read API cache stats: {api.cache.stats()}")
+        await runner.cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(log_format=args.log_format, level=args.log_level)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        logger.info("Read API stopped")
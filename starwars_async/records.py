@@ -0,0 +1,78 @@
+import hashlib
+import json
+import sys
+from typing import Any, Dict, Iterable, Optional, Tuple, Type, Union
+
+# Конфигурация
+MISSING_STRINGS = ("unknown", "n/a", "none", "")
+INTERN_MAX_LENGTH = 40  # короткие значения (цвета, пол, классы) повторяются и интернируются
+
+
+def content_hash(values: Dict[str, Any]) -> str:
+    """Стабильный хэш словаря (properties сущности или строки для БД)"""
+    payload = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def clean_value(value: Any, intern: bool = True) -> Optional[str]:
+    """Очистка значения из API ("unknown", "n/a" → None; списки — через запятую)"""
+    if value is None:
+        return None
+
+    if isinstance(value, list):
+        cleaned = [
+            str(v).strip() for v in value
+            if v and str(v).strip().lower() not in MISSING_STRINGS
+        ]
+        return ", ".join(cleaned) if cleaned else None
+
+    value = value.strip() if isinstance(value, str) else str(value).strip()
+    if value.lower() in MISSING_STRINGS:
+        return None
+    return sys.intern(value) if intern and len(value) <= INTERN_MAX_LENGTH else value
+
+
+class EntityRecord:
+    """Запись сущности на __slots__ вместо словаря.
+
+    Слоты — колонки таблицы модели; незаполненные слоты (например,
+    колонки нормализованной схемы в обычном режиме) в строку для БД не попадают.
+    """
+
+    __slots__ = ()
+    columns: Tuple[str, ...] = ()
+
+    def __init__(self, **values: Any):
+        for column, value in values.items():
+            setattr(self, column, value)
+
+    def as_row(self) -> Dict[str, Any]:
+        """Строка для INSERT (только заполненные колонки)"""
+        row = {}
+        for column in self.columns:
+            try:
+                row[column] = getattr(self, column)
+            except AttributeError:
+                pass
+        return row
+
+    def get(self, column: str, default: Any = None) -> Any:
+        return getattr(self, column, default)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}({self.as_row()})>"
+
+
+# Строка для пакетной записи: запись сущности или словарь колонок
+Row = Union[EntityRecord, Dict[str, Any]]
+
+
+def record_type(name: str, columns: Iterable[str]) -> Type[EntityRecord]:
+    """Класс записи со слотами под заданные колонки"""
+    columns = tuple(columns)
+    return type(name, (EntityRecord,), {"__slots__": columns, "columns": columns})
+
+
+def as_mapping(row: Row) -> Dict[str, Any]:
+    """Словарь колонок для SQLAlchemy (создаётся только на время записи пакета)"""
+    return row.as_row() if isinstance(row, EntityRecord) else row
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from starwars_async.api_client import fetch_with_retry, http_cache
+from starwars_async.database import engine, init_db
+from starwars_async.dead_letters import DeadLetterStore, FailedEntity
+from starwars_async.entities import SPECS_BY_TYPE, build_entity
+from starwars_async.http_cache import CACHE_MODES
+from starwars_async.logging_config import LOG_FORMAT, LOG_FORMATS, LOG_LEVEL, setup_logging
+from starwars_async.metrics import metrics
+from starwars_async.rate_limiter import jittered_backoff
+from starwars_async.transport import create_session
+from starwars_async.writer import BulkWriter
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация
+REDRIVE_CONCURRENCY = 5  # сущностей одновременно
+REDRIVE_ROUNDS = 3  # повторов сущности в одном запуске redrive
+REDRIVE_MAX_RETRIES = 5  # HTTP-повторов на запрос (у загрузчика — MAX_RETRIES)
+REDRIVE_BACKOFF_BASE = 2.0  # секунд, между повторами сущности
+REDRIVE_MAX_ATTEMPTS = 10  # сущности с большим числом попыток не повторяются
+
+
+class Redrive:
+    """Повторная загрузка только сущностей из dead_letters.
+
+    Каждая сущность загружается заново (properties и все связи) со своей
+    политикой повторов; успешные удаляются из dead_letters, а оставшиеся
+    сбойными получают +1 к числу попыток.
+    """
+
+    def __init__(
+            self,
+            entity_types: Optional[Sequence[str]] = None,
+            concurrency: int = REDRIVE_CONCURRENCY,
+            rounds: int = REDRIVE_ROUNDS,
+            max_retries: int = REDRIVE_MAX_RETRIES,
+            backoff_base: float = REDRIVE_BACKOFF_BASE,
+            max_attempts: Optional[int] = REDRIVE_MAX_ATTEMPTS
+    ):
+        self.entity_types = entity_types
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rounds = rounds
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_attempts = max_attempts
+        self.store = DeadLetterStore()
+        self.writer = BulkWriter(on_failure=self._row_failed)
+        self.failed_rows: Dict[Tuple[str, int], str] = {}  # (таблица, id) → ошибка записи
+
+    def _row_failed(self, table_name: str, row: Dict, error: str) -> None:
+        self.failed_rows[(table_name, row.get("id"))] = error
+
+    async def _load_one(self, session: aiohttp.ClientSession, failure: FailedEntity) -> Optional[str]:
+        """Загрузка одной сущности; возвращает причину сбоя или None"""
+        spec = SPECS_BY_TYPE.get(failure.entity_type)
+        if spec is None:
+            return f"unknown entity type {failure.entity_type}"
+        if not failure.url:
+            return "no url"
+
+        reason = "no data after retries"
+        for attempt in range(self.rounds):
+            if attempt:
+                await asyncio.sleep(jittered_backoff(attempt, base=self.backoff_base))
+            try:
+                async with self.semaphore:
+                    data = await fetch_with_retry(session, failure.url, self.max_retries)
+                    if not data:
+                        continue
+                    record = await build_entity(spec, session, failure.entity_id, data)
+                await self.writer.add(spec.model, record)
+                return None
+            except Exception as e:
+                reason = f"{type(e).__name__}: {e}"
+                logger.warning(
+                    f"Redrive of {failure.entity_type} {failure.entity_id} failed "
+                    f"(round {attempt + 1}/{self.rounds}): {reason}"
+                )
+        return reason
+
+    async def run(self) -> Dict[str, int]:
+        """Повтор всех сбойных сущностей выбранных типов"""
+        started = time.perf_counter()
+        await init_db()
+        failures = await self.store.load(self.entity_types, self.max_attempts)
+        if not failures:
+            logger.info("No dead letters to redrive")
+            return {"total": 0, "resolved": 0, "failed": 0}
+        logger.info(f"Redriving {len(failures)} failed entities")
+
+        async with create_session() as session:
+            reasons = await asyncio.gather(*(self._load_one(session, failure) for failure in failures))
+            await self.writer.close()
+        http_cache.close()
+
+        resolved: List[Tuple[str, int]] = []
+        for failure, reason in zip(failures, reasons):
+            spec = SPECS_BY_TYPE.get(failure.entity_type)
+            stage = "fetch"
+            if reason is None and spec:
+                # Строка собрана, но не записалась (ошибка выясняется только при сбросе пакета)
+                reason = self.failed_rows.get((spec.model.__tablename__, failure.entity_id))
+                stage = "write"
+            if reason is None:
+                resolved.append((failure.entity_type, failure.entity_id))
+                metrics.inc("redrive_total", entity_type=failure.entity_type, result="resolved")
+            else:
+                self.store.add(failure.entity_type, failure.entity_id, failure.url, stage, reason)
+                metrics.inc("redrive_total", entity_type=failure.entity_type, result="failed")
+
+        await self.store.resolve(resolved)
+        await self.store.flush()
+        totals = {"total": len(failures), "resolved": len(resolved), "failed": len(failures) - len(resolved)}
+        logger.info(f"Redrive finished in {time.perf_counter() - started:.1f}s: {totals}")
+        return totals
+
+
+def parse_args() -> argparse.Namespace:
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Повторная загрузка сущностей из dead_letters")
+    parser.add_argument(
+        "--type",
+        dest="entity_types",
+        action="append",
+        choices=sorted(SPECS_BY_TYPE),
+        help="Тип сущностей (можно указать несколько раз); по умолчанию — все"
+    )
+    parser.add_argument("--concurrency", type=int, default=REDRIVE_CONCURRENCY, help="Сущностей одновременно")
+    parser.add_argument("--rounds", type=int, default=REDRIVE_ROUNDS, help="Повторов сущности за запуск")
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=REDRIVE_MAX_ATTEMPTS,
+        help="Пропускать сущности, у которых попыток уже не меньше этого числа"
+    )
+    parser.add_argument("--cache", choices=CACHE_MODES, default=http_cache.mode, help="Режим HTTP-кэша")
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default=LOG_FORMAT, help="text или json")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="Уровень логирования (INFO, DEBUG, ...)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(log_format=args.log_format, level=args.log_level)
+    http_cache.mode = args.cache
+
+    async def main() -> None:
+        try:
+            await Redrive(
+                entity_types=args.entity_types,
+                concurrency=args.concurrency,
+                rounds=args.rounds,
+                max_attempts=args.max_attempts
+            ).run()
+        finally:
+            await engine.dispose()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Process interrupted by user")
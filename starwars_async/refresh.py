@@ -0,0 +1,181 @@
+import logging
+import time
+from typing import Dict, List, Sequence, Set, Type
+
+from sqlalchemy import Column, ForeignKey, Index, MetaData, Table, inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.schema import AddConstraint
+
+from starwars_async.data_versions import bump_versions
+from starwars_async.database import engine as default_engine
+from starwars_async.metrics import metrics
+from starwars_async.models import Base
+from starwars_async.normalized import COMPAT_VIEWS, create_compat_views
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация
+STAGING_SUFFIX = "_staging"
+OLD_SUFFIX = "_old"
+
+
+def staging_table(table: Table, metadata: MetaData, dialect_name: str) -> Table:
+    """Копия таблицы без вторичных индексов (в PostgreSQL — UNLOGGED).
+
+    Первичный ключ остаётся: по нему writer схлопывает повторы сущностей.
+    Внешние ключи в PostgreSQL восстанавливаются после подмены
+    (_restore_foreign_keys), а в SQLite объявляются сразу с именами основных
+    таблиц: без PRAGMA foreign_keys SQLite их при загрузке не проверяет, а
+    после подмены схема совпадает со схемой модели.
+    """
+    columns = []
+    for column in table.columns:
+        foreign_keys = []
+        if dialect_name == "sqlite":
+            for foreign_key in column.foreign_keys:
+                target = foreign_key.column
+                if target.table.name not in metadata.tables:
+                    # Заглушка целевой таблицы — только для разрешения ключа (не создаётся)
+                    Table(target.table.name, metadata, Column(target.name, target.type, primary_key=True))
+                foreign_keys.append(ForeignKey(foreign_key.target_fullname, ondelete=foreign_key.ondelete))
+        columns.append(Column(column.name, column.type, *foreign_keys, primary_key=column.primary_key,
+                              nullable=column.nullable, autoincrement=False))
+    return Table(
+        f"{table.name}{STAGING_SUFFIX}",
+        metadata,
+        *columns,
+        prefixes=["UNLOGGED"] if dialect_name == "postgresql" else [],
+    )
+
+
+class FullRefresh:
+    """Полная перезагрузка через staging-таблицы и атомарную подмену.
+
+    Данные пишутся в пустые таблицы *_staging, затем один раз строятся
+    индексы, и staging-таблицы переименовываются в основные в одной
+    транзакции. Читатели до коммита видят старые данные, после — новые,
+    и никогда — частично загруженные.
+    """
+
+    def __init__(self, models: Sequence[Type[Base]], engine: AsyncEngine = default_engine):
+        self.engine = engine
+        self.dialect_name = engine.dialect.name
+        if self.dialect_name not in ("postgresql", "sqlite"):
+            raise NotImplementedError(f"Full refresh is not supported for dialect {self.dialect_name}")
+        self.tables: List[Table] = [model.__table__ for model in models]
+        self.metadata = MetaData()
+        # Модель → staging-таблица (для BulkWriter)
+        self.staging: Dict[Type[Base], Table] = {
+            model: staging_table(model.__table__, self.metadata, self.dialect_name) for model in models
+        }
+
+    def _staging_of(self, table: Table) -> Table:
+        return self.metadata.tables[f"{table.name}{STAGING_SUFFIX}"]
+
+    async def prepare(self) -> None:
+        """Пересоздание пустых staging-таблиц"""
+        async with self.engine.begin() as conn:
+            for table in self.tables:
+                await conn.execute(text(f"DROP TABLE IF EXISTS {self._staging_of(table).name}"))
+            await conn.run_sync(self.metadata.create_all, tables=list(self.staging.values()))
+        logger.info(f"Created staging tables: {', '.join(table.name for table in self.staging.values())}")
+
+    async def abort(self) -> None:
+        """Удаление staging-таблиц без подмены"""
+        async with self.engine.begin() as conn:
+            await conn.run_sync(self.metadata.drop_all, tables=list(self.staging.values()))
+        logger.warning("Full refresh aborted, live tables are unchanged")
+
+    async def _build_staging_indexes(self, conn: AsyncConnection) -> None:
+        """Индексы моделей на staging-таблицах (строятся один раз по загруженным данным)"""
+        for table in self.tables:
+            staging = self._staging_of(table)
+            for index in table.indexes:
+                columns = [staging.c[column.name] for column in index.columns]
+                await conn.run_sync(Index(f"{index.name}{STAGING_SUFFIX}", *columns, unique=index.unique).create)
+
+    async def _finalize_staging(self) -> None:
+        """PostgreSQL: журналирование, индексы и статистика до подмены (вне блокировок основных таблиц)"""
+        async with self.engine.begin() as conn:
+            for table in self.tables:
+                await conn.execute(text(f"ALTER TABLE {self._staging_of(table).name} SET LOGGED"))
+            await self._build_staging_indexes(conn)
+            for table in self.tables:
+                await conn.execute(text(f"ANALYZE {self._staging_of(table).name}"))
+
+    async def _restore_foreign_keys(self, conn: AsyncConnection, existing: Set[str]) -> None:
+        """Внешние ключи на подменённые таблицы и из них (DROP ... CASCADE их удалил).
+
+        Ссылки на исчезнувшие строки обрабатываются по ondelete ключа,
+        как если бы строки были удалены обычным DELETE.
+        """
+        swapped = {table.name for table in self.tables}
+        for owner in Base.metadata.sorted_tables:
+            if owner.name not in existing:
+                continue
+            for constraint in owner.foreign_key_constraints:
+                target = constraint.referred_table.name
+                if owner.name not in swapped and target not in swapped:
+                    continue
+                column = constraint.column_keys[0]
+                target_column = constraint.elements[0].column.name
+                orphans = f"{column} IS NOT NULL AND {column} NOT IN (SELECT {target_column} FROM {target})"
+                if (constraint.ondelete or "").upper() == "SET NULL":
+                    await conn.execute(text(f"UPDATE {owner.name} SET {column} = NULL WHERE {orphans}"))
+                else:
+                    await conn.execute(text(f"DELETE FROM {owner.name} WHERE {orphans}"))
+                await conn.execute(AddConstraint(constraint))
+
+    async def swap(self) -> None:
+        """Подмена основных таблиц staging-таблицами в одной транзакции"""
+        started = time.perf_counter()
+        postgres = self.dialect_name == "postgresql"
+        if postgres:
+            await self._finalize_staging()
+
+        async with self.engine.begin() as conn:
+            if not postgres:
+                # Драйвер sqlite3 не открывает транзакцию перед DDL — без явного BEGIN
+                # каждое переименование фиксировалось бы отдельно
+                await conn.exec_driver_sql("BEGIN IMMEDIATE")
+            existing = set(await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names()))
+            views = set(await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_view_names()))
+            live = [table for table in self.tables if table.name in existing]
+            if postgres:
+                if live:
+                    await conn.execute(text(
+                        f"LOCK TABLE {', '.join(table.name for table in live)} IN ACCESS EXCLUSIVE MODE"
+                    ))
+            else:
+                # Ссылки из других таблиц и представлений остаются на прежних именах
+                await conn.execute(text("PRAGMA legacy_alter_table = ON"))
+
+            for table in live:
+                await conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {table.name}{OLD_SUFFIX}"))
+            for table in self.tables:
+                await conn.execute(text(f"ALTER TABLE {self._staging_of(table).name} RENAME TO {table.name}"))
+            for table in live:
+                cascade = " CASCADE" if postgres else ""
+                await conn.execute(text(f"DROP TABLE {table.name}{OLD_SUFFIX}{cascade}"))
+
+            if postgres:
+                for table in self.tables:
+                    await conn.execute(text(
+                        f"ALTER INDEX {table.name}{STAGING_SUFFIX}_pkey RENAME TO {table.name}_pkey"
+                    ))
+                    for index in table.indexes:
+                        await conn.execute(text(f"ALTER INDEX {index.name}{STAGING_SUFFIX} RENAME TO {index.name}"))
+                await self._restore_foreign_keys(conn, existing | {table.name for table in self.tables})
+                if views & set(COMPAT_VIEWS):
+                    await create_compat_views(conn)
+            else:
+                # В SQLite индексы не переименовываются: строятся под итоговыми именами внутри транзакции
+                for table in self.tables:
+                    for index in table.indexes:
+                        await conn.run_sync(index.create)
+                await conn.execute(text("PRAGMA legacy_alter_table = OFF"))
+            await bump_versions(conn, [table.name for table in self.tables])
+
+        duration = time.perf_counter() - started
+        metrics.observe("refresh_swap_seconds", duration)
+        logger.info(f"Swapped in {len(self.tables)} refreshed tables in {duration:.2f}s")
@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import bisect
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from starwars_async.database import engine
+from starwars_async.entities import ENTITY_SPECS
+from starwars_async.export import EXPORT_CHUNK_SIZE, iter_chunks
+from starwars_async.logging_config import LOG_FORMAT, LOG_FORMATS, LOG_LEVEL, setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация
+SEARCH_MODES = ("token", "prefix", "fuzzy")
+FUZZY_THRESHOLD = 0.3  # минимальное сходство по триграммам (как similarity_threshold в pg_trgm)
+PREFIX_WEIGHT = 0.8  # множитель оценки для совпадения по префиксу
+FUZZY_WEIGHT = 0.6  # множитель оценки для нечёткого совпадения (× сходство)
+SEARCH_LIMIT = 20
+
+# Таблица → индексируемое поле → вес поля в оценке
+SEARCH_FIELDS: Dict[str, Dict[str, float]] = {
+    "characters": {
+        "name": 3.0, "homeworld": 1.0, "species": 1.0, "starships": 1.0, "vehicles": 1.0, "films": 0.5,
+    },
+    "starships": {
+        "name": 3.0, "model": 2.0, "manufacturer": 2.0, "starship_class": 1.0, "pilots": 1.0, "films": 0.5,
+    },
+    "vehicles": {
+        "name": 3.0, "model": 2.0, "manufacturer": 2.0, "vehicle_class": 1.0, "pilots": 1.0, "films": 0.5,
+    },
+    "planets": {"name": 3.0, "climate": 1.0, "terrain": 1.0, "residents": 1.0, "films": 0.5},
+    "films": {"title": 3.0, "director": 2.0, "producer": 1.0},
+    "species": {"name": 3.0, "classification": 1.0, "designation": 1.0, "language": 1.0},
+}
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+Document = Tuple[str, int]  # (таблица, id)
+
+
+def tokenize(text: Any) -> List[str]:
+    """Слова в нижнем регистре"""
+    return TOKEN_PATTERN.findall(str(text).lower()) if text else []
+
+
+def trigrams(token: str) -> Set[str]:
+    """Триграммы слова с отступами по краям (как в pg_trgm)"""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class SearchHit:
+    """Найденная сущность"""
+    table: str
+    entity_id: int
+    label: str
+    score: float
+
+
+class SearchIndex:
+    """Обратный индекс слов и триграммный индекс словаря по всем типам сущностей.
+
+    Слово → документы с числом вхождений по полям; поиск по слову — одно
+    обращение к словарю, по префиксу — бинарный поиск в отсортированном
+    словаре, нечёткий — кандидаты по общим триграммам. Обновление документа
+    заменяет только его собственные записи, поэтому индекс поддерживается
+    по мере записи строк, без перестроения.
+    """
+
+    def __init__(self, fields: Mapping[str, Mapping[str, float]] = SEARCH_FIELDS):
+        self.fields = fields
+        self.postings: Dict[str, Dict[Document, Counter]] = defaultdict(dict)  # слово → документ → поле → вхождения
+        self.documents: Dict[Document, Set[str]] = {}  # документ → его слова
+        self.labels: Dict[Document, str] = {}
+        self.grams: Dict[str, Set[str]] = defaultdict(set)  # триграмма → слова
+        self._vocabulary: List[str] = []  # отсортированный словарь (для префиксов)
+        self._vocabulary_dirty = False
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def update(self, table: str, rows: Iterable[Mapping[str, Any]]) -> None:
+        """Добавление или замена строк таблицы"""
+        fields = self.fields.get(table)
+        if not fields:
+            return
+        for row in rows:
+            document = (table, row["id"])
+            self.remove(document)
+            tokens: Set[str] = set()
+            for field in fields:
+                for token in tokenize(row.get(field)):
+                    self._add_posting(token, document, field)
+                    tokens.add(token)
+            self.documents[document] = tokens
+            self.labels[document] = str(row.get("name") or row.get("title") or row["id"])
+
+    def _add_posting(self, token: str, document: Document, field: str) -> None:
+        documents = self.postings[token]
+        if not documents:
+            for gram in trigrams(token):
+                self.grams[gram].add(token)
+            self._vocabulary_dirty = True
+        documents.setdefault(document, Counter())[field] += 1
+
+    def remove(self, document: Document) -> None:
+        """Удаление документа из индекса"""
+        for token in self.documents.pop(document, ()):
+            documents = self.postings[token]
+            documents.pop(document, None)
+            if not documents:
+                del self.postings[token]
+                for gram in trigrams(token):
+                    tokens = self.grams[gram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self.grams[gram]
+                self._vocabulary_dirty = True
+        self.labels.pop(document, None)
+
+    def _expand(self, term: str, mode: str) -> Dict[str, float]:
+        """Слова словаря, подходящие под слово запроса, с множителем совпадения"""
+        matches = {term: 1.0} if term in self.postings else {}
+        if mode == "prefix":
+            if self._vocabulary_dirty:
+                self._vocabulary = sorted(self.postings)
+                self._vocabulary_dirty = False
+            start = bisect.bisect_left(self._vocabulary, term)
+            for token in self._vocabulary[start:]:
+                if not token.startswith(term):
+                    break
+                matches.setdefault(token, PREFIX_WEIGHT)
+        elif mode == "fuzzy":
+            query_grams = trigrams(term)
+            shared: Counter = Counter()
+            for gram in query_grams:
+                shared.update(self.grams.get(gram, ()))
+            for token, common in shared.items():
+                similarity = common / (len(query_grams) + len(trigrams(token)) - common)
+                if similarity >= FUZZY_THRESHOLD:
+                    matches.setdefault(token, FUZZY_WEIGHT * similarity)
+        return matches
+
+    def search(
+            self,
+            query: str,
+            mode: str = "prefix",
+            tables: Optional[Sequence[str]] = None,
+            field: Optional[str] = None,
+            limit: int = SEARCH_LIMIT
+    ) -> List[SearchHit]:
+        """Поиск документов, в которых есть все слова запроса, по убыванию оценки.
+
+        Оценка — сумма по словам запроса: веса полей со словом × idf слова
+        × множитель совпадения (точное, префикс или нечёткое).
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        total = len(self.documents) or 1
+        scores: Optional[Dict[Document, float]] = None
+        fields: Dict[Document, Set[str]] = {}
+        for term in terms:
+            expanded = self._expand(term, mode)
+            # idf — по всем документам со словами, подходящими под слово запроса:
+            # редкое слово, найденное по префиксу, не обгоняет точное совпадение
+            frequency = len(set().union(*(self.postings[token] for token in expanded))) if expanded else 0
+            idf = math.log(1 + total / frequency) if frequency else 0.0
+            term_scores: Dict[Document, float] = defaultdict(float)
+            term_fields: Dict[Document, Set[str]] = defaultdict(set)
+            for token, quality in expanded.items():
+                for document, counts in self.postings[token].items():
+                    if tables and document[0] not in tables:
+                        continue
+                    # Вес — сумма весов полей, где есть слово (повторы в списках не накапливаются)
+                    weights = self.fields[document[0]]
+                    matched = [name for name in counts if field is None or name == field]
+                    weight = sum(weights[name] for name in matched)
+                    if weight:
+                        term_scores[document] = max(term_scores[document], weight * idf * quality)
+                        term_fields[document].update(matched)
+            # Все слова запроса должны найтись в документе
+            if scores is None:
+                scores = dict(term_scores)
+                fields = dict(term_fields)
+            else:
+                scores = {document: score + term_scores[document] for document, score in scores.items()
+                          if document in term_scores}
+                fields = {document: fields[document] & term_fields[document] for document in scores}
+            if not scores:
+                return []
+
+        # Все слова в одном поле ("luke skywalker" в name) ценнее, чем в разных
+        for document, common in fields.items():
+            if common:
+                scores[document] *= 1 + max(self.fields[document[0]][name] for name in common)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [SearchHit(table, entity_id, self.labels[(table, entity_id)], round(score, 4))
+                for (table, entity_id), score in ranked]
+
+    async def load(self, tables: Optional[Iterable[str]] = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> None:
+        """Построение индекса по таблицам БД (потоковое чтение пакетами)"""
+        specs = {spec.model.__tablename__: spec.model.__table__ for spec in ENTITY_SPECS}
+        for name in (tables if tables is not None else self.fields):
+            table = specs.get(name)
+            if table is None or name not in self.fields:
+                continue
+            columns = [table.c.id] + [table.c[field] for field in self.fields[name] if field in table.c]
+            label = table.c.title if "title" in table.c else table.c.name
+            if label not in columns:
+                columns.append(label)
+            names = [column.name for column in columns]
+            # Строки заменяются на месте, а исчезнувшие удаляются в конце:
+            # поиск во время перечитывания не видит пустую таблицу
+            seen: Set[int] = set()
+            async for chunk in iter_chunks(table, columns, chunk_size):
+                rows = [dict(zip(names, row)) for row in chunk]
+                self.update(name, rows)
+                seen.update(row["id"] for row in rows)
+            for document in [document for document in self.documents if document[0] == name]:
+                if document[1] not in seen:
+                    self.remove(document)
+        logger.info(f"Search index loaded: {self.stats()}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"documents": len(self.documents), "tokens": len(self.postings), "trigrams": len(self.grams)}
+
+
+def parse_args() -> argparse.Namespace:
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Поиск сущностей по имени и атрибутам")
+    parser.add_argument("query", help="Слова запроса")
+    parser.add_argument("--mode", choices=SEARCH_MODES, default="prefix")
+    parser.add_argument(
+        "--table",
+        dest="tables",
+        action="append",
+        choices=sorted(SEARCH_FIELDS),
+        help="Таблица (можно указать несколько раз); по умолчанию — все"
+    )
+    parser.add_argument("--field", help="Искать только в этом поле (например, manufacturer)")
+    parser.add_argument("--limit", type=int, default=SEARCH_LIMIT)
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default=LOG_FORMAT, help="text или json")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="Уровень логирования (INFO, DEBUG, ...)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(log_format=args.log_format, level=args.log_level)
+
+    async def main() -> List[SearchHit]:
+        index = SearchIndex()
+        try:
+            await index.load(args.tables)
+        finally:
+            await engine.dispose()
+        return index.search(args.query, args.mode, args.tables, args.field, args.limit)
+
+    for hit in asyncio.run(main()):
+        print(f"{hit.score:8.3f}  {hit.table}/{hit.entity_id}  {hit.label}")
@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from starwars_async.api_client import BASE_URL, fetch_page, hedge_budget, http_cache, list_page_url
+from starwars_async.database import AsyncSessionLocal, engine, init_db
+from starwars_async.loader import ENTITY_SOURCES, DataLoader
+from starwars_async.logging_config import LOG_FORMAT, LOG_LEVEL, setup_logging
+from starwars_async.metrics import metrics
+from starwars_async.models import ShardState
+from starwars_async.sync_state import Shard
+from starwars_async.transport import create_session
+from starwars_async.writer import build_upsert
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация
+SHARD_WORKERS = os.cpu_count() or 1
+PAGES_PER_SHARD = 2
+SHARD_PAGE_SIZE = 10  # сущностей на страницу при шардировании (мельче страницы — ровнее шарды)
+MAX_SHARD_ATTEMPTS = 3
+
+
+def plan_shards(entity_type: str, total_pages: int, pages_per_shard: int = PAGES_PER_SHARD) -> List[Shard]:
+    """Разбиение страниц одного типа на диапазоны"""
+    return [
+        Shard(entity_type, first, min(first + pages_per_shard - 1, total_pages))
+        for first in range(1, total_pages + 1, pages_per_shard)
+    ]
+
+
+def _init_worker(log_format: str, log_level: str, cache_mode: str, hedging: bool) -> None:
+    """Инициализация процесса-воркера (свой цикл событий, сессия и движок БД создаются при запуске шарда)"""
+    setup_logging(log_format=log_format, level=log_level, log_file=None)
+    http_cache.mode = cache_mode
+    hedge_budget.enabled = hedging
+
+
+def run_shard(shard: Shard, loader_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Загрузка одного шарда в процессе-воркере"""
+    return asyncio.run(_run_shard(shard, loader_kwargs))
+
+
+async def _run_shard(shard: Shard, loader_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    metrics.reset()
+    loader = DataLoader(shard=shard, **loader_kwargs)
+    started = time.perf_counter()
+    try:
+        await loader.run()
+    finally:
+        # Соединения пула привязаны к циклу событий этого шарда
+        await engine.dispose()
+    tracker = loader.trackers.get(shard.entity_type)
+    if tracker is None or not tracker.finished:
+        # Страница списка не загрузилась (ошибки HTTP исчерпали повторы): часть
+        # диапазона не обойдена, и шард должен уйти на повтор, а не считаться готовым
+        raise RuntimeError(f"Shard {shard.shard_id} incomplete: not all list pages were loaded")
+    return {
+        "pid": os.getpid(),
+        "duration": round(time.perf_counter() - started, 3),
+        "written": sum(stats["written"] for stats in loader.writer.stats.values()),
+        "failed": sum(stats["failed"] for stats in loader.writer.stats.values()),
+        "skipped": sum(loader.skipped.values()),
+        "counters": metrics.summary()["counters"],
+    }
+
+
+class ShardStore:
+    """Состояние шардов в таблице shard_state (для продолжения после сбоя)"""
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = AsyncSessionLocal):
+        self.session_factory = session_factory
+
+    async def load(self) -> List[ShardState]:
+        async with self.session_factory() as db_session:
+            result = await db_session.execute(select(ShardState).order_by(ShardState.shard_id))
+            return list(result.scalars())
+
+    async def reset(self, shards: List[Shard]) -> None:
+        """Новый план загрузки"""
+        async with self.session_factory() as db_session:
+            async with db_session.begin():
+                await db_session.execute(delete(ShardState))
+                if shards:
+                    await db_session.execute(ShardState.__table__.insert(), [
+                        {
+                            "shard_id": shard.shard_id,
+                            "entity_type": shard.entity_type,
+                            "first_page": shard.first_page,
+                            "last_page": shard.last_page,
+                            "status": "pending",
+                            "attempts": 0,
+                            "written": 0,
+                            "failed": 0,
+                        }
+                        for shard in shards
+                    ])
+
+    async def update(self, shard: Shard, **values: Any) -> None:
+        async with self.session_factory() as db_session:
+            async with db_session.begin():
+                await db_session.execute(
+                    ShardState.__table__.update()
+                    .where(ShardState.shard_id == shard.shard_id)
+                    .values(**values)
+                )
+
+    async def save_many(self, states: List[ShardState]) -> None:
+        async with self.session_factory() as db_session:
+            async with db_session.begin():
+                stmt = build_upsert(db_session.bind.dialect.name, ShardState.__table__)
+                await db_session.execute(stmt, [
+                    {column.name: getattr(state, column.name) for column in ShardState.__table__.columns
+                     if column.name != "updated_at"}
+                    for state in states
+                ])
+
+
+class ShardCoordinator:
+    """Координатор шардированной загрузки.
+
+    Делит страницы каждого типа на диапазоны и раздаёт их процессам-воркерам;
+    у каждого воркера свой цикл событий, сессия aiohttp и движок БД. Состояние
+    шардов хранится в shard_state: после падения воркера или координатора
+    незавершённые шарды назначаются заново.
+
+    Ограничитель скорости у каждого процесса свой, поэтому суммарная
+    нагрузка на API растёт с числом воркеров (до первых 429).
+    """
+
+    def __init__(
+            self,
+            workers: int = SHARD_WORKERS,
+            pages_per_shard: int = PAGES_PER_SHARD,
+            page_size: int = SHARD_PAGE_SIZE,
+            max_attempts: int = MAX_SHARD_ATTEMPTS,
+            loader_kwargs: Optional[Dict[str, Any]] = None,
+            log_format: str = LOG_FORMAT,
+            log_level: str = LOG_LEVEL
+    ):
+        self.workers = workers
+        self.pages_per_shard = pages_per_shard
+        self.page_size = page_size
+        self.max_attempts = max_attempts
+        self.loader_kwargs = {**(loader_kwargs or {}), "page_size": page_size}
+        self.log_format = log_format
+        self.log_level = log_level
+        self.store = ShardStore()
+        self.totals: Dict[str, Any] = {"written": 0, "failed": 0, "skipped": 0}
+        self.counters: Counter = Counter()
+        self.failed_shards: List[str] = []
+
+    async def _count_pages(self, session: aiohttp.ClientSession, endpoint: str) -> int:
+        """Число страниц списка (по total_pages или total_records первой страницы)"""
+        page = await fetch_page(session, list_page_url(f"{BASE_URL}{endpoint}/", self.page_size))
+        if page is None:
+            raise RuntimeError(f"Unable to load first page of {endpoint}")
+        if page.get("total_pages"):
+            return int(page["total_pages"])
+        if page.get("total_records"):
+            return -(-int(page["total_records"]) // self.page_size)
+        return 1
+
+    async def plan(self) -> List[Shard]:
+        """Незавершённые шарды прошлого запуска или новый план"""
+        states = await self.store.load()
+        unfinished = [state for state in states if state.status != "done"]
+        if unfinished:
+            # Шарды, которые выполнялись в момент сбоя или исчерпали попытки,
+            # возвращаются в очередь с новым бюджетом попыток
+            for state in unfinished:
+                state.status = "pending"
+                state.attempts = 0
+            await self.store.save_many(unfinished)
+            logger.info(f"Resuming {len(unfinished)} of {len(states)} shards from the previous run")
+            return [Shard(state.entity_type, state.first_page, state.last_page) for state in unfinished]
+
+        async with create_session() as session:
+            shards = []
+            for endpoint, _, _, entity_type in ENTITY_SOURCES:
+                total_pages = await self._count_pages(session, endpoint)
+                shards.extend(plan_shards(entity_type, total_pages, self.pages_per_shard))
+        await self.store.reset(shards)
+        logger.info(f"Planned {len(shards)} shards for {self.workers} workers")
+        return shards
+
+    def _record(self, result: Dict[str, Any]) -> None:
+        """Сведение результатов воркеров"""
+        for key in ("written", "failed", "skipped"):
+            self.totals[key] += result[key]
+        self.counters.update(result["counters"])
+
+    async def _run_pool(self, shards: List[Shard], attempts: Dict[str, int]) -> List[Shard]:
+        """Один пул процессов; возвращает шарды, которые нужно повторить"""
+        loop = asyncio.get_running_loop()
+        retry: List[Shard] = []
+        with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(shards)),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.log_format, self.log_level, http_cache.mode, hedge_budget.enabled),
+        ) as pool:
+            async def run_one(shard: Shard):
+                try:
+                    return shard, await loop.run_in_executor(pool, run_shard, shard, self.loader_kwargs), None
+                except Exception as e:
+                    return shard, None, e
+
+            for shard in shards:
+                attempts[shard.shard_id] += 1
+                await self.store.update(shard, status="running", attempts=attempts[shard.shard_id])
+
+            done = 0
+            for next_result in asyncio.as_completed([run_one(shard) for shard in shards]):
+                shard, result, error = await next_result
+                if error is None:
+                    done += 1
+                    self._record(result)
+                    await self.store.update(
+                        shard, status="done", written=result["written"], failed=result["failed"], error=None
+                    )
+                    logger.info(
+                        f"Shard {shard.shard_id} done in {result['duration']}s by worker {result['pid']}: "
+                        f"{result['written']} written, {result['failed']} failed ({done}/{len(shards)})"
+                    )
+                    continue
+
+                if isinstance(error, BrokenProcessPool):
+                    # Процесс-воркер упал: незавершённые шарды пула назначаются заново
+                    message = "worker process died"
+                else:
+                    message = str(error) or type(error).__name__
+                logger.error(f"Shard {shard.shard_id} failed (attempt {attempts[shard.shard_id]}): {message}")
+                if attempts[shard.shard_id] < self.max_attempts:
+                    retry.append(shard)
+                    await self.store.update(shard, status="pending", error=message)
+                else:
+                    self.failed_shards.append(shard.shard_id)
+                    await self.store.update(shard, status="failed", error=message)
+        return retry
+
+    async def run(self) -> None:
+        """Запуск всех шардов с повтором упавших"""
+        started = time.perf_counter()
+        await init_db()
+        shards = await self.plan()
+        attempts: Dict[str, int] = defaultdict(int)
+        while shards:
+            shards = await self._run_pool(shards, attempts)
+
+        await engine.dispose()
+        logger.info(
+            f"Sharded load finished in {time.perf_counter() - started:.1f}s: {self.totals}, "
+            f"failed shards: {self.failed_shards or 'none'}"
+        )
+        logger.info(f"Aggregated worker counters: {dict(self.counters)}")
@@ -0,0 +1,119 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from starwars_async.database import AsyncSessionLocal
+from starwars_async.models import EntitySyncState, SyncState
+from starwars_async.writer import build_upsert
+
+logger = logging.getLogger(__name__)
+
+SYNC_MODES = ("full", "incremental")
+
+
+@dataclass
+class Checkpoint:
+    """Чекпоинт обхода страниц одного типа сущностей"""
+    last_page: int = 0
+    next_url: Optional[str] = None
+    completed: bool = False
+
+
+@dataclass
+class Shard:
+    """Диапазон страниц одного типа сущностей для воркера шардированной загрузки"""
+    entity_type: str
+    first_page: int
+    last_page: int
+
+    @property
+    def shard_id(self) -> str:
+        return f"{self.entity_type}:{self.first_page}-{self.last_page}"
+
+
+@dataclass
+class PageTracker:
+    """Учёт незавершённых сущностей по страницам.
+
+    Страницы обрабатываются параллельно, поэтому чекпоинт продвигается
+    только по непрерывному префиксу полностью записанных страниц.
+    """
+    next_page: int = 1  # первая незавершённая страница
+    pending: Dict[int, int] = field(default_factory=dict)  # страница → осталось сущностей
+    next_urls: Dict[int, Optional[str]] = field(default_factory=dict)  # страница → URL следующей
+    walk_finished: bool = False
+
+    def page_started(self, page: int, count: int, next_url: Optional[str]) -> None:
+        self.pending[page] = count
+        self.next_urls[page] = next_url
+
+    def entity_done(self, page: int) -> None:
+        self.pending[page] -= 1
+
+    def pop_completed(self) -> Optional[Tuple[int, Optional[str]]]:
+        """Продвижение по завершённым страницам; возвращает (последняя страница, URL следующей)"""
+        advanced = None
+        while self.pending.get(self.next_page) == 0:
+            del self.pending[self.next_page]
+            advanced = (self.next_page, self.next_urls.pop(self.next_page))
+            self.next_page += 1
+        return advanced
+
+    @property
+    def finished(self) -> bool:
+        return self.walk_finished and not self.pending
+
+
+class SyncStateStore:
+    """Чтение и запись чекпоинтов и состояний сущностей"""
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = AsyncSessionLocal):
+        self.session_factory = session_factory
+
+    async def load_checkpoints(self) -> Dict[str, Checkpoint]:
+        """Чекпоинты всех типов сущностей"""
+        async with self.session_factory() as db_session:
+            result = await db_session.execute(select(SyncState))
+            return {
+                state.entity_type: Checkpoint(state.last_page, state.next_url, state.completed)
+                for state in result.scalars()
+            }
+
+    async def save_checkpoint(self, entity_type: str, checkpoint: Checkpoint) -> None:
+        """Сохранение чекпоинта"""
+        async with self.session_factory() as db_session:
+            async with db_session.begin():
+                stmt = build_upsert(db_session.bind.dialect.name, SyncState.__table__)
+                await db_session.execute(stmt, [{
+                    "entity_type": entity_type,
+                    "last_page": checkpoint.last_page,
+                    "next_url": checkpoint.next_url,
+                    "completed": checkpoint.completed,
+                }])
+
+    async def reset(self) -> None:
+        """Сброс всех чекпоинтов для нового полного прохода"""
+        async with self.session_factory() as db_session:
+            async with db_session.begin():
+                await db_session.execute(delete(SyncState))
+
+    async def load_entity_states(self, entity_type: str) -> Dict[int, Tuple[Optional[str], Optional[str]]]:
+        """Сохранённые edited и хэши сущностей одного типа"""
+        async with self.session_factory() as db_session:
+            result = await db_session.execute(
+                select(EntitySyncState.entity_id, EntitySyncState.edited, EntitySyncState.content_hash)
+                .where(EntitySyncState.entity_type == entity_type)
+            )
+            return {entity_id: (edited, hash_) for entity_id, edited, hash_ in result}
+
+    async def save_entity_states(self, entity_type: str, states: List[Dict[str, Any]]) -> None:
+        """Пакетное сохранение состояний сущностей"""
+        if not states:
+            return
+        async with self.session_factory() as db_session:
+            async with db_session.begin():
+                stmt = build_upsert(db_session.bind.dialect.name, EntitySyncState.__table__)
+                await db_session.execute(stmt, [{"entity_type": entity_type, **state} for state in states])
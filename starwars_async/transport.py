@@ -0,0 +1,97 @@
+import json
+import time
+from collections import Counter
+from typing import Any, Optional, Sequence
+
+import aiohttp
+
+from starwars_async.metrics import metrics
+from starwars_async.rate_limiter import MAX_CONCURRENCY
+
+try:
+    import orjson
+except ImportError:  # Без orjson тела разбираются стандартным json
+    orjson = None
+
+# Конфигурация
+CONNECTOR_LIMIT = 100  # соединений на процесс
+CONNECTOR_LIMIT_PER_HOST = MAX_CONCURRENCY  # лимитер всё равно не пустит больше запросов к хосту
+KEEPALIVE_TIMEOUT = 30.0  # секунд простоя, после которых соединение закрывается
+DNS_CACHE_TTL = 300  # секунд
+SESSION_TIMEOUT = 300  # секунд, общий таймаут запроса (попытки ограничены дедлайном по задержкам)
+JSON_DECODER = "orjson" if orjson is not None else "json"
+
+# Путь к properties в ответе на запрос сущности
+PROPERTIES_PATH = ("result", "properties")
+
+# Новые и переиспользованные соединения за время жизни процесса
+connection_stats: Counter = Counter()
+
+
+def loads(body: bytes) -> Any:
+    """Разбор JSON прямо из байтов (orjson, если установлен)"""
+    started = time.perf_counter()
+    data = orjson.loads(body) if orjson is not None else json.loads(body)
+    metrics.observe("http_decode_seconds", time.perf_counter() - started, decoder=JSON_DECODER)
+    return data
+
+
+def dumps(data: Any) -> bytes:
+    """Сериализация JSON в байты (orjson, если установлен)"""
+    if orjson is not None:
+        return orjson.dumps(data, default=str)
+    return json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def extract(data: Any, path: Sequence[str]) -> Optional[Any]:
+    """Поддерево ответа по пути ключей (None, если какого-то ключа нет).
+
+    Остальная часть ответа не сохраняется и сразу освобождается.
+    """
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    """Счётчики новых и переиспользованных соединений (по ним видно число рукопожатий TCP/TLS)"""
+
+    async def on_create(session, context, params) -> None:
+        connection_stats["created"] += 1
+        metrics.inc("http_connections_total", result="created")
+
+    async def on_reuse(session, context, params) -> None:
+        connection_stats["reused"] += 1
+        metrics.inc("http_connections_total", result="reused")
+
+    trace = aiohttp.TraceConfig()
+    trace.on_connection_create_end.append(on_create)
+    trace.on_connection_reuseconn.append(on_reuse)
+    return trace
+
+
+def create_connector() -> aiohttp.TCPConnector:
+    """Пул соединений: keep-alive, кэш DNS и лимит на хост по лимитеру"""
+    return aiohttp.TCPConnector(
+        limit=CONNECTOR_LIMIT,
+        limit_per_host=CONNECTOR_LIMIT_PER_HOST,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+    )
+
+
+def create_session(timeout: float = SESSION_TIMEOUT) -> aiohttp.ClientSession:
+    """Общая настроенная сессия для загрузчика, воркеров и redrive.
+
+    Сжатие ответов запрашивается и распаковывается aiohttp (Accept-Encoding
+    по умолчанию), тело разбирается из байтов через loads.
+    """
+    return aiohttp.ClientSession(
+        connector=create_connector(),
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        trace_configs=[_trace_config()],
+        auto_decompress=True,
+    )
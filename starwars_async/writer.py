@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from sqlalchemy import Table, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from starwars_async.data_versions import bump_versions
+from starwars_async.database import WRITE_CONCURRENCY, AsyncSessionLocal
+from starwars_async.metrics import metrics
+from starwars_async.records import Row, as_mapping, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация
+BATCH_SIZE = 200  # строк на один INSERT
+FLUSH_INTERVAL = 1.0  # секунд
+HASH_COLUMN = "row_hash"  # хэш очищенной строки: неизменённые строки не перезаписываются
+
+
+def build_upsert(dialect_name: str, table: Table, columns: Optional[Iterable[str]] = None):
+    """Построение INSERT ... ON CONFLICT (первичный ключ) DO UPDATE для диалекта.
+
+    columns — колонки, которые есть в строках пакета: при конфликте
+    обновляются только они. Колонки, которых нет в строке (например,
+    homeworld_id, заполняемый нормализованной схемой), иначе получили бы
+    NULL из EXCLUDED. По умолчанию — все колонки таблицы.
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upsert is not supported for dialect {dialect_name}")
+
+    names = set(columns) if columns is not None else set(table.c.keys())
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={c.name: stmt.excluded[c.name] for c in table.columns if not c.primary_key and c.name in names},
+    )
+
+
+class BulkWriter:
+    """Накопление очищенных строк по моделям и пакетная запись в БД"""
+
+    def __init__(
+            self,
+            session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+            batch_size: int = BATCH_SIZE,
+            flush_interval: float = FLUSH_INTERVAL,
+            use_copy: bool = False,
+            on_failure: Optional[Callable[[str, Dict[str, Any], str], None]] = None,
+            tables: Optional[Dict[Type, Table]] = None,
+            check_unchanged: bool = True,
+            on_written: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None,
+            concurrency: int = WRITE_CONCURRENCY
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.use_copy = use_copy
+        self.on_failure = on_failure  # (таблица, строка, ошибка) для изолированной плохой строки
+        self.tables = tables or {}  # модель → таблица для записи вместо основной (staging)
+        self.check_unchanged = check_unchanged  # сравнение с сохранёнными хэшами (не нужно для пустых таблиц)
+        self.on_written = on_written  # (таблица, строки) после коммита пакета, включая неизменённые строки
+        # Пакеты разных моделей пишутся параллельно, но не больше concurrency сессий (пул рассчитан на это)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._buffers: Dict[Type, List[Row]] = defaultdict(list)
+        self._flush_task: Optional[asyncio.Task] = None
+        self._periodic_write: Optional[asyncio.Task] = None
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {
+            "written": 0, "failed": 0, "batches": 0, "inserted": 0, "updated": 0, "unchanged": 0,
+        })
+
+    async def start(self) -> None:
+        """Запуск периодического сброса буферов по времени"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._periodic_flush())
+
+    async def close(self) -> None:
+        """Остановка фонового сброса и запись остатков"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self._periodic_write is not None:
+            # Сброс, начатый до остановки, дописывается: его строки уже вынуты из буферов
+            await self._periodic_write
+            self._periodic_write = None
+        await self.flush()
+
+    async def add(self, model: Type, row: Row) -> None:
+        """Добавление записи или строки в буфер модели (сброс при заполнении пакета)"""
+        buffer = self._buffers[model]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            await self.flush(model)
+
+    async def flush(self, model: Optional[Type] = None) -> None:
+        """Запись накопленных строк одной или всех моделей"""
+        models = [model] if model is not None else list(self._buffers)
+        batches = [(current, self._buffers.pop(current, None)) for current in models]
+        # Записи превращаются в словари только на время записи пакета (ORM-объекты не создаются)
+        await asyncio.gather(*(
+            self._write_batch(current, [as_mapping(row) for row in rows])
+            for current, rows in batches if rows
+        ))
+
+    async def _periodic_flush(self) -> None:
+        """Фоновый сброс буферов раз в flush_interval секунд.
+
+        Запись идёт отдельной задачей под shield: отмена в close() не обрывает
+        открытую транзакцию (в SQLite она держала бы блокировку записи) и не
+        теряет строки, вынутые из буферов.
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self._periodic_write = asyncio.ensure_future(self._flush_logged())
+            await asyncio.shield(self._periodic_write)
+            self._periodic_write = None
+
+    async def _flush_logged(self) -> None:
+        """Сброс всех буферов; ошибка пишется в лог, а не прерывает фоновый сброс"""
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Periodic flush failed: {str(e)}", exc_info=True)
+
+    async def _write_batch(self, model: Type, rows: List[Dict[str, Any]]) -> None:
+        """Запись пакета; при ошибке пакет делится пополам до изоляции плохой строки"""
+        table_name = model.__tablename__
+        table = self.tables.get(model, model.__table__)
+        started = time.perf_counter()
+        try:
+            async with self.semaphore, self.session_factory() as db_session:
+                async with db_session.begin():
+                    changed, counts = await self._changed_rows(db_session, table, rows)
+                    if changed:
+                        await self._upsert(db_session, table, changed)
+                        if table is model.__table__:  # staging-таблицы версионируются при подмене
+                            await bump_versions(db_session, [table_name])
+        except SQLAlchemyError as e:
+            if len(rows) == 1:
+                self.stats[table_name]["failed"] += 1
+                metrics.inc("db_rows_failed_total", table=table_name)
+                logger.error(
+                    f"Database error for {table_name} {rows[0].get('id')}: {str(e)}",
+                    extra={"event": "row_failed", "table": table_name, "entity_id": rows[0].get("id")}
+                )
+                if self.on_failure:
+                    self.on_failure(table_name, rows[0], str(e))
+                return
+            middle = len(rows) // 2
+            await self._write_batch(model, rows[:middle])
+            await self._write_batch(model, rows[middle:])
+            return
+
+        duration = time.perf_counter() - started
+        if self.on_written:
+            self.on_written(table_name, rows)
+        metrics.observe("db_flush_seconds", duration, table=table_name)
+        metrics.inc("db_rows_written_total", len(changed), table=table_name)
+        stats = self.stats[table_name]
+        stats["written"] += len(rows)
+        stats["batches"] += 1
+        for result, count in counts.items():
+            stats[result] += count
+            metrics.inc("db_rows_total", count, table=table_name, result=result)
+        logger.info(
+            f"Saved batch of {len(rows)} rows into {table_name}: {dict(counts)}",
+            extra={
+                "event": "batch_written",
+                "table": table_name,
+                "rows": len(rows),
+                "duration": round(duration, 6),
+                **counts,
+            }
+        )
+
+    async def _changed_rows(
+            self,
+            db_session: AsyncSession,
+            table: Table,
+            rows: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Counter]:
+        """Отбор новых и изменённых строк: хэши пакета сравниваются с сохранёнными одним запросом"""
+        counts: Counter = Counter()
+        keys = list(table.primary_key.columns)
+        if HASH_COLUMN not in table.c or len(keys) != 1:
+            return rows, counts
+
+        key = keys[0]
+        for row in rows:
+            row[HASH_COLUMN] = content_hash({c: v for c, v in row.items() if c != HASH_COLUMN})
+        if not self.check_unchanged:
+            counts["inserted"] = len(rows)
+            return rows, counts
+        result = await db_session.execute(
+            select(key, table.c[HASH_COLUMN]).where(key.in_({row[key.name] for row in rows}))
+        )
+        stored = dict(result.all())
+
+        changed = []
+        for row in rows:
+            row_id = row[key.name]
+            if row_id not in stored:
+                counts["inserted"] += 1
+            elif stored[row_id] == row[HASH_COLUMN]:
+                counts["unchanged"] += 1
+                continue
+            else:
+                counts["updated"] += 1
+            changed.append(row)
+        return changed, counts
+
+    async def _upsert(self, db_session: AsyncSession, table: Table, rows: List[Dict[str, Any]]) -> None:
+        """Выполнение upsert пакета (через COPY во временную таблицу для asyncpg)"""
+        dialect = db_session.bind.dialect
+        # Строки группируются по набору колонок: у каждой группы обновляются только её колонки
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            groups[tuple(sorted(row))].append(row)
+        for columns, group in groups.items():
+            if self.use_copy and dialect.name == "postgresql" and dialect.driver == "asyncpg":
+                await self._copy_upsert(db_session, table, group)
+            else:
+                await db_session.execute(build_upsert(dialect.name, table, columns), group)
+
+    async def _copy_upsert(self, db_session: AsyncSession, table: Table, rows: List[Dict[str, Any]]) -> None:
+        """COPY во временную таблицу и перенос в основную одним INSERT ... SELECT"""
+        columns = list(rows[0].keys())
+        temp_table = f"{table.name}_copy"
+        column_list = ", ".join(columns)
+        key_list = ", ".join(c.name for c in table.primary_key.columns)
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if not table.c[c].primary_key)
+
+        conn = await db_session.connection()
+        # Первый execute через SQLAlchemy открывает транзакцию, в которой живёт временная таблица
+        await conn.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {temp_table} "
+            f"(LIKE {table.name} INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            temp_table,
+            records=[tuple(row.get(c) for c in columns) for row in rows],
+            columns=columns,
+        )
+        await conn.execute(text(
+            f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {temp_table} "
+            f"ON CONFLICT ({key_list}) DO UPDATE SET {updates}"
+        ))
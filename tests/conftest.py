@@ -0,0 +1,64 @@
+import asyncio
+import os
+import socket
+import tempfile
+from typing import Any, Awaitable, Callable, Optional
+
+import pytest
+
+# Окружение задаётся до импорта пакета: движок БД и BASE_URL читаются при импорте
+_workdir = tempfile.mkdtemp(prefix="starwars_async_tests_")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+PORT = _free_port()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_workdir, 'test.sqlite')}"
+os.environ["SWAPI_BASE_URL"] = f"http://127.0.0.1:{PORT}/api/"
+os.environ["HTTP_CACHE_MODE"] = "off"
+os.environ["HTTP_CACHE_PATH"] = os.path.join(_workdir, "http_cache.sqlite")
+
+from starwars_async.api_client import reference_cache  # noqa: E402
+from starwars_async.database import engine  # noqa: E402
+from starwars_async.fake_swapi import FakeSwapi, FakeSwapiConfig  # noqa: E402
+from starwars_async.models import Base  # noqa: E402
+from starwars_async.normalized import drop_compat_views  # noqa: E402
+
+
+async def reset_schema() -> None:
+    """Чистая схема перед тестом"""
+    async with engine.begin() as conn:
+        await drop_compat_views(conn)
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+@pytest.fixture
+def run_with_server() -> Callable[..., Any]:
+    """Запуск сценария против тестового сервера на чистой схеме.
+
+    Сценарий получает FakeSwapi (данные можно менять между прогонами,
+    поведение — подклассом сервера);
+    пул БД закрывается в том же цикле событий.
+    """
+
+    def run(scenario: Callable[[FakeSwapi], Awaitable[Any]], server: Optional[FakeSwapi] = None) -> Any:
+        async def main() -> Any:
+            reference_cache.clear()
+            nonlocal server
+            server = server or FakeSwapi(FakeSwapiConfig(seed=7))
+            await server.start(port=PORT)
+            try:
+                await reset_schema()
+                return await scenario(server)
+            finally:
+                await server.stop()
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
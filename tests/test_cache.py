@@ -0,0 +1,103 @@
+import asyncio
+
+from starwars_async.cache import ReferenceCache
+
+URL = "https://swapi.test/api/planets/1/"
+
+
+def test_concurrent_callers_share_one_fetch():
+    """Одновременные get_or_fetch одного URL выполняют один запрос"""
+    cache = ReferenceCache()
+    calls = []
+
+    async def fetch():
+        calls.append(URL)
+        await asyncio.sleep(0.01)
+        return {"name": "Tatooine"}
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_fetch(URL, fetch) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+    assert results == [{"name": "Tatooine"}] * 10
+    assert calls == [URL]
+    assert cache.misses == 1
+    assert cache.in_flight_hits == 9
+
+
+def test_cancelled_caller_does_not_cancel_shared_fetch():
+    """Отмена одного ожидающего не отменяет общий запрос: остальные получают результат, он кэшируется"""
+    cache = ReferenceCache()
+    calls = []
+
+    async def fetch():
+        calls.append(URL)
+        await asyncio.sleep(0.05)
+        return {"name": "Tatooine"}
+
+    async def scenario():
+        first = asyncio.ensure_future(cache.get_or_fetch(URL, fetch))
+        second = asyncio.ensure_future(cache.get_or_fetch(URL, fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        value = await second
+        assert first.cancelled()
+        return value, await cache.get_or_fetch(URL, fetch)
+
+    assert asyncio.run(scenario()) == ({"name": "Tatooine"}, {"name": "Tatooine"})
+    assert calls == [URL]
+    assert cache.hits == 1
+
+
+def test_failed_fetch_is_not_cached():
+    """None (неудачный запрос) не кэшируется, следующий вызов повторяет загрузку"""
+    cache = ReferenceCache()
+    results = iter([None, {"name": "Tatooine"}])
+
+    async def fetch():
+        return next(results)
+
+    async def scenario():
+        return await cache.get_or_fetch(URL, fetch), await cache.get_or_fetch(URL, fetch)
+
+    assert asyncio.run(scenario()) == (None, {"name": "Tatooine"})
+    assert cache.misses == 2
+
+
+def test_lru_eviction_keeps_recently_used():
+    """При переполнении вытесняется запись, к которой дольше всего не обращались"""
+    cache = ReferenceCache(max_size=2, ttl=None)
+    fetched = []
+
+    def fetcher(url):
+        async def fetch():
+            fetched.append(url)
+            return {"url": url}
+        return fetch
+
+    async def scenario():
+        for url in ("a", "b", "a", "c", "a", "b"):
+            await cache.get_or_fetch(f"https://swapi.test/api/planets/{url}/", fetcher(url))
+
+    asyncio.run(scenario())
+    # "b" вытеснен при добавлении "c" (последним использован "a") и загружен повторно
+    assert fetched == ["a", "b", "c", "b"]
+
+
+def test_ttl_expires_entries():
+    """Запись старше TTL загружается заново"""
+    cache = ReferenceCache(ttl=0.05)
+    values = iter([{"version": 1}, {"version": 2}])
+
+    async def fetch():
+        return next(values)
+
+    async def scenario():
+        first = await cache.get_or_fetch(URL, fetch)
+        cached = await cache.get_or_fetch(URL, fetch)
+        await asyncio.sleep(0.1)
+        return first, cached, await cache.get_or_fetch(URL, fetch)
+
+    assert asyncio.run(scenario()) == ({"version": 1}, {"version": 1}, {"version": 2})
+    assert cache.hits == 1
+    assert cache.misses == 2
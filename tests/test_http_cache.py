@@ -0,0 +1,72 @@
+import aiohttp
+import pytest
+
+from starwars_async import api_client
+from starwars_async.api_client import fetch_json_with_retry
+from starwars_async.http_cache import HttpCache
+
+
+@pytest.fixture
+def http_cache(tmp_path, monkeypatch):
+    """Включённый кэш во временном файле вместо общего (в тестах HTTP_CACHE_MODE=off)"""
+    cache = HttpCache(path=str(tmp_path / "http_cache.sqlite"), mode="on")
+    monkeypatch.setattr(api_client, "http_cache", cache)
+    yield cache
+    cache.close()
+
+
+def test_stale_entry_is_revalidated_with_etag(run_with_server, http_cache):
+    """Устаревший ответ ревалидируется по ETag: на 304 отдаётся сохранённое тело, время проверки обновляется"""
+    http_cache.max_age = 0
+
+    async def scenario(server):
+        url = f"{server.base_url}planets/1"
+        async with aiohttp.ClientSession() as session:
+            first = await fetch_json_with_retry(session, url)
+            stored = await http_cache.get(url)
+            assert stored.etag
+
+            second = await fetch_json_with_retry(session, url)
+            assert server.stats.statuses[304] == 1
+            assert second == first
+            assert (await http_cache.get(url)).fetched_at > stored.fetched_at
+
+            server.dataset["planets"][1]["name"] = "Tatooine II"
+            third = await fetch_json_with_retry(session, url)
+            assert server.stats.statuses[304] == 1
+            assert third["result"]["properties"]["name"] == "Tatooine II"
+            assert (await http_cache.get(url)).etag != stored.etag
+
+    run_with_server(scenario)
+
+
+def test_fresh_entry_is_served_without_request(run_with_server, http_cache):
+    """Ответ моложе max_age отдаётся из кэша без обращения к серверу"""
+
+    async def scenario(server):
+        url = f"{server.base_url}planets/1"
+        async with aiohttp.ClientSession() as session:
+            first = await fetch_json_with_retry(session, url)
+            requests = server.stats.requests
+            server.dataset["planets"][1]["name"] = "Changed"
+            assert await fetch_json_with_retry(session, url) == first
+            assert server.stats.requests == requests
+
+    run_with_server(scenario)
+
+
+def test_offline_mode_uses_only_cache(run_with_server, http_cache):
+    """Офлайн-режим: попадание отдаётся из кэша, промах — None, запросов к серверу нет"""
+
+    async def scenario(server):
+        cached_url = f"{server.base_url}planets/1"
+        async with aiohttp.ClientSession() as session:
+            first = await fetch_json_with_retry(session, cached_url)
+            requests = server.stats.requests
+
+            http_cache.mode = "offline"
+            assert await fetch_json_with_retry(session, cached_url) == first
+            assert await fetch_json_with_retry(session, f"{server.base_url}planets/2") is None
+            assert server.stats.requests == requests
+
+    run_with_server(scenario)
@@ -0,0 +1,58 @@
+from starwars_async.latency import (
+    DEADLINE_MULTIPLIER,
+    MIN_REQUEST_DEADLINE,
+    HedgeBudget,
+    LatencyTracker,
+)
+
+
+def tracker_with(samples, default_deadline=30.0, min_samples=20):
+    tracker = LatencyTracker(default_deadline=default_deadline, min_samples=min_samples)
+    for seconds in samples:
+        tracker.record("people", seconds)
+    return tracker
+
+
+def test_defaults_until_enough_samples():
+    """До набора выборки — таймаут по умолчанию и без дублирования"""
+    tracker = tracker_with([0.1] * 19)
+    assert tracker.deadline("people") == 30.0
+    assert tracker.hedge_delay("people") is None
+    assert tracker.deadline("films") == 30.0
+
+
+def test_deadline_and_hedge_delay_follow_percentiles():
+    """Порог дублирования — p95, дедлайн — p99 × множитель"""
+    tracker = tracker_with([i / 100 for i in range(1, 101)])
+    assert tracker.hedge_delay("people") == 0.95
+    assert tracker.deadline("people") == 0.99 * DEADLINE_MULTIPLIER
+
+
+def test_deadline_is_clamped():
+    """Дедлайн не меньше MIN_REQUEST_DEADLINE и не больше таймаута по умолчанию"""
+    assert tracker_with([0.01] * 50).deadline("people") == MIN_REQUEST_DEADLINE
+    assert tracker_with([20.0] * 50, default_deadline=30.0).deadline("people") == 30.0
+
+
+def test_window_drops_old_samples():
+    tracker = LatencyTracker(default_deadline=30.0, window=50, min_samples=20)
+    for seconds in [10.0] * 50 + [0.5] * 50:
+        tracker.record("people", seconds)
+    assert tracker.hedge_delay("people") == 0.5
+
+
+def test_hedge_budget_stays_within_ratio():
+    """Дублирующих запросов не больше ratio × запросов + burst"""
+    budget = HedgeBudget(ratio=0.05, burst=5, enabled=True)
+    spent = 0
+    for _ in range(1000):
+        budget.record_request()
+        if budget.try_spend():
+            spent += 1
+        assert budget.hedges <= budget.requests * budget.ratio + budget.burst
+    assert spent == budget.hedges == 55
+
+
+def test_hedge_budget_burst_only_without_requests():
+    budget = HedgeBudget(ratio=0.05, burst=2, enabled=True)
+    assert [budget.try_spend() for _ in range(4)] == [True, True, False, False]
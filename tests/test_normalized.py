@@ -0,0 +1,30 @@
+from sqlalchemy import func, select
+
+from starwars_async.database import engine
+from starwars_async.loader import DataLoader
+from starwars_async.models import Film, Species, character_films
+
+
+def test_rerun_after_normalized_run_skips_unchanged_rows(run_with_server):
+    """Фильмы и виды пишутся одним путём с хэшем строки: повторный прогон без изменений ничего не обновляет"""
+
+    async def scenario(server):
+        await DataLoader(normalized=True).run()
+        async with engine.connect() as conn:
+            missing_hashes = await conn.scalar(
+                select(func.count()).select_from(Film).where(Film.row_hash.is_(None))
+            )
+            species_count = await conn.scalar(select(func.count()).select_from(Species))
+            links = await conn.scalar(select(func.count()).select_from(character_films))
+        assert missing_hashes == 0
+        assert species_count == len(server.dataset["species"])
+        assert links > 0
+
+        loader = DataLoader(normalized=True)
+        await loader.run()
+        for table in ("films", "species", "characters"):
+            stats = loader.writer.stats[table]
+            assert stats["updated"] == 0 and stats["inserted"] == 0, table
+            assert stats["unchanged"] == stats["written"] > 0, table
+
+    run_with_server(scenario)
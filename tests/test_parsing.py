@@ -0,0 +1,53 @@
+import pytest
+
+from starwars_async.parsing import MISSING_VALUES, parse_float, parse_int, parse_range, parse_range_max, parse_range_min
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1,358", 1358.0),
+    ("1,000,000,000", 1e9),
+    (" 77.5 ", 77.5),
+    (172, 172.0),
+    (0.9, 0.9),
+    (None, None),
+    ("about 5", None),
+])
+def test_parse_float(value, expected):
+    assert parse_float(value) == expected
+
+
+@pytest.mark.parametrize("value", MISSING_VALUES + ("Unknown", " N/A "))
+def test_missing_values(value):
+    assert parse_float(value) is None
+    assert parse_int(value) is None
+    assert parse_range(value) == (None, None)
+
+
+@pytest.mark.parametrize("value", ["inf", "-Infinity", "nan", "1e999", float("inf"), float("nan")])
+def test_non_finite_values_are_missing(value):
+    """inf/nan не попадают в числовые колонки (и int() от них не падает)"""
+    assert parse_float(value) is None
+    assert parse_int(value) is None
+
+
+def test_parse_int_truncates():
+    assert parse_int("1,358.9") == 1358
+    assert parse_int("200000") == 200000
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("30-165", (30.0, 165.0)),
+    ("165 - 30", (30.0, 165.0)),
+    ("1,000–5,000", (1000.0, 5000.0)),
+    ("5", (5.0, 5.0)),
+    ("unknown", (None, None)),
+    ("1-inf", (None, None)),
+])
+def test_parse_range(value, expected):
+    assert parse_range(value) == expected
+
+
+def test_range_bounds():
+    assert parse_range_min("30-165") == 30
+    assert parse_range_max("30-165") == 165
+    assert parse_range_min("unknown") is None
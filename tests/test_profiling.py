@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from starwars_async.loader import DataLoader
+from starwars_async.profiling import LoaderProfiler, run_profiled
+
+
+def custom_task_factory(loop, coro, **kwargs):
+    return asyncio.Task(coro, loop=loop, **kwargs)
+
+
+def test_profiled_run_restores_event_loop(run_with_server, tmp_path):
+    """После загрузки под профилировщиком Handle._run и фабрика задач — прежние, отчёт записан"""
+    handle_run = asyncio.events.Handle._run
+
+    async def scenario(server):
+        loop = asyncio.get_running_loop()
+        loop.set_task_factory(custom_task_factory)
+        await run_profiled(DataLoader(), output=str(tmp_path / "profile"))
+        assert asyncio.events.Handle._run is handle_run
+        assert loop.get_task_factory() is custom_task_factory
+
+    run_with_server(scenario)
+    assert (tmp_path / "profile.collapsed").read_text()
+    assert "Coroutines (wall vs CPU)" in (tmp_path / "profile.txt").read_text()
+
+
+def test_failed_run_restores_event_loop(tmp_path):
+    """Ошибка loader.run() не оставляет подменённые Handle._run и фабрику задач"""
+    handle_run = asyncio.events.Handle._run
+    loader = DataLoader()
+
+    async def failing_run():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    loader.run = failing_run
+
+    async def scenario():
+        with pytest.raises(RuntimeError, match="boom"):
+            await run_profiled(loader, output=str(tmp_path / "profile"))
+        assert asyncio.events.Handle._run is handle_run
+        assert asyncio.get_running_loop().get_task_factory() is None
+
+    asyncio.run(scenario())
+
+
+def test_second_start_is_rejected():
+    """Повторный start() не подменяет Handle._run ещё раз, а stop() идемпотентен"""
+    handle_run = asyncio.events.Handle._run
+    profiler = LoaderProfiler()
+
+    async def scenario():
+        profiler.start()
+        try:
+            with pytest.raises(RuntimeError):
+                profiler.start()
+        finally:
+            profiler.stop()
+        profiler.stop()
+        assert asyncio.events.Handle._run is handle_run
+
+    asyncio.run(scenario())
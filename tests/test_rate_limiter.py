@@ -0,0 +1,66 @@
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from starwars_async.rate_limiter import AdaptiveRateLimiter, jittered_backoff, parse_retry_after
+
+
+def test_throttle_halves_rate_and_success_recovers():
+    """429 вдвое снижает скорость и параллельность, успешные ответы возвращают их аддитивно"""
+    limiter = AdaptiveRateLimiter(rate=10.0, concurrency=8)
+    limiter.on_throttle(attempt=0)
+    assert limiter.rate == 5.0
+    assert limiter.limit == 4.0
+
+    # Повторный 429 той же волны (в пределах DECREASE_COOLDOWN) не снижает ещё раз
+    limiter.on_throttle(attempt=1)
+    assert limiter.rate == 5.0
+
+    for _ in range(200):
+        limiter.on_success()
+    assert limiter.rate > 10.0
+    assert limiter.limit > 8.0
+    assert limiter.rate <= limiter.max_rate
+    assert limiter.limit <= limiter.max_concurrency
+
+
+def test_throttle_respects_lower_bounds():
+    """Скорость и параллельность не опускаются ниже минимумов"""
+    limiter = AdaptiveRateLimiter(rate=1.5, concurrency=1)
+    limiter.on_throttle(attempt=0)
+    assert limiter.rate == limiter.min_rate
+    assert limiter.limit == limiter.min_concurrency
+
+
+def test_retry_after_pauses_all_requests():
+    """Retry-After задаёт задержку повтора и паузу для всех запросов к хосту"""
+    limiter = AdaptiveRateLimiter()
+    assert limiter.on_throttle(attempt=0, retry_after=0.2) == 0.2
+
+    async def scenario():
+        started = time.monotonic()
+        async with limiter.slot():
+            return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.15
+
+
+@pytest.mark.parametrize("value, expected", [("5", 5.0), (" 2.5 ", 2.5), ("-3", 0.0), (None, None), ("", None),
+                                             ("soon", None)])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    """HTTP-дата превращается в секунды до неё; прошедшая дата — в ноль"""
+    assert 58 <= parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+
+def test_jittered_backoff_is_bounded():
+    """Полный джиттер: задержка в [0, min(cap, base * 2^attempt)]"""
+    for attempt in range(10):
+        for _ in range(50):
+            assert 0 <= jittered_backoff(attempt, base=0.5, cap=4.0) <= min(4.0, 0.5 * 2 ** attempt)
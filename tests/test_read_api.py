@@ -0,0 +1,55 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+
+from starwars_async.loader import DataLoader
+from starwars_async.read_api import ReadApi
+
+
+async def wait_for_invalidation(api: ReadApi, invalidations: int) -> None:
+    """Ожидание, пока наблюдатель data_versions сбросит кэш"""
+    for _ in range(100):
+        if api.cache.invalidations > invalidations:
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError("read API cache was not invalidated")
+
+
+def test_reload_invalidates_cached_responses(run_with_server):
+    """После перезагрузки изменённых данных API отдаёт новое тело и ETag, а If-None-Match с ним — 304"""
+
+    async def scenario(server):
+        await DataLoader().run()
+        api = ReadApi(poll_interval=0.05)
+        runner = web.AppRunner(api.make_app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{runner.addresses[0][1]}/api/planets/1"
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url) as response:
+                    assert response.status == 200
+                    old_etag = response.headers["ETag"]
+                    old_name = (await response.json())["name"]
+                async with session.get(url, headers={"If-None-Match": old_etag}) as response:
+                    assert response.status == 304
+                assert api.cache.misses == 1
+
+                invalidations = api.cache.invalidations
+                server.dataset["planets"][1]["name"] = f"{old_name} (reloaded)"
+                await DataLoader().run()
+                await wait_for_invalidation(api, invalidations)
+
+                async with session.get(url, headers={"If-None-Match": old_etag}) as response:
+                    assert response.status == 200
+                    new_etag = response.headers["ETag"]
+                    assert (await response.json())["name"] == f"{old_name} (reloaded)"
+                assert new_etag != old_etag
+                async with session.get(url, headers={"If-None-Match": new_etag}) as response:
+                    assert response.status == 304
+        finally:
+            await runner.cleanup()
+
+    run_with_server(scenario)
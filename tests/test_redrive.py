@@ -0,0 +1,35 @@
+from sqlalchemy import select
+
+from starwars_async.database import engine
+from starwars_async.loader import DataLoader
+from starwars_async.models import DeadLetter, Planet
+from starwars_async.redrive import Redrive
+
+
+async def dead_letters() -> dict:
+    async with engine.connect() as conn:
+        result = await conn.execute(select(DeadLetter.entity_type, DeadLetter.entity_id, DeadLetter.attempts))
+        return {(entity_type, entity_id): attempts for entity_type, entity_id, attempts in result.all()}
+
+
+def test_redrive_retries_dead_letters(run_with_server):
+    """Redrive повторяет сбойную сущность: неудача увеличивает attempts, успех удаляет запись и пишет строку"""
+
+    async def scenario(server):
+        name = server.dataset["planets"][5]["name"]
+        server.dataset["planets"][5]["name"] = None
+        await DataLoader().run()
+        assert await dead_letters() == {("planet", 5): 1}
+
+        totals = await Redrive(rounds=1).run()
+        assert totals == {"total": 1, "resolved": 0, "failed": 1}
+        assert await dead_letters() == {("planet", 5): 2}
+
+        server.dataset["planets"][5]["name"] = name
+        totals = await Redrive(rounds=1).run()
+        assert totals == {"total": 1, "resolved": 1, "failed": 0}
+        assert await dead_letters() == {}
+        async with engine.connect() as conn:
+            assert await conn.scalar(select(Planet.name).where(Planet.id == 5)) == name
+
+    run_with_server(scenario)
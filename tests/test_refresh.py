@@ -0,0 +1,59 @@
+from aiohttp import web
+from sqlalchemy import inspect
+
+from starwars_async.database import engine
+from starwars_async.fake_swapi import FakeSwapi, FakeSwapiConfig
+from starwars_async.loader import DataLoader
+from starwars_async.search import SearchIndex
+
+
+async def foreign_keys(table_name: str) -> list:
+    async with engine.connect() as conn:
+        return await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_foreign_keys(table_name))
+
+
+def test_refresh_keeps_foreign_keys(run_with_server):
+    """После подмены staging-таблиц у основных таблиц те же внешние ключи, что у модели"""
+
+    async def scenario(server):
+        before = await foreign_keys("characters")
+        assert before
+
+        loader = DataLoader(refresh=True)
+        await loader.run()
+        assert loader.writer.stats["characters"]["written"] == len(server.dataset["people"])
+        assert await foreign_keys("characters") == before
+        async with engine.connect() as conn:
+            tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+        assert not [name for name in tables if name.endswith("_staging") or name.endswith("_old")]
+
+    run_with_server(scenario)
+
+
+class MissingPageSwapi(FakeSwapi):
+    """Сервер, у которого список транспорта не находится, пока failing=True"""
+
+    failing = True
+
+    async def handle_list(self, request: web.Request) -> web.Response:
+        if self.failing and request.match_info["endpoint"] == "vehicles":
+            return web.json_response({"message": "not found"}, status=404)
+        return await super().handle_list(request)
+
+
+def test_refresh_updates_search_index_only_after_swap(run_with_server):
+    """Строки staging-таблиц попадают в поисковый индекс только после подмены"""
+
+    async def scenario(server):
+        server.dataset["planets"][1]["name"] = "Zyzzyva"
+        index = SearchIndex()
+
+        await DataLoader(refresh=True, search_index=index).run()
+        assert not index.search("zyzzyva", mode="token")
+
+        server.failing = False
+        await DataLoader(refresh=True, search_index=index).run()
+        hits = index.search("zyzzyva", mode="token", tables=["planets"])
+        assert [(hit.table, hit.entity_id) for hit in hits] == [("planets", 1)]
+
+    run_with_server(scenario, MissingPageSwapi(FakeSwapiConfig(seed=7)))
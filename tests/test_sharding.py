@@ -0,0 +1,38 @@
+import pytest
+from aiohttp import web
+from sqlalchemy import select
+
+from starwars_async.database import engine
+from starwars_async.fake_swapi import FakeSwapi, FakeSwapiConfig
+from starwars_async.models import Vehicle
+from starwars_async.sharding import SHARD_PAGE_SIZE, _run_shard
+from starwars_async.sync_state import Shard
+
+
+class FailingPageSwapi(FakeSwapi):
+    """Сервер, у которого вторая страница списка транспорта отвечает 503, пока failing=True"""
+
+    failing = True
+
+    async def handle_list(self, request: web.Request) -> web.Response:
+        if self.failing and request.match_info["endpoint"] == "vehicles" and request.query.get("page") == "2":
+            return web.json_response({"message": "Service Unavailable"}, status=503)
+        return await super().handle_list(request)
+
+
+def test_shard_with_failed_list_page_is_not_done(run_with_server):
+    """Шард, в котором не загрузилась страница списка, завершается ошибкой (координатор его повторит)"""
+    shard = Shard("vehicle", 1, 2)
+
+    async def scenario(server):
+        with pytest.raises(RuntimeError, match="incomplete"):
+            await _run_shard(shard, {"page_size": SHARD_PAGE_SIZE})
+
+        server.failing = False
+        result = await _run_shard(shard, {"page_size": SHARD_PAGE_SIZE})
+        async with engine.connect() as conn:
+            ids = set((await conn.execute(select(Vehicle.id))).scalars())
+        assert ids == set(range(1, 2 * SHARD_PAGE_SIZE + 1))
+        assert result["written"] == 2 * SHARD_PAGE_SIZE
+
+    run_with_server(scenario, server=FailingPageSwapi(FakeSwapiConfig(seed=7)))
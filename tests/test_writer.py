@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+from sqlalchemy import func, select, text
+
+from starwars_async.database import engine
+from starwars_async.loader import DataLoader
+from starwars_async.models import Character, Planet
+from starwars_async.writer import BulkWriter
+
+
+async def character_homeworlds() -> dict:
+    async with engine.connect() as conn:
+        result = await conn.execute(select(Character.id, Character.homeworld_id))
+        return dict(result.all())
+
+
+def test_plain_run_keeps_normalized_columns(run_with_server):
+    """Обычная загрузка изменённых строк не обнуляет homeworld_id, записанный нормализованной схемой"""
+
+    async def scenario(server):
+        await DataLoader(normalized=True).run()
+        before = await character_homeworlds()
+        assert any(before.values())
+
+        for properties in server.dataset["people"].values():
+            properties["eye_color"] = "orange"
+        loader = DataLoader()
+        await loader.run()
+        assert loader.writer.stats["characters"]["updated"] == len(before)
+
+        assert await character_homeworlds() == before
+        async with engine.connect() as conn:
+            eye_colors = set((await conn.execute(select(Character.eye_color))).scalars())
+            flat = dict((await conn.execute(text("SELECT id, homeworld FROM characters_flat"))).all())
+        assert eye_colors == {"orange"}
+        assert all(flat[character_id] for character_id, planet_id in before.items() if planet_id)
+
+    run_with_server(scenario)
+
+
+def test_bad_row_is_isolated_by_bisection(run_with_server):
+    """Пакет с плохой строкой делится пополам: остальные строки записываются, плохая уходит в on_failure"""
+    failures = []
+
+    async def scenario(server):
+        writer = BulkWriter(batch_size=100, on_failure=lambda table, row, error: failures.append(row["id"]))
+        for planet_id in range(1, 9):
+            await writer.add(Planet, {"id": planet_id, "name": None if planet_id == 5 else f"Planet {planet_id}"})
+        await writer.close()
+
+        async with engine.connect() as conn:
+            ids = set((await conn.execute(select(Planet.id))).scalars())
+        assert ids == {1, 2, 3, 4, 6, 7, 8}
+        assert failures == [5]
+        assert writer.stats["planets"]["failed"] == 1
+        assert writer.stats["planets"]["written"] == 7
+
+    run_with_server(scenario)
+
+
+def test_close_during_periodic_flush_keeps_rows(run_with_server):
+    """close() во время фонового сброса дожидается его: строки не теряются, блокировка записи не остаётся"""
+
+    async def scenario(server):
+        for round_number in range(20):
+            writer = BulkWriter(batch_size=1000, flush_interval=0.001)
+            await writer.start()
+            first_id = round_number * 50 + 1
+            for planet_id in range(first_id, first_id + 50):
+                await writer.add(Planet, {"id": planet_id, "name": f"Planet {planet_id}"})
+            await asyncio.sleep(0.001 * (round_number % 5))
+            started = time.perf_counter()
+            await writer.close()
+            async with engine.begin() as conn:
+                count = await conn.scalar(
+                    select(func.count()).select_from(Planet).where(Planet.id >= first_id, Planet.id < first_id + 50)
+                )
+                await conn.execute(text("DELETE FROM planets WHERE id = 0"))
+            assert count == 50, round_number
+            assert time.perf_counter() - started < 5, round_number
+
+    run_with_server(scenario)
+
+def test_failed_row_is_retried_by_incremental_run(run_with_server):
+    """Строка, не записанная writer, не получает состояния синхронизации: incremental загружает её снова"""
+
+    async def scenario(server):
+        name = server.dataset["planets"][5]["name"]
+        server.dataset["planets"][5]["name"] = None
+        loader = DataLoader()
+        await loader.run()
+        assert loader.writer.stats["planets"]["failed"] == 1
+
+        # Данные те же (edited не изменился), сбой был на стороне записи
+        server.dataset["planets"][5]["name"] = name
+        loader = DataLoader(mode="incremental")
+        await loader.run()
+        async with engine.connect() as conn:
+            assert await conn.scalar(select(Planet.name).where(Planet.id == 5)) == name
+        assert loader.skipped["planet"] == len(server.dataset["planets"]) - 1
+
+    run_with_server(scenario)